@@ -5,11 +5,19 @@ on a running bokeh server.
 from __future__ import absolute_import, division, unicode_literals
 
 
+import asyncio
+import inspect
 import time
+
+from functools import partial
+
 import param
 
 from bokeh.io import curdoc as _curdoc
 
+from .io.metrics import metrics
+from .io.state import state
+
 
 class PeriodicCallback(param.Parameterized):
     """
@@ -19,6 +27,13 @@ class PeriodicCallback(param.Parameterized):
     but count and timeout values can be set to limit the number of
     executions or the maximum length of time for which the callback
     will run.
+
+    Runs are scheduled at fixed multiples of the period from the
+    start time, so the schedule does not drift even if the event
+    loop delays individual runs. The callback may be a coroutine
+    function or run on a thread pool, in which case ticks occurring
+    while the previous run is still in progress are skipped or
+    coalesced depending on the mode.
     """
 
     callback = param.Callable(doc="""
@@ -28,9 +43,21 @@ class PeriodicCallback(param.Parameterized):
         Number of times the callback will be executed, by default
         this is unlimited.""")
 
+    mode = param.ObjectSelector(default='skip', objects=['skip', 'coalesce'], doc="""
+        How ticks occurring while the previous run of the callback is
+        still in progress are handled, either 'skip', which drops
+        them, or 'coalesce', which runs the callback once more as
+        soon as the previous run completes.""")
+
     period = param.Integer(default=500, doc="""
         Period in milliseconds at which the callback is executed.""")
 
+    threaded = param.Boolean(default=False, doc="""
+        Whether to run the callback on a thread pool, keeping the
+        event loop responsive while it runs. state.curdoc refers to
+        the Document of the session in the callback, and changes to
+        components are applied on its next tick.""")
+
     timeout = param.Integer(default=None, doc="""
         Timeout in seconds from the start time at which the callback
         expires""")
@@ -39,21 +66,52 @@ class PeriodicCallback(param.Parameterized):
         super(PeriodicCallback, self).__init__(**params)
         self._counter = 0
         self._start_time = None
-        self._timeout = None
+        self._origin = None
+        self._ticks = 0
         self._cb = None
         self._doc = None
+        self._loop = None
+        self._running = False
+        self._pending = False
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            'runs': 0, 'skipped': 0, 'coalesced': 0,
+            'jitter_sum': 0., 'jitter_max': 0.,
+            'latency_sum': 0., 'latency_max': 0.
+        }
+
+    @property
+    def stats(self):
+        """
+        Statistics of the runs since the callback was started: the
+        number of runs, the number of ticks skipped or coalesced and
+        the mean and maximum jitter, the delay of each run behind its
+        scheduled time, and latency, the duration of each run, in
+        seconds.
+        """
+        stats = self._stats
+        runs = stats['runs'] or 1
+        return {
+            'runs': stats['runs'],
+            'skipped': stats['skipped'],
+            'coalesced': stats['coalesced'],
+            'jitter': {'mean': stats['jitter_sum']/runs, 'max': stats['jitter_max']},
+            'latency': {'mean': stats['latency_sum']/runs, 'max': stats['latency_max']}
+        }
 
     def start(self):
         if self._cb is not None:
             raise RuntimeError('Periodic callback has already started.')
+        from tornado.ioloop import IOLoop
         self._start_time = time.time()
-        if _curdoc().session_context:
-            self._doc = _curdoc()
-            self._cb = self._doc.add_periodic_callback(self._periodic_callback, self.period)
-        else:
-            from tornado.ioloop import PeriodicCallback
-            self._cb = PeriodicCallback(self._periodic_callback, self.period)
-            self._cb.start()
+        self._reset_stats()
+        self._doc = _curdoc() if _curdoc().session_context else None
+        self._loop = IOLoop.current()
+        self._origin = self._loop.time()
+        self._ticks = 1
+        self._schedule()
 
     @param.depends('period', watch=True)
     def _update_period(self):
@@ -61,22 +119,94 @@ class PeriodicCallback(param.Parameterized):
             self.stop()
             self.start()
 
+    @property
+    def _next(self):
+        return self._origin + self._ticks * self.period/1000.
+
+    def _schedule(self):
+        if self._doc:
+            # Document callbacks run with the Document locked and are
+            # removed when the session is destroyed
+            delay = max(self._next - self._loop.time(), 0) * 1000
+            self._cb = self._doc.add_timeout_callback(self._periodic_callback, delay)
+        else:
+            self._cb = self._loop.call_at(self._next, self._periodic_callback)
+
     def _periodic_callback(self):
-        self.callback()
+        period = self.period/1000.
+        jitter = max(self._loop.time() - self._next, 0)
+        missed = int(jitter // period)
+        self._ticks += missed + 1
+        self._schedule()
+        self._stats['skipped'] += missed
+        if self.timeout is not None and time.time() - self._start_time > self.timeout:
+            self.stop()
+            return
+        if self._running:
+            if self.mode == 'coalesce' and not self._pending:
+                self._pending = True
+                self._stats['coalesced'] += 1
+            else:
+                self._stats['skipped'] += 1
+            return
+        self._stats['jitter_sum'] += jitter
+        self._stats['jitter_max'] = max(self._stats['jitter_max'], jitter)
+        self._run()
+
+    def _run(self):
         self._counter += 1
-        if self._timeout is not None:
-            dt = (time.time() - self._start_time)
-            if dt > self._timeout:
-                self.stop()
         if self._counter == self.count:
             self.stop()
+        start = time.perf_counter()
+        if self.threaded:
+            future = state._submit(self._threaded_callback)
+        else:
+            result = self.callback()
+            if not inspect.isawaitable(result):
+                self._completed(start)
+                return
+            future = asyncio.ensure_future(result)
+        self._running = True
+        self._loop.add_future(future, partial(self._done, start))
+
+    def _threaded_callback(self):
+        # Binds the Document of the session to the worker thread, so
+        # state.curdoc refers to it while the callback runs
+        state._thread_local.curdoc = self._doc
+        try:
+            return self.callback()
+        finally:
+            state._thread_local.curdoc = None
+
+    def _done(self, start, future):
+        self._running = False
+        self._completed(start)
+        if self._pending and self._cb is not None:
+            self._pending = False
+            if self._doc:
+                self._doc.add_next_tick_callback(self._run)
+            else:
+                self._run()
+        future.result()
+
+    def _completed(self, start):
+        latency = time.perf_counter() - start
+        self._stats['runs'] += 1
+        self._stats['latency_sum'] += latency
+        self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+        if metrics.enabled:
+            metrics.record_callback('periodic', latency)
 
     def stop(self):
         self._counter = 0
-        self._timeout = None
+        self._pending = False
+        if self._cb is None:
+            return
         if self._doc:
-            self._doc.remove_periodic_callback(self._cb)
+            try:
+                self._doc.remove_timeout_callback(self._cb)
+            except ValueError: # the callback already ran
+                pass
         else:
-            self._cb.stop()
+            self._loop.remove_timeout(self._cb)
         self._cb = None
-
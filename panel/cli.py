@@ -5,13 +5,123 @@ from __future__ import absolute_import, division, unicode_literals
 
 import sys
 import argparse
+import logging
+import uuid
 
 from bokeh.__main__ import main as bokeh_entry_point
+from bokeh.command.subcommands.serve import Serve as _BkServe
 from bokeh.command.util import die
 from bokeh.util.string import nice_join
 
 from . import __version__
-from .io.server import INDEX_HTML
+from .io.compression import websocket_compression
+from .io.lazy import install_lazy_loading
+from .io.metrics import metrics
+from .io.resources import _bundle_static_css
+from .io.sessions import session_reaper
+from .io.server import (
+    INDEX_HTML, METRICS_PATTERNS, PANEL_PATTERNS, profiler_patterns,
+    sessions_patterns
+)
+from .io.shared import SharedCache
+from .io.state import state
+
+log = logging.getLogger(__name__)
+
+
+class Serve(_BkServe):
+    """
+    Extends bokeh's serve command with the routes served by all
+    Panel servers.
+    """
+
+    args = _BkServe.args + (
+        ('--metrics', dict(
+            action  = 'store_true',
+            help    = "Collect server metrics and serve them at /metrics "
+                      "(Prometheus format) and /metrics.json",
+        )),
+        ('--profiler', dict(
+            action  = 'store_true',
+            help    = "Enable the /panel_profile route to profile the server "
+                      "on demand",
+        )),
+        ('--profiler-token', dict(
+            metavar = 'TOKEN',
+            action  = 'store',
+            default = None,
+            help    = "Token required to access the /panel_profile route "
+                      "(default: a random token which is logged on startup)",
+        )),
+        ('--sessions-report', dict(
+            action  = 'store_true',
+            help    = "Enable the /panel_sessions report of the open sessions "
+                      "and their estimated memory usage",
+        )),
+        ('--sessions-report-token', dict(
+            metavar = 'TOKEN',
+            action  = 'store',
+            default = None,
+            help    = "Token required to access the /panel_sessions route "
+                      "(default: a random token which is logged on startup)",
+        )),
+        ('--session-idle-timeout', dict(
+            metavar = 'SECONDS',
+            action  = 'store',
+            type    = float,
+            default = None,
+            help    = "Destroy sessions without a live connection, i.e. "
+                      "whose clients neither sent a message nor answered "
+                      "a ping, for this number of seconds",
+        )),
+        ('--session-max-age', dict(
+            metavar = 'SECONDS',
+            action  = 'store',
+            type    = float,
+            default = None,
+            help    = "Destroy sessions after this number of seconds",
+        )),
+        ('--compression-level', dict(
+            metavar = 'LEVEL',
+            action  = 'store',
+            type    = int,
+            default = None,
+            help    = "Compress websocket messages with this zlib compression "
+                      "level (1-9) unless it does not pay off",
+        )),
+        ('--compression-min-size', dict(
+            metavar = 'BYTES',
+            action  = 'store',
+            type    = int,
+            default = 1024,
+            help    = "Size in bytes below which websocket messages are never "
+                      "compressed",
+        )),
+    )
+
+    def customize_kwargs(self, args, server_kwargs):
+        kwargs = super(Serve, self).customize_kwargs(args, server_kwargs)
+        kwargs['extra_patterns'] = kwargs.get('extra_patterns', []) + PANEL_PATTERNS
+        install_lazy_loading()
+        _bundle_static_css()
+        if kwargs.get('num_procs', 1) != 1 and not isinstance(state.cache, SharedCache):
+            state.cache = SharedCache(state.cache)
+        if args.metrics:
+            metrics.enable()
+            kwargs['extra_patterns'] += METRICS_PATTERNS
+        if args.profiler:
+            token = args.profiler_token or uuid.uuid4().hex
+            log.info("Profiling available at /panel_profile?token=%s", token)
+            kwargs['extra_patterns'] += profiler_patterns(token)
+        if args.sessions_report:
+            token = args.sessions_report_token or uuid.uuid4().hex
+            log.info("Session report available at /panel_sessions?token=%s", token)
+            kwargs['extra_patterns'] += sessions_patterns(token)
+        if args.session_idle_timeout is not None or args.session_max_age is not None:
+            session_reaper.configure(args.session_idle_timeout, args.session_max_age)
+        if args.compression_level is not None:
+            websocket_compression.configure(args.compression_level, args.compression_min_size)
+        return kwargs
 
 
 def transform_cmds(argv):
@@ -77,8 +187,10 @@ def main(args=None):
         sys.exit()
 
     if len(sys.argv) > 1 and any(sys.argv[1] == c.name for c in bokeh_commands):
-        if sys.argv[1] == 'serve' and not any(arg.startswith('--index') for arg in sys.argv):
-            sys.argv = sys.argv + ['--index=%s' % INDEX_HTML]
+        if sys.argv[1] == 'serve':
+            if not any(arg.startswith('--index') for arg in sys.argv):
+                sys.argv = sys.argv + ['--index=%s' % INDEX_HTML]
+            bokeh_commands[bokeh_commands.index(_BkServe)] = Serve
         sys.argv = transform_cmds(sys.argv)
         bokeh_entry_point()
     elif sys.argv[1] in pyct_commands:
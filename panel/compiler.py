@@ -36,9 +36,10 @@ def require_components():
             continue
 
         if isinstance(model, dict):
-            model_require = model
+            model_require = dict(model)
         else:
-            model_require = model.__js_require__
+            model_require = dict(model.__js_require__)
+        model_require['paths'] = dict(model_require.get('paths', {}))
 
         model_exports = model_require.pop('exports', {})
         if not any(model_require == config for config in configs):
@@ -66,6 +66,14 @@ class _config(param.Parameterized):
         External JS files to load. Dictionary should map from exported
         name to the URL of the JS file.""")
 
+    lazy_resources = param.Boolean(default=False, doc="""
+        Whether pages served by a Panel server only load the external
+        JS and CSS resources of the custom models in the rendered
+        Document, loading the resources of other models when they
+        are first added to the Document. Experimental, models added
+        between rendering the page and the browser pulling the
+        Document are displayed without their resources.""")
+
     raw_css = param.List(default=[], doc="""
         List of raw CSS strings to add to load.""")
 
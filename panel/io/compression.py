@@ -0,0 +1,217 @@
+"""
+Compresses the websocket messages of a Panel server using the
+permessage-deflate extension, deciding for every message of every
+connection whether compression pays off given its size and the ratio
+and CPU time achieved on previous messages of the connection.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import threading
+import time
+
+from functools import partial, wraps
+from weakref import WeakKeyDictionary
+
+from bokeh.server.views.ws import WSHandler
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+# Number of messages of a connection which are always compressed to
+# measure the compression ratio and CPU time
+PROBE_MESSAGES = 5
+
+# Every PROBE_INTERVAL-th message is compressed to refresh the
+# measurements of connections which currently send uncompressed
+PROBE_INTERVAL = 50
+
+# Number of bytes compression has to save per second of CPU time
+# spent compressing, otherwise it is backed off for the connection,
+# e.g. for data which is already compressed
+MIN_SAVINGS_RATE = 1e6
+
+
+class _ConnectionCompression(object):
+    """
+    Statistics of the messages written to a single connection.
+    """
+
+    def __init__(self):
+        self.messages = 0
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compressed_in = 0
+        self.compressed_out = 0
+        self.compress_time = 0.
+        self._last_size = None
+
+    @property
+    def ratio(self):
+        if not self.compressed_in:
+            return None
+        return self.compressed_out / self.compressed_in
+
+    def should_compress(self, size, min_size):
+        self.messages += 1
+        if size < min_size:
+            return False
+        elif self.compressed < PROBE_MESSAGES or not self.messages % PROBE_INTERVAL:
+            return True
+        # Back off if compression does not save enough bytes for the
+        # CPU time it costs
+        saved = self.compressed_in - self.compressed_out
+        return saved > 0 and saved >= MIN_SAVINGS_RATE * self.compress_time
+
+    def record_compression(self, size, compressed, duration):
+        self.compressed += 1
+        self.compressed_in += size
+        self.compressed_out += compressed
+        self.compress_time += duration
+        self._last_size = compressed
+
+    def record_write(self, size, wire_size):
+        self.bytes_in += size
+        self.bytes_out += wire_size
+
+    def to_dict(self):
+        return {
+            'messages': self.messages,
+            'compressed': self.compressed,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': self.ratio,
+            'compress_seconds': self.compress_time
+        }
+
+
+def _timed_compress(stats, compress):
+    @wraps(compress)
+    def timed(data):
+        start = time.perf_counter()
+        compressed = compress(data)
+        stats.record_compression(len(data), len(compressed), time.perf_counter()-start)
+        return compressed
+    return timed
+
+
+def _write_message(protocol, stats, message, binary=False):
+    if isinstance(message, str):
+        message = message.encode('utf-8')
+    size = len(message)
+    compressor = protocol._compressor
+    compress = compressor is not None and stats.should_compress(
+        size, websocket_compression.min_size)
+    if not compress:
+        protocol._compressor = None
+    stats._last_size = size
+    try:
+        future = type(protocol).write_message(protocol, message, binary)
+    finally:
+        protocol._compressor = compressor
+    stats.record_write(size, stats._last_size)
+    return future
+
+
+def _get_compression_options(method):
+    @wraps(method)
+    def get_compression_options(self):
+        if not websocket_compression.enabled:
+            return method(self)
+        return {'compression_level': websocket_compression.level,
+                'mem_level': websocket_compression.mem_level}
+    return get_compression_options
+
+
+def _get_websocket_protocol(method):
+    @wraps(method)
+    def get_websocket_protocol(self):
+        protocol = method(self)
+        if protocol is None or not websocket_compression.enabled:
+            return protocol
+        stats = websocket_compression._connections[self] = _ConnectionCompression()
+        create = protocol._create_compressors
+
+        # Compressors are only created once the client accepted the
+        # extension during the handshake
+        @wraps(create)
+        def _create_compressors(*args, **kwargs):
+            create(*args, **kwargs)
+            compressor = protocol._compressor
+            compressor.compress = _timed_compress(stats, compressor.compress)
+            protocol.write_message = partial(_write_message, protocol, stats)
+
+        protocol._create_compressors = _create_compressors
+        return protocol
+    return get_websocket_protocol
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+class WebSocketCompression(object):
+    """
+    Enables permessage-deflate compression of the websocket messages
+    sent by the Panel servers in the process. Messages smaller than
+    min_size bytes are never compressed. Larger messages are
+    compressed unless compression does not shrink the previous
+    messages of the connection or saves too few bytes for the CPU
+    time it costs, e.g. for data which is already compressed. These
+    connections periodically compress a message again to check
+    whether their data changed.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.level = 6
+        self.mem_level = 8
+        self.min_size = 1024
+        self._connections = WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._patched = False
+
+    def configure(self, level=6, min_size=1024, mem_level=8):
+        """
+        Enables compression of websocket messages with the supplied
+        zlib compression level (1-9) of messages of at least min_size
+        bytes, or disables it if level is None. Applies to connections
+        opened after the call.
+        """
+        if level is not None and not (1 <= level <= 9):
+            raise ValueError('Websocket compression level must be between '
+                             '1 and 9, not %r.' % level)
+        self.enabled = level is not None
+        if level is not None:
+            self.level = level
+        self.min_size = min_size
+        self.mem_level = mem_level
+        with self._lock:
+            if not self.enabled or self._patched:
+                return
+            WSHandler.get_compression_options = _get_compression_options(
+                WSHandler.get_compression_options)
+            WSHandler.get_websocket_protocol = _get_websocket_protocol(
+                WSHandler.get_websocket_protocol)
+            self._patched = True
+
+    def stats(self):
+        """
+        Returns the compression statistics of all open connections
+        and their totals, i.e. the number of messages sent and how
+        many were compressed, their size before (bytes_in) and after
+        compression (bytes_out), the ratio achieved on compressed
+        messages and the CPU time spent compressing.
+        """
+        connections = [stats.to_dict() for handler, stats in list(self._connections.items())
+                       if handler.ws_connection is not None]
+        totals = {
+            field: sum(conn[field] for conn in connections)
+            for field in ('messages', 'compressed', 'bytes_in', 'bytes_out', 'compress_seconds')
+        }
+        totals['connections'] = len(connections)
+        return {'totals': totals, 'connections': connections}
+
+
+# The global WebSocketCompression of all servers in the process
+websocket_compression = WebSocketCompression()
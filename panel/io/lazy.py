@@ -0,0 +1,281 @@
+"""
+Loads the external JS and CSS resources of custom models lazily on
+Panel servers. A page only includes the resources of the models in
+the Document it renders; when a model requiring other resources is
+added to the Document later, the patches referencing it are held
+back until the browser has loaded them.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import logging
+import threading
+
+from functools import partial, wraps
+from weakref import WeakKeyDictionary
+
+from bokeh.document.events import ModelChangedEvent, RootAddedEvent
+from bokeh.model import collect_models
+from bokeh.models import CustomJS, Div
+from bokeh.server.session import ServerSession
+from bokeh.server.views import doc_handler
+from tornado.ioloop import IOLoop
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+# Seconds after which held patches are sent even if the browser did
+# not report that the requested resources were loaded
+LOAD_TIMEOUT = 10
+
+# Loads the stylesheets and then the scripts one after another, since
+# scripts may depend on each other, and reports back by setting the
+# name of the loader to the id of the request
+LOADER_JS = """
+var request = JSON.parse(cb_obj.text);
+for (var i = 0; i < request.css.length; i++) {
+  var link = document.createElement('link');
+  link.rel = 'stylesheet';
+  link.type = 'text/css';
+  link.href = request.css[i];
+  document.head.appendChild(link);
+}
+function load(i) {
+  if (i >= request.js.length) {
+    cb_obj.name = request.id;
+    return;
+  }
+  var script = document.createElement('script');
+  script.src = request.js[i];
+  script.onload = script.onerror = function() { load(i+1); };
+  document.head.appendChild(script);
+}
+load(0);
+"""
+
+# Model classes of the Document whose page is currently rendered
+_rendering = threading.local()
+
+# Lazy loaders indexed by the Document they load resources for
+_loaders = WeakKeyDictionary()
+
+# External resources of model classes indexed by class
+_class_resources = {}
+
+_patched = False
+
+
+def _external(cls):
+    if cls not in _class_resources:
+        resources = []
+        for attr in ('__javascript__', '__css__'):
+            urls = getattr(cls, attr, None) or []
+            resources.append(tuple([urls] if isinstance(urls, str) else urls))
+        _class_resources[cls] = tuple(resources)
+    return _class_resources[cls]
+
+
+def _event_models(event):
+    if isinstance(event, RootAddedEvent):
+        return collect_models(event.model)
+    elif not isinstance(event, ModelChangedEvent) or event.hint is not None:
+        return []
+    descriptor = getattr(type(event.model), event.attr, None)
+    if not getattr(descriptor, 'has_ref', False):
+        return []
+    return collect_models(event.new)
+
+
+def _event_target(event):
+    model = getattr(event, 'model', getattr(event, 'column_source', None))
+    return None if model is None else model.id
+
+
+def _render_page(func):
+    @wraps(func)
+    def server_html_page_for_session(session, resources, *args, **kwargs):
+        from ..config import config
+        if not config.lazy_resources:
+            return func(session, resources, *args, **kwargs)
+        doc = session.document
+        classes = {type(model) for model in doc._all_models.values()}
+        _rendering.classes = classes
+        try:
+            page = func(session, resources, *args, **kwargs)
+        finally:
+            _rendering.classes = None
+        js, css = external_resources(classes)
+        _loaders[doc] = _LazyLoader(set(js) | set(css), set(doc._all_models))
+        doc.on_session_destroyed(_discard_loader)
+        return page
+    return server_html_page_for_session
+
+
+def _discard_loader(session_context):
+    loader = _loaders.pop(session_context._document, None)
+    if loader is not None and loader._timeout is not None:
+        IOLoop.current().remove_timeout(loader._timeout)
+        loader._timeout = None
+
+
+def _lazy_document_patched(method):
+    @wraps(method)
+    def _document_patched(self, event):
+        loader = _loaders.get(self.document)
+        if loader is None:
+            return method(self, event)
+        return loader.patched(self, event, method)
+    return _document_patched
+
+
+class _LazyLoader(object):
+    """
+    Holds back the patches of a session which add models whose
+    resources were not loaded when its page was rendered while the
+    browser loads the resources. Later patches modifying the held
+    models, or the models the held patches modify, are held back too
+    so they are applied in order, all other patches are sent
+    immediately. Neither the Document nor the loader model (which
+    references it) are held, so the Document can be collected once
+    its session is destroyed.
+    """
+
+    def __init__(self, loaded, known):
+        self.loaded = loaded
+        self.known = known
+        self.model_id = None
+        self._held = None
+        self._held_refs = set()
+        self._requested = ()
+        self._request_id = 0
+        self._timeout = None
+
+    def _missing(self, models):
+        js, css = external_resources({type(model) for model in models})
+        return ([url for url in js if url not in self.loaded],
+                [url for url in css if url not in self.loaded])
+
+    def _hold(self, event, models):
+        if self._held is None:
+            self._held, self._held_refs = [], set()
+        self._held.append(event)
+        self._held_refs.add(_event_target(event))
+        self._held_refs.update(model.id for model in models if model.id not in self.known)
+
+    def _send(self, session, send, event, models):
+        self.known.update(model.id for model in models)
+        send(session, event)
+
+    def _process(self, session, send, event):
+        """
+        Sends or holds back the event, returning the missing resources
+        if the event is the first to be held back.
+        """
+        target = _event_target(event)
+        models = _event_models(event)
+        js, css = self._missing(models)
+        if self._held is None:
+            if not (js or css):
+                self._send(session, send, event, models)
+                return None
+            self._hold(event, models)
+            return js, css
+        elif (js or css or target in self._held_refs or
+              any(model.id in self._held_refs for model in models)):
+            self._hold(event, models)
+        else:
+            self._send(session, send, event, models)
+        return None
+
+    def patched(self, session, event, send):
+        if self.model_id is not None and _event_target(event) == self.model_id:
+            return send(session, event)
+        request = self._process(session, send, event)
+        if request is not None:
+            session.document.add_next_tick_callback(
+                partial(self._request, session, send, *request))
+
+    def _request(self, session, send, js, css):
+        doc = session.document
+        if self.model_id is None:
+            model = Div(visible=False, js_property_callbacks={
+                'change:text': [CustomJS(code=LOADER_JS)]
+            })
+            model.on_change('name', partial(self._loaded, session, send))
+            self.model_id = model.id
+            doc.add_root(model)
+        else:
+            model = doc.get_model_by_id(self.model_id)
+        self._request_id += 1
+        self._requested = tuple(js) + tuple(css)
+        model.text = json.dumps({'id': str(self._request_id), 'js': js, 'css': css})
+        self._timeout = IOLoop.current().call_later(
+            LOAD_TIMEOUT, partial(self._expired, session, send, self._request_id)
+        )
+
+    def _loaded(self, session, send, attr, old, new):
+        if new == str(self._request_id):
+            self._flush(session, send)
+
+    def _expired(self, session, send, request_id):
+        if request_id != self._request_id or self._held is None:
+            return
+        log.warning("Browser did not report loading %s within %s seconds, "
+                    "sending held patches.", ', '.join(self._requested), LOAD_TIMEOUT)
+        session.document.add_next_tick_callback(partial(self._flush, session, send))
+
+    def _flush(self, session, send):
+        if self._timeout is not None:
+            IOLoop.current().remove_timeout(self._timeout)
+            self._timeout = None
+        self.loaded.update(self._requested)
+        self._requested = ()
+        held, self._held = self._held or [], None
+        self._held_refs = set()
+        request = None
+        for event in held:
+            request = self._process(session, send, event) or request
+        if request is not None:
+            self._request(session, send, *request)
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+def external_resources(classes):
+    """
+    Returns the URLs of the external JS and CSS resources required by
+    the supplied model classes.
+    """
+    js, css = [], []
+    for cls in sorted(classes, key=lambda cls: cls.__view_model__):
+        cls_js, cls_css = _external(cls)
+        js.extend(url for url in cls_js if url not in js)
+        css.extend(url for url in cls_css if url not in css)
+    return js, css
+
+
+def rendered_models():
+    """
+    Returns the model classes of the Document whose page is being
+    rendered, or None if resources are not loaded lazily.
+    """
+    return getattr(_rendering, 'classes', None)
+
+
+def install_lazy_loading():
+    """
+    Patches the bokeh server to only include the resources of the
+    models in the Document in each page and to load other resources
+    when they are first needed.
+    """
+    global _patched
+    if _patched:
+        return
+    doc_handler.server_html_page_for_session = _render_page(
+        doc_handler.server_html_page_for_session)
+    ServerSession._document_patched = _lazy_document_patched(ServerSession._document_patched)
+    _patched = True
@@ -0,0 +1,323 @@
+"""
+Collects operational metrics of a Panel server, e.g. the number of
+sessions, the messages exchanged with clients and the latency of
+callbacks, which are exposed by the MetricsHandler in the Prometheus
+text format and as JSON.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import os
+import sys
+import threading
+import time
+
+from functools import wraps
+from weakref import WeakSet
+
+from bokeh.server.contexts import ApplicationContext
+from bokeh.server.views.ws import WSHandler
+
+from .compression import websocket_compression
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+# Upper bounds of the buckets of the latency histograms in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Interval in seconds at which the lag of the IOLoop is sampled
+LOOP_LAG_INTERVAL = 1
+
+
+def _message_size(message):
+    nbytes = len(message.header_json) + len(message.metadata_json) + len(message.content_json)
+    for header, payload in message.buffers:
+        if not isinstance(header, str):
+            header = json.dumps(header)
+        nbytes += len(header) + len(payload)
+    return nbytes
+
+
+def _memory_usage():
+    """
+    Returns the resident memory of the process in bytes, falling back
+    to the peak resident memory where the current value is unknown.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _labels(**labels):
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('"', '\\"'))
+                             for k, v in labels.items())
+
+
+def _instrument_create_session(method):
+    @wraps(method)
+    async def create_session_if_needed(self, session_id, request=None, token=None):
+        new = session_id not in self._sessions and session_id not in self._pending_sessions
+        start = time.perf_counter()
+        session = await method(self, session_id, request, token)
+        if new and metrics.enabled:
+            metrics.record_session(time.perf_counter()-start)
+            metrics.monitor(self._loop)
+        return session
+    return create_session_if_needed
+
+
+def _instrument_receive(method):
+    @wraps(method)
+    async def _receive(self, fragment):
+        self._panel_bytes_in = getattr(self, '_panel_bytes_in', 0) + len(fragment)
+        message = await method(self, fragment)
+        if message is not None:
+            if metrics.enabled:
+                metrics.record_message('in', message.msgtype, self._panel_bytes_in)
+            self._panel_bytes_in = 0
+        return message
+    return _receive
+
+
+def _instrument_send(method):
+    @wraps(method)
+    async def send_message(self, message):
+        if metrics.enabled:
+            metrics.record_message('out', message.msgtype, _message_size(message))
+        return await method(self, message)
+    return send_message
+
+
+class Histogram(object):
+    """
+    Counts observed values in buckets with the supplied upper bounds.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+class Metrics(object):
+    """
+    Accumulates the metrics of the server(s) running in the process.
+    Nothing is recorded until enable is called, which happens when
+    a server is launched with metrics enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._patched = False
+        self._loops = WeakSet()
+        self.reset()
+
+    def enable(self):
+        """
+        Enables recording of metrics, instrumenting the bokeh server
+        classes which create sessions and exchange messages.
+        """
+        self.enabled = True
+        if self._patched:
+            return
+        ApplicationContext.create_session_if_needed = _instrument_create_session(
+            ApplicationContext.create_session_if_needed)
+        WSHandler._receive = _instrument_receive(WSHandler._receive)
+        WSHandler.send_message = _instrument_send(WSHandler.send_message)
+        self._patched = True
+
+    def monitor(self, io_loop):
+        """
+        Starts sampling the lag of the IOLoop, i.e. the delay between
+        the time a callback was scheduled for and when it actually ran.
+        """
+        if io_loop in self._loops:
+            return
+        self._loops.add(io_loop)
+
+        def sample(expected):
+            now = io_loop.time()
+            self.loop_lag = max(now - expected, 0)
+            self.loop_lag_max = max(self.loop_lag_max, self.loop_lag)
+            io_loop.call_at(now + LOOP_LAG_INTERVAL, sample, now + LOOP_LAG_INTERVAL)
+
+        io_loop.add_callback(lambda: sample(io_loop.time()))
+
+    def record_callback(self, kind, duration):
+        """
+        Records the time in seconds a callback of the given kind took.
+        """
+        with self._lock:
+            if kind not in self.callbacks:
+                self.callbacks[kind] = Histogram()
+            self.callbacks[kind].observe(duration)
+
+    def record_message(self, direction, msgtype, nbytes):
+        """
+        Records a message of the supplied type and size sent ('out')
+        to or received ('in') from a client.
+        """
+        with self._lock:
+            entry = self.messages.setdefault((direction, msgtype), [0, 0])
+            entry[0] += 1
+            entry[1] += nbytes
+
+    def record_session(self, duration):
+        """
+        Records the creation of a session which took the supplied
+        time in seconds.
+        """
+        with self._lock:
+            self.sessions_created += 1
+            self.session_latency.observe(duration)
+
+    def reset(self):
+        """
+        Discards all recorded metrics.
+        """
+        with self._lock:
+            self.sessions_created = 0
+            self.session_latency = Histogram()
+            self.messages = {}
+            self.callbacks = {}
+            self.loop_lag = 0.
+            self.loop_lag_max = 0.
+
+    def to_dict(self, applications={}):
+        """
+        Returns the metrics as a JSON serializable dictionary.
+
+        Arguments
+        ---------
+        applications: dict
+          Mapping from app URL to bokeh ApplicationContext used to
+          report the active sessions of each app.
+        """
+        def histogram(hist):
+            return {
+                'buckets': dict(zip([str(b) for b in hist.buckets], hist.cumulative())),
+                'count': hist.count,
+                'sum': hist.sum
+            }
+
+        with self._lock:
+            data = {
+                'sessions': {
+                    'active': {app: len(context.sessions) for app, context in applications.items()},
+                    'created': self.sessions_created,
+                    'creation_seconds': histogram(self.session_latency)
+                },
+                'messages': [
+                    {'direction': direction, 'msgtype': msgtype, 'count': count, 'bytes': nbytes}
+                    for (direction, msgtype), (count, nbytes) in sorted(self.messages.items())
+                ],
+                'callbacks': {kind: histogram(hist) for kind, hist in sorted(self.callbacks.items())},
+                'ioloop_lag_seconds': {'last': self.loop_lag, 'max': self.loop_lag_max},
+                'memory_bytes': _memory_usage()
+            }
+        if websocket_compression.enabled:
+            data['compression'] = websocket_compression.stats()['totals']
+        return data
+
+    def to_prometheus(self, applications={}):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+
+        Arguments
+        ---------
+        applications: dict
+          Mapping from app URL to bokeh ApplicationContext used to
+          report the active sessions of each app.
+        """
+        data = self.to_dict(applications)
+        lines = []
+
+        def metric(name, kind, doc, samples):
+            lines.append('# HELP %s %s' % (name, doc))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for suffix, labels, value in samples:
+                lines.append('%s%s%s %s' % (name, suffix, _labels(**labels) if labels else '', value))
+
+        def histogram(hist, **labels):
+            samples = [('_bucket', dict(labels, le=le), count)
+                       for le, count in hist['buckets'].items()]
+            samples += [('_bucket', dict(labels, le='+Inf'), hist['count']),
+                        ('_count', labels, hist['count']),
+                        ('_sum', labels, hist['sum'])]
+            return samples
+
+        sessions = data['sessions']
+        metric('panel_sessions_active', 'gauge', 'Number of open sessions.',
+               [('', {'app': app}, count) for app, count in sessions['active'].items()])
+        metric('panel_sessions_created_total', 'counter', 'Number of sessions created.',
+               [('', {}, sessions['created'])])
+        metric('panel_session_creation_seconds', 'histogram', 'Time taken to create a session.',
+               histogram(sessions['creation_seconds']))
+        for field, name, doc in (('count', 'panel_messages_total', 'Number of websocket messages.'),
+                                 ('bytes', 'panel_message_bytes_total', 'Size of websocket messages.')):
+            metric(name, 'counter', doc, [
+                ('', {'direction': msg['direction'], 'msgtype': msg['msgtype']}, msg[field])
+                for msg in data['messages']
+            ])
+        metric('panel_callback_seconds', 'histogram', 'Time taken to run callbacks.',
+               [s for kind, hist in data['callbacks'].items() for s in histogram(hist, kind=kind)])
+        metric('panel_ioloop_lag_seconds', 'gauge', 'Last sampled delay of the IOLoop.',
+               [('', {}, data['ioloop_lag_seconds']['last'])])
+        metric('panel_ioloop_lag_max_seconds', 'gauge', 'Largest sampled delay of the IOLoop.',
+               [('', {}, data['ioloop_lag_seconds']['max'])])
+        if 'compression' in data:
+            compression = data['compression']
+            metric('panel_websocket_compressed_messages', 'gauge',
+                   'Number of compressed websocket messages of open connections.',
+                   [('', {}, compression['compressed'])])
+            metric('panel_websocket_compression_bytes', 'gauge',
+                   'Size of websocket messages of open connections before '
+                   'and after compression.',
+                   [('', {'stage': 'in'}, compression['bytes_in']),
+                    ('', {'stage': 'out'}, compression['bytes_out'])])
+            metric('panel_websocket_compression_seconds', 'gauge',
+                   'Time spent compressing websocket messages of open connections.',
+                   [('', {}, compression['compress_seconds'])])
+        if data['memory_bytes'] is not None:
+            metric('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes.',
+                   [('', {}, data['memory_bytes'])])
+        return '\n'.join(lines) + '\n'
+
+
+# The global Metrics of all servers in the process
+metrics = Metrics()
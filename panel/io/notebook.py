@@ -5,6 +5,7 @@ inside the Jupyter notebook.
 from __future__ import absolute_import, division, unicode_literals
 
 import json
+import time
 import uuid
 
 from contextlib import contextmanager
@@ -40,6 +41,7 @@ from .model import add_to_doc, diff
 from .resources import _env
 from .server import _server_url, _origin_url, get_server
 from .state import state
+from .stats import stats
 
 
 #---------------------------------------------------------------------
@@ -54,15 +56,21 @@ def push(doc, comm, binary=True):
     """
     Pushes events stored on the document across the provided comm.
     """
+    start = time.perf_counter()
     msg = diff(doc, binary=binary)
     if msg is None:
         return
     comm.send(msg.header_json)
     comm.send(msg.metadata_json)
     comm.send(msg.content_json)
+    nbytes = len(msg.header_json) + len(msg.metadata_json) + len(msg.content_json)
     for header, payload in msg.buffers:
-        comm.send(json.dumps(header))
+        header = json.dumps(header)
+        comm.send(header)
         comm.send(buffers=[payload])
+        nbytes += len(header) + len(payload)
+    if stats.enabled:
+        stats.record('Document', 'push', time.perf_counter()-start, nbytes)
 
 DOC_NB_JS = _env.get_template("doc_nb_js.js")
 AUTOLOAD_NB_JS = _env.get_template("autoload_panel_js.js")
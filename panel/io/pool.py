@@ -0,0 +1,212 @@
+"""
+Pools of Documents prepared ahead of time for apps served with a
+DocumentPool, so that a new session claims an already rendered
+Document instead of building the app before the first response.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import logging
+import time
+
+from collections import deque
+from functools import wraps
+from weakref import WeakKeyDictionary
+
+from bokeh.document import Document
+from bokeh.server.contexts import (
+    ApplicationContext, BokehSessionContext, _RequestProxy
+)
+from bokeh.server.session import ServerSession
+from bokeh.util.token import get_token_payload
+from tornado.httputil import HTTPServerRequest
+
+from .metrics import _memory_usage
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+# DocumentPools indexed by the ApplicationContext they serve
+_pools = WeakKeyDictionary()
+
+_patched = False
+
+
+def _pooled_create_session(method):
+    @wraps(method)
+    async def create_session_if_needed(self, session_id, request=None, token=None):
+        pool = _pools.get(self)
+        if (pool is None or not session_id or session_id in self._sessions or
+            session_id in self._pending_sessions):
+            return await method(self, session_id, request, token)
+        prepared = pool.claim()
+        if prepared is None:
+            return await method(self, session_id, request, token)
+        doc, session_context = prepared
+        session_context._id = session_id
+        if request is not None:
+            payload = get_token_payload(token) if token else {}
+            session_context._request = _RequestProxy(
+                request, cookies=payload.get('cookies'), headers=payload.get('headers')
+            )
+        session_context._token = token
+        # Unlike bokeh the hooks run after the Document was built,
+        # once the session id and request are known
+        try:
+            await self._application.on_session_created(session_context)
+        except Exception as e:
+            log.error("Failed to run session creation hooks %r", e, exc_info=True)
+        session = ServerSession(session_id, doc, io_loop=self._loop, token=token)
+        self._sessions[session_id] = session
+        session_context._set_session(session)
+        self._session_contexts[session_id] = session_context
+        return session
+    return create_session_if_needed
+
+
+def _install_hooks():
+    global _patched
+    if _patched:
+        return
+    ApplicationContext.create_session_if_needed = _pooled_create_session(
+        ApplicationContext.create_session_if_needed)
+    _patched = True
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+class DocumentPool(object):
+    """
+    Keeps a number of Documents of an app rendered ahead of time.
+    Each new session claims a prepared Document and the pool is
+    refilled on the IOLoop afterwards, one Document per iteration so
+    that other requests are served in between.
+
+    Since a Document is built before the session it is assigned to
+    exists, apps served from a pool must not depend on the request,
+    e.g. on pn.state.session_args, cookies or headers, which are empty
+    while the app is built.
+
+    For the same reason sessions are created in a different order
+    than by bokeh: the on_session_created hooks of the app (e.g. in
+    a server_lifecycle.py) run *after* the app was built, when a
+    session claims the Document, since only then the session id and
+    request are known. Hooks must therefore not prepare state the
+    app reads while it is built.
+
+    Arguments
+    ---------
+    size: int
+      Number of Documents to keep prepared
+    max_age: float or None
+      Age in seconds after which unclaimed Documents are discarded
+      and rebuilt, e.g. to pick up new data
+    max_memory: int or None
+      Resident memory of the process in bytes above which no new
+      Documents are prepared
+    """
+
+    def __init__(self, size=1, max_age=None, max_memory=None):
+        self.size = size
+        self.max_age = max_age
+        self.max_memory = max_memory
+        self._context = None
+        self._io_loop = None
+        self._prefix = ''
+        self._docs = deque()
+        self._scheduled = False
+        self._timeout = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def attach(self, context, io_loop, prefix=''):
+        """
+        Starts filling the pool with Documents of the app served by
+        the supplied bokeh ApplicationContext.
+        """
+        _install_hooks()
+        _pools[context] = self
+        self._context = context
+        self._io_loop = io_loop
+        self._prefix = prefix
+        self._schedule()
+
+    def claim(self):
+        """
+        Returns a prepared Document and its provisional session
+        context, or None if the pool is empty.
+        """
+        self._expire()
+        prepared = self._docs.popleft()[1:] if self._docs else None
+        self._schedule()
+        return prepared
+
+    def clear(self):
+        """
+        Discards all prepared Documents.
+        """
+        while self._docs:
+            self._discard(*self._docs.popleft()[1:])
+
+    def _schedule(self):
+        if not self._scheduled and self._io_loop is not None:
+            self._scheduled = True
+            self._io_loop.add_callback(self._refill)
+
+    def _expire(self):
+        if self.max_age is None:
+            return
+        now = time.monotonic()
+        while self._docs and now - self._docs[0][0] > self.max_age:
+            self._discard(*self._docs.popleft()[1:])
+
+    def _refill(self):
+        self._scheduled = False
+        self._expire()
+        if self._timeout is not None:
+            self._io_loop.remove_timeout(self._timeout)
+            self._timeout = None
+        if self.max_age is not None and self._docs:
+            delay = self.max_age - (time.monotonic() - self._docs[0][0])
+            self._timeout = self._io_loop.call_later(max(delay, 0), self._schedule)
+        if len(self._docs) >= self.size:
+            return
+        memory = _memory_usage() if self.max_memory is not None else None
+        if memory is not None and memory > self.max_memory:
+            log.warning("Not preparing Document for %s, memory usage of %d bytes "
+                        "exceeds limit of %d bytes.", self._context.url, memory,
+                        self.max_memory)
+            return
+        try:
+            self._docs.append((time.monotonic(),) + self._prepare())
+        except Exception as e:
+            log.error("Failed to prepare Document for %s: %r", self._context.url, e,
+                      exc_info=True)
+            return
+        self._schedule()
+
+    def _prepare(self):
+        context = self._context
+        doc = Document()
+        session_context = BokehSessionContext(
+            None, context.server_context, doc, logout_url=context._logout_url
+        )
+        url = self._prefix + ('' if context.url == '/' else context.url)
+        session_context._request = _RequestProxy(HTTPServerRequest(uri=url or '/'))
+        doc._session_context = session_context
+        doc._with_self_as_curdoc(
+            lambda: context._application.initialize_document(doc)
+        )
+        return doc, session_context
+
+    def _discard(self, doc, session_context):
+        for callback in list(doc.session_destroyed_callbacks):
+            try:
+                callback(session_context)
+            except Exception as e:
+                log.error("Failed to discard prepared Document: %r", e, exc_info=True)
+        doc.clear()
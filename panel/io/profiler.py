@@ -0,0 +1,222 @@
+"""
+Profiles a running Panel server using cProfile, either across all
+activity on the server for a number of seconds or around the creation
+and callbacks of the next session of an app. Profiles are exported in
+the pstats format or as folded stacks which can be rendered by
+flamegraph tools such as flamegraph.pl or speedscope.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import asyncio
+import cProfile
+import marshal
+import os
+import threading
+
+from collections import defaultdict
+from functools import wraps
+from weakref import WeakKeyDictionary
+
+from bokeh.document import Document
+from bokeh.server.contexts import ApplicationContext
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+# Profiles of the sessions currently being profiled indexed by document
+_session_profiles = WeakKeyDictionary()
+
+# Profiles waiting for the next session of an app, indexed by app URL
+_pending_profiles = {}
+
+# Only a single profiler may be active at a time
+_profile_lock = threading.Lock()
+
+_patched = False
+
+# Fraction of the total time below which call paths are not folded
+FOLDED_THRESHOLD = 0.0001
+
+
+class _SessionProfile(object):
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.created = asyncio.get_event_loop().create_future()
+        self.session_id = None
+        self._depth = 0
+
+    def __enter__(self):
+        if not self._depth:
+            self.profile.enable()
+        self._depth += 1
+
+    def __exit__(self, *args):
+        self._depth -= 1
+        if not self._depth:
+            self.profile.disable()
+
+
+def _profile_create_session(method):
+    @wraps(method)
+    async def create_session_if_needed(self, session_id, request=None, token=None):
+        profile = None
+        if session_id not in self._sessions and session_id not in self._pending_sessions:
+            profile = _pending_profiles.pop(self.url, None)
+        if profile is None:
+            return await method(self, session_id, request, token)
+        with profile:
+            session = await method(self, session_id, request, token)
+        profile.session_id = session_id
+        _session_profiles[session.document] = profile
+        profile.created.set_result(session)
+        return session
+    return create_session_if_needed
+
+
+def _profile_callback(method):
+    @wraps(method)
+    def _with_self_as_curdoc(self, f):
+        profile = _session_profiles.get(self)
+        if profile is None:
+            return method(self, f)
+        with profile:
+            return method(self, f)
+    return _with_self_as_curdoc
+
+
+def _install_hooks():
+    global _patched
+    if _patched:
+        return
+    ApplicationContext.create_session_if_needed = _profile_create_session(
+        ApplicationContext.create_session_if_needed)
+    Document._with_self_as_curdoc = _profile_callback(Document._with_self_as_curdoc)
+    _patched = True
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name.replace(';', ':')
+    return ('%s:%d(%s)' % (os.path.basename(filename), line, name)).replace(';', ':')
+
+
+def _folded_stacks(stats):
+    """
+    Converts pstats to folded stacks, attributing the time spent in
+    a function to its callers in proportion to the cumulative time
+    of each call edge, since cProfile only records direct callers.
+    """
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+    total = sum(tt for _, _, tt, _, _ in stats.values()) or 1
+    folded = defaultdict(float)
+
+    def visit(func, stack, path, scale):
+        tt, ct = stats[func][2:4]
+        stack = stack + [_label(func)]
+        if tt:
+            folded[';'.join(stack)] += tt * scale
+        for callee, edge_time in callees[func].items():
+            callee_time = stats[callee][3]
+            if callee in path or not callee_time:
+                continue
+            fraction = scale * edge_time / callee_time
+            if fraction * callee_time / total >= FOLDED_THRESHOLD:
+                visit(callee, stack, path | {callee}, fraction)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            visit(func, [], {func}, 1)
+    return ''.join('%s %d\n' % (stack, round(t*1e6))
+                   for stack, t in sorted(folded.items()) if round(t*1e6))
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+# Supported export formats mapped to their file extension
+PROFILE_FORMATS = {'pstats': 'prof', 'flamegraph': 'folded'}
+
+
+class ProfilerBusy(Exception):
+    """
+    Raised when a profile is requested while another is running.
+    """
+
+
+def export_profile(profile, fmt='pstats'):
+    """
+    Exports a cProfile.Profile in one of the PROFILE_FORMATS.
+
+    Arguments
+    ---------
+    profile: cProfile.Profile
+      The profile to export
+    fmt: str
+      Either 'pstats', the binary format read by pstats.Stats and
+      snakeviz, or 'flamegraph', the folded stacks read by
+      flamegraph.pl and speedscope
+
+    Returns
+    -------
+    The exported profile as bytes
+    """
+    if fmt not in PROFILE_FORMATS:
+        raise ValueError('Profile format must be one of %s, not %r.'
+                         % (', '.join(map(repr, PROFILE_FORMATS)), fmt))
+    profile.create_stats()
+    if fmt == 'pstats':
+        return marshal.dumps(profile.stats)
+    return _folded_stacks(profile.stats).encode('utf-8')
+
+
+async def profile_server(seconds):
+    """
+    Profiles all activity on the IOLoop thread for the given number
+    of seconds.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy('Another profile is already running.')
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+    finally:
+        _profile_lock.release()
+    return profile
+
+
+async def profile_session(app, seconds, timeout=60):
+    """
+    Profiles the creation of the next session of the app served at
+    the supplied URL and its callbacks for the given number of
+    seconds after it was created.
+
+    Returns
+    -------
+    The profile and the id of the profiled session.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy('Another profile is already running.')
+    try:
+        _install_hooks()
+        profile = _pending_profiles[app] = _SessionProfile()
+        try:
+            session = await asyncio.wait_for(asyncio.shield(profile.created), timeout)
+        finally:
+            _pending_profiles.pop(app, None)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            _session_profiles.pop(session.document, None)
+    finally:
+        _profile_lock.release()
+    return profile.profile, profile.session_id
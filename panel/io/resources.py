@@ -1,16 +1,156 @@
 """
 Patches bokeh resources to make it easy to add external JS and CSS
 resources via the panel.config object.
+
+Local resource files are cached until they are modified. On a server
+the local CSS configured when the server is started, which would
+otherwise be inlined into every page, is bundled into a content
+hashed file served by the ResourceHandler, which browsers cache
+indefinitely.
 """
 from __future__ import absolute_import, division, unicode_literals
 
+import gzip
+import hashlib
 import json
 import os
+import threading
+
 from collections import OrderedDict
 
-from bokeh.resources import Resources
+from bokeh.resources import BaseResources, Resources
 from jinja2 import Environment, Markup, FileSystemLoader
 
+from .lazy import external_resources, rendered_models
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+# Contents of local resource files indexed by path, along with the
+# modification time and size of the file when it was read
+_file_cache = {}
+
+# Precompressed CSS bundles indexed by their file name
+_bundles = OrderedDict()
+
+# Names of the bundles indexed by the CSS they contain
+_bundle_names = {}
+
+# Maximum number of bundles kept, old bundles are discarded first
+MAX_BUNDLES = 32
+
+_bundle_lock = threading.Lock()
+
+# Local CSS configured when the server was started and its bundle
+_static_css = ()
+_static_bundle = None
+
+
+def _read(path):
+    """
+    Returns the contents of a file, reading it only if it has been
+    modified since it was last read.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_cache.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, 'rb') as f:
+            cached = _file_cache[path] = (key, f.read().decode('utf-8'))
+    return cached[1]
+
+
+def _inline(path):
+    begin = "/* BEGIN %s */" % os.path.basename(path)
+    end = "/* END %s */" % os.path.basename(path)
+    return "%s\n%s\n%s" % (begin, _read(path), end)
+
+
+def _compress(content):
+    variants = {'identity': content, 'gzip': gzip.compress(content, 9)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['br'] = brotli.compress(content)
+    return variants
+
+
+def _bundle(raw):
+    """
+    Registers the CSS as a bundle, precompressed with gzip and, if
+    available, brotli, returning the file name of the bundle, which
+    is derived from the hash of its contents.
+    """
+    raw = tuple(raw)
+    name = _bundle_names.get(raw)
+    if name is not None and name in _bundles:
+        return name
+    content = '\n'.join(raw).encode('utf-8')
+    name = 'panel-%s.css' % hashlib.sha256(content).hexdigest()[:20]
+    with _bundle_lock:
+        if name not in _bundles:
+            _bundles[name] = _compress(content)
+            while len(_bundles) > MAX_BUNDLES:
+                _bundles.popitem(last=False)
+        _bundle_names.clear()
+        _bundle_names[raw] = name
+    return name
+
+
+def _exclude_unused(resources, files, attr):
+    """
+    Removes the external resources of models which are not used by
+    the Document whose page is being rendered.
+    """
+    classes = rendered_models()
+    if classes is None:
+        return files
+    js, css = external_resources(classes)
+    used = js if attr == '__javascript__' else css
+    unused = set(resources._collect_external_resources(attr)) - set(used)
+    return [f for f in files if f not in unused]
+
+
+def _local_css():
+    from ..config import config
+    return [_read(cssf) for cssf in config.css_files if os.path.isfile(cssf)] + config.raw_css
+
+
+def _bundle_static_css():
+    """
+    Bundles the local CSS configured when a server is started, which
+    all processes of the server share. CSS added later, e.g. by the
+    sessions of a process, is inlined into the pages instead.
+    """
+    global _static_css, _static_bundle
+    _static_css = tuple(_local_css())
+    _static_bundle = _bundle(_static_css) if _static_css else None
+
+
+def _server_css():
+    """
+    Returns the name of the bundle of the static CSS, if all of it is
+    still configured, and the remaining local CSS to inline.
+    """
+    local = _local_css()
+    if _static_bundle is None or any(css not in local for css in _static_css):
+        return None, local
+    return _static_bundle, [css for css in local if css not in _static_css]
+
+
+def _lookup_bundle(name):
+    """
+    Returns the bundle with the supplied name, if it is registered.
+    """
+    return _bundles.get(name)
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
 
 def get_env():
     ''' Get the correct Jinja2 Environment, also for frozen scripts.
@@ -19,32 +159,33 @@ def get_env():
     return Environment(loader=FileSystemLoader(local_path))
 
 def css_raw(self):
-    from ..config import config
     raw = super(Resources, self).css_raw
-    for cssf in config.css_files:
-        if not os.path.isfile(cssf):
-            continue
-        with open(cssf) as f:
-            raw.append(f.read())
-    return raw + config.raw_css
+    if self.mode == 'server':
+        return raw + _server_css()[1]
+    return raw + _local_css()
 
 def js_files(self):
     from ..config import config
-    files = super(Resources, self).js_files
+    files = _exclude_unused(self, super(Resources, self).js_files, '__javascript__')
     return files + list(config.js_files.values())
 
 def css_files(self):
     from ..config import config
-    files = super(Resources, self).css_files
+    files = _exclude_unused(self, super(Resources, self).css_files, '__css__')
     for cssf in config.css_files:
         if os.path.isfile(cssf):
             continue
         files.append(cssf)
+    if self.mode == 'server':
+        bundle, _ = _server_css()
+        if bundle:
+            files.append('%spanel_resources/%s' % (self.root_url, bundle))
     return files
 
 def conffilter(value):
     return json.dumps(OrderedDict(value)).replace('"', '\'')
 
+BaseResources._inline = staticmethod(_inline)
 Resources.css_raw = property(css_raw)
 Resources.js_files = property(js_files)
 Resources.css_files = property(css_files)
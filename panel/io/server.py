@@ -3,24 +3,49 @@ Utilities for creating bokeh Server instances.
 """
 from __future__ import absolute_import, division, unicode_literals
 
+import asyncio
+import hashlib
+import hmac
+import io
+import json
+import logging
+import mimetypes
 import os
+import re
 import signal
 import sys
+import tempfile
 import threading
+import time
 import uuid
 
 from contextlib import contextmanager
 from functools import partial
 from types import FunctionType
+from urllib.parse import quote, unquote
 
 from bokeh.document.events import ModelChangedEvent
 from bokeh.server.server import Server
+from tornado import httputil
+from tornado.ioloop import IOLoop
+from tornado.process import task_id
 from tornado.websocket import WebSocketHandler
-from tornado.web import RequestHandler
+from tornado.web import HTTPError, RequestHandler
 from tornado.wsgi import WSGIContainer
 
+from .compression import websocket_compression
+from .lazy import install_lazy_loading
+from .metrics import _message_size, metrics as _metrics
+from .pool import DocumentPool
+from .resources import _bundle_static_css, _lookup_bundle
+from .sessions import session_reaper, session_report
+from .shared import SharedCache
+from .profiler import (
+    PROFILE_FORMATS, ProfilerBusy, export_profile, profile_server, profile_session
+)
 from .state import state
 
+log = logging.getLogger(__name__)
 
 #---------------------------------------------------------------------
 # Private API
@@ -28,6 +53,17 @@ from .state import state
 
 INDEX_HTML = os.path.join(os.path.dirname(__file__), '..', '_templates', "index.html")
 
+# Maximum total size in bytes of the assets held in memory by the
+# AssetHandler, beyond it the least recently used assets are discarded
+# even if the sessions which registered them are still alive
+ASSET_CACHE_BYTES = 512 * 1024**2
+
+# Size in bytes above which uploads are spooled to disk
+UPLOAD_SPOOL_SIZE = 10 * 1024**2
+
+# Default maximum size in bytes of a file uploaded in chunks
+UPLOAD_MAX_SIZE = 1024**3
+
 def _origin_url(url):
     if url.startswith("http"):
         url = url.split("//")[1]
@@ -40,12 +76,174 @@ def _server_url(url, port):
     else:
         return 'http://%s:%d%s' % (url.split(':')[0], port, "/")
 
+def _server_prefix(doc):
+    """
+    Returns the URL prefix the document's app is served on, using an
+    absolute URL if the app is embedded using autoload.js.
+    """
+    session_context = doc.session_context
+    request = getattr(session_context.request, '_request', None)
+    path = (getattr(request, 'path', None) or '').rstrip('/')
+    autoload = path.endswith('/autoload.js')
+    for suffix in ('/autoload.js', '/ws'):
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+    url = (session_context.server_context.application_context.url or '').rstrip('/')
+    if url and path.endswith(url):
+        path = path[:-len(url)]
+    if autoload:
+        path = '%s://%s%s' % (request.protocol, request.host, path)
+    return path
+
+
+def session_routes(doc):
+    """
+    Whether the document may use the routes registered per session,
+    i.e. assets, downloads, uploads and streams. Their registries
+    only exist in the memory of the process which registered them,
+    so when a server forks multiple worker processes, which do not
+    route requests to a particular worker, components embed their
+    data in the document instead.
+    """
+    return doc is not None and bool(doc.session_context) and task_id() is None
+
+
+def _asset_size(asset):
+    return 0 if isinstance(asset, FileAsset) else len(asset)
+
+
+def _release_assets(doc, session_context):
+    """
+    Discards the assets of a destroyed session which are not used by
+    any other session.
+    """
+    for key in state._asset_sessions.pop(doc, ()):
+        refs = state._asset_refs.pop(key, 1) - 1
+        if refs:
+            state._asset_refs[key] = refs
+            continue
+        asset = state._assets.pop(key, None)
+        if asset is not None:
+            state._asset_bytes -= _asset_size(asset)
+
+
+def _register_asset(key, asset, doc):
+    keys = state._asset_sessions.get(doc)
+    if keys is None:
+        keys = state._asset_sessions[doc] = set()
+        doc.on_session_destroyed(partial(_release_assets, doc))
+    if key not in keys:
+        keys.add(key)
+        state._asset_refs[key] = state._asset_refs.get(key, 0) + 1
+    if key in state._assets:
+        state._assets.move_to_end(key)
+    else:
+        state._assets[key] = asset
+        state._asset_bytes += _asset_size(asset)
+        while state._asset_bytes > ASSET_CACHE_BYTES and len(state._assets) > 1:
+            _, discarded = state._assets.popitem(last=False)
+            state._asset_bytes -= _asset_size(discarded)
+    return '%s/panel_assets/%s' % (_server_prefix(doc), key)
+
+
+def asset_url(data, extension, doc):
+    """
+    Registers the data with the AssetHandler and returns the URL it
+    is served on. Assets are indexed by content hash so identical
+    data is only held once, irrespective of how many sessions
+    display it, and are discarded once no session uses them.
+    """
+    key = '%s.%s' % (hashlib.md5(data).hexdigest(), extension)
+    return _register_asset(key, data, doc)
+
+
+def file_url(path, doc):
+    """
+    Registers a local file with the AssetHandler and returns the URL
+    it is served on. The file is streamed from disk when requested
+    and is indexed by its path, size and modification time, once the
+    file is modified the URL is no longer served.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    fingerprint = '%s:%d:%d' % (path, stat.st_size, stat.st_mtime_ns)
+    extension = os.path.splitext(path)[1]
+    key = hashlib.md5(fingerprint.encode('utf-8')).hexdigest() + extension
+    return _register_asset(key, FileAsset(path, stat.st_size, stat.st_mtime_ns), doc)
+
+
+def _clear_tokens(doc, session_context):
+    for registry, token in state._session_tokens.pop(doc, []):
+        registry.pop(token, None)
+
+
+def _register_token(registry, value, doc):
+    """
+    Adds the value to a registry under a new token, which is
+    discarded when the session of the document is destroyed.
+    """
+    token = uuid.uuid4().hex
+    registry[token] = value
+    if doc not in state._session_tokens:
+        state._session_tokens[doc] = []
+        doc.on_session_destroyed(partial(_clear_tokens, doc))
+    state._session_tokens[doc].append((registry, token))
+    return token
+
+
+def download_url(source, filename, mime_type, doc):
+    """
+    Registers a download with the DownloadHandler and returns the
+    tokenized URL it is served on. The source may be a file path, a
+    file-like object or an iterator of chunks, which is only served
+    once. Downloads are discarded when the session is destroyed.
+    """
+    position = source.tell() if hasattr(source, 'seekable') and source.seekable() else None
+    download = (source, filename, mime_type, position)
+    token = _register_token(state._downloads, download, doc)
+    return '%s/panel_download/%s' % (_server_prefix(doc), token)
+
+
+def discard_download(url):
+    """
+    Discards a download previously registered using download_url.
+    """
+    if url and '/panel_download/' in url:
+        state._downloads.pop(url.split('/')[-1], None)
+
+
+def upload_url(callback, doc, max_size=None):
+    """
+    Registers a callback with the UploadHandler and returns the
+    tokenized URL files are uploaded to in chunks. The callback is
+    scheduled on the document after each chunk, with the filename,
+    mime type, the file the upload is spooled to, and the number of
+    bytes received out of the total size. Uploads larger than
+    max_size bytes (default UPLOAD_MAX_SIZE) are rejected.
+    """
+    upload = {'callback': callback, 'doc': doc, 'file': None, 'total': None,
+              'max_size': max_size}
+    token = _register_token(state._uploads, upload, doc)
+    return '%s/panel_upload/%s' % (_server_prefix(doc), token)
+
+
+def stream_url(callback, doc):
+    """
+    Registers a callback with the StreamHandler and returns the
+    tokenized URL the frontend may POST binary messages to. The
+    callback is invoked on the IOLoop with the body and headers of
+    each request and should return quickly.
+    """
+    token = _register_token(state._streams, callback, doc)
+    return '%s/panel_stream/%s' % (_server_prefix(doc), token)
+
+
 def _eval_panel(panel, server_id, title, location, doc):
     from ..template import BaseTemplate
     from ..pane import panel as as_panel
 
     if isinstance(panel, FunctionType):
-        panel = panel()
+        panel = doc._with_self_as_curdoc(panel)
     if isinstance(panel, BaseTemplate):
         return panel._modify_doc(server_id, title, doc, location)
     return as_panel(panel)._modify_doc(server_id, title, doc, location)
@@ -63,7 +261,7 @@ def unlocked():
     on current sessions.
     """
     curdoc = state.curdoc
-    if curdoc is None or curdoc.session_context is None:
+    if curdoc is None or curdoc.session_context is None or curdoc.session_context.session is None:
         yield
         return
     connections = curdoc.session_context.session._subscribed_connections
@@ -92,6 +290,8 @@ def unlocked():
                     for header, payload in msg._buffers:
                         WebSocketHandler.write_message(socket, header)
                         WebSocketHandler.write_message(socket, payload, binary=True)
+                    if _metrics.enabled:
+                        _metrics.record_message('out', msg.msgtype, _message_size(msg))
                 elif event not in events:
                     events.append(event)
         curdoc._held_events = events
@@ -101,7 +301,11 @@ def unlocked():
 
 
 def serve(panels, port=0, websocket_origin=None, loop=None, show=True,
-          start=True, title=None, verbose=True, location=True, **kwargs):
+          start=True, title=None, verbose=True, location=True,
+          metrics=False, profiler=False, pool=None, num_procs=1,
+          session_idle_timeout=None, session_max_age=None,
+          compression_level=None, compression_min_size=1024,
+          sessions_report=False, **kwargs):
     """
     Allows serving one or more panel objects on a single server.
     The panels argument should be either a Panel object or a function
@@ -138,11 +342,60 @@ def serve(panels, port=0, websocket_origin=None, loop=None, show=True,
     location : boolean or panel.io.location.Location
       Whether to create a Location component to observe and
       set the URL location.
+    metrics : boolean (optional, default=False)
+      Whether to collect server metrics and serve them at /metrics
+      (Prometheus format) and /metrics.json
+    profiler : boolean or str (optional, default=False)
+      Whether to enable the /panel_profile route, which profiles the
+      server on demand. If a string is supplied it is used as the
+      token required to access the route, otherwise a random token
+      is generated. The URL including the token is always logged and
+      printed if verbose.
+    pool : int or {str: int or dict} (optional, default=None)
+      Number of Documents of each app to render ahead of time, so
+      new sessions do not wait for the app to be built, or a
+      dictionary mapping from the URL slug of an app to the number
+      of Documents or to a dictionary of DocumentPool options, i.e.
+      size, max_age and max_memory. Pooled apps must not depend on
+      the request and their on_session_created hooks run after the
+      app was built.
+    num_procs : int (optional, default=1)
+      Number of worker processes to fork, sharing the listening socket
+      and state.cache; 0 starts one per CPU. The launching process
+      supervises the workers and restarts those that crash. Cannot
+      be combined with an explicit loop and is not supported on
+      Windows. Requests are not routed to a particular worker, i.e.
+      there is no session affinity, /metrics and /panel_sessions
+      only report the worker answering the request and components
+      embed their data in the document instead of serving it from
+      per-session routes.
+    session_idle_timeout : float (optional, default=None)
+      Number of seconds after which sessions without a live
+      connection are destroyed, i.e. whose clients neither sent a
+      message nor answered a ping, e.g. because they disappeared
+      without closing the connection
+    session_max_age : float (optional, default=None)
+      Number of seconds after which sessions are destroyed
+    compression_level : int (optional, default=None)
+      Enables permessage-deflate compression of websocket messages
+      with the given zlib compression level (1-9). Whether a message
+      is compressed is decided per connection based on the ratio
+      and CPU time measured on previous messages.
+    compression_min_size : int (optional, default=1024)
+      Size in bytes below which messages are never compressed
+    sessions_report : boolean or str (optional, default=False)
+      Whether to enable the /panel_sessions route, which reports the
+      open sessions with their estimated memory usage. If a string
+      is supplied it is used as the token required to access the
+      route, otherwise a random token is generated, which is logged
+      like the profiler token.
     kwargs: dict
       Additional keyword arguments to pass to Server instance
     """
     return get_server(panels, port, websocket_origin, loop, show, start,
-                      title, verbose, location, **kwargs)
+                      title, verbose, location, metrics, profiler, pool, num_procs,
+                      session_idle_timeout, session_max_age, compression_level,
+                      compression_min_size, sessions_report, **kwargs)
 
 
 class ProxyFallbackHandler(RequestHandler):
@@ -162,9 +415,386 @@ class ProxyFallbackHandler(RequestHandler):
         self.on_finish()
 
 
+class FileAsset(str):
+    """
+    Path to a local file registered with the AssetHandler, along with
+    the size and modification time of the file when it was registered.
+    """
+
+    def __new__(cls, path, size, mtime):
+        asset = super(FileAsset, cls).__new__(cls, path)
+        asset.size = size
+        asset.mtime = mtime
+        return asset
+
+    def modified(self):
+        """
+        Whether the file was modified or removed since it was registered.
+        """
+        try:
+            stat = os.stat(self)
+        except OSError:
+            return True
+        return stat.st_size != self.size or stat.st_mtime_ns != self.mtime
+
+
+class AssetHandler(RequestHandler):
+    """
+    Serves assets registered using asset_url or file_url. Since the
+    content of an asset can never change they are served with an
+    ETag and may be cached indefinitely. HTTP Range requests are
+    supported, allowing media players to only load the bytes needed
+    for playback and seeking.
+    """
+
+    # Size of the chunks in which file assets are streamed
+    chunk_size = 64 * 1024
+
+    def compute_etag(self):
+        return '"%s"' % self.path_args[0]
+
+    async def get(self, key):
+        asset = state._assets.get(key)
+        # The bytes of file assets are read now, so they are only served
+        # if they still match the fingerprint in the key
+        if asset is None or (isinstance(asset, FileAsset) and asset.modified()):
+            raise HTTPError(404)
+        mime_type, _ = mimetypes.guess_type(key)
+        self.set_header('Content-Type', mime_type or 'application/octet-stream')
+        self.set_header('Cache-Control', 'public, max-age=31536000, immutable')
+        self.set_header('Accept-Ranges', 'bytes')
+        self.set_etag_header()
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+
+        size = asset.size if isinstance(asset, FileAsset) else len(asset)
+        start, end = 0, size
+        request_range = None
+        range_header = self.request.headers.get('Range')
+        if range_header:
+            request_range = httputil._parse_request_range(range_header)
+        if request_range:
+            start, end = request_range
+            if start is not None and start < 0:
+                start = max(start + size, 0)
+            if (start is not None and start >= size) or end == 0:
+                self.set_status(416)
+                self.set_header('Content-Type', 'text/plain')
+                self.set_header('Content-Range', 'bytes */%s' % size)
+                return
+            start = start or 0
+            end = size if end is None else min(end, size)
+            if end - start < size:
+                self.set_status(206)
+                self.set_header('Content-Range', httputil._get_content_range(start, end, size))
+        self.set_header('Content-Length', end - start)
+
+        if not isinstance(asset, FileAsset):
+            self.write(asset[start:end])
+            return
+        with open(asset, 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                self.write(chunk)
+                await self.flush()
+
+
+class ResourceHandler(RequestHandler):
+    """
+    Serves the CSS bundles of the resources rendered into the pages
+    of the server, precompressed with brotli or gzip depending on the
+    encodings accepted by the client. Since the name of a bundle is
+    derived from its content they may be cached indefinitely.
+    """
+
+    def compute_etag(self):
+        return '"%s"' % self.path_args[0]
+
+    def get(self, name):
+        bundle = _lookup_bundle(name)
+        if bundle is None:
+            raise HTTPError(404)
+        self.set_header('Content-Type', 'text/css; charset=utf-8')
+        self.set_header('Cache-Control', 'public, max-age=31536000, immutable')
+        self.set_header('Vary', 'Accept-Encoding')
+        self.set_etag_header()
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        accepted = {
+            encoding.split(';')[0].strip()
+            for encoding in self.request.headers.get('Accept-Encoding', '').split(',')
+        }
+        for encoding in ('br', 'gzip'):
+            if encoding in bundle and encoding in accepted:
+                self.set_header('Content-Encoding', encoding)
+                self.write(bundle[encoding])
+                return
+        self.write(bundle['identity'])
+
+
+class DownloadHandler(RequestHandler):
+    """
+    Streams downloads registered using download_url in chunks, from
+    disk, a file-like object or an iterator, which is advanced in a
+    worker thread.
+    """
+
+    # Size of the chunks in which files are streamed
+    chunk_size = 64 * 1024
+
+    async def get(self, token):
+        download = state._downloads.get(token)
+        if download is None:
+            raise HTTPError(404)
+        source, filename, mime_type, position = download
+        self.set_header('Content-Type', mime_type)
+        self.set_header('Content-Disposition', "attachment; filename*=UTF-8''%s" % quote(filename))
+        self.set_header('Cache-Control', 'no-store')
+
+        if isinstance(source, str):
+            self.set_header('Content-Length', os.path.getsize(source))
+            with open(source, 'rb') as f:
+                await self._stream(iter(partial(f.read, self.chunk_size), b''))
+        elif hasattr(source, 'read'):
+            if position is not None:
+                source.seek(0, io.SEEK_END)
+                if not isinstance(source, io.TextIOBase):
+                    self.set_header('Content-Length', source.tell() - position)
+                source.seek(position)
+            await self._stream(iter(partial(source.read, self.chunk_size), source.read(0)))
+        else:
+            state._downloads.pop(token, None)
+            while True:
+                chunk = await asyncio.wrap_future(state._submit(next, source, None))
+                if chunk is None:
+                    break
+                await self._stream([chunk])
+
+    async def _stream(self, chunks):
+        for chunk in chunks:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode('utf-8')
+            self.write(chunk)
+            await self.flush()
+
+
+class UploadHandler(RequestHandler):
+    """
+    Receives files registered using upload_url in consecutive chunks,
+    each identified by a Content-Range header, spooling them to a
+    temporary file which is only written to disk once it exceeds
+    UPLOAD_SPOOL_SIZE. Files exceeding the maximum size of the upload
+    are rejected with a 413 and all chunks must declare the total
+    size declared by the first chunk.
+    """
+
+    _range_re = re.compile(r'bytes (?:(\d+)-(\d+)|\*)/(\d+)')
+
+    def post(self, token):
+        upload = state._uploads.get(token)
+        if upload is None:
+            raise HTTPError(404)
+        match = self._range_re.fullmatch(self.request.headers.get('Content-Range', ''))
+        if match is None:
+            raise HTTPError(400, 'Missing or malformed Content-Range')
+        start = int(match.group(1) or 0)
+        total = int(match.group(3))
+        max_size = upload['max_size']
+        if max_size is None:
+            max_size = UPLOAD_MAX_SIZE
+        if total > max_size:
+            upload['file'] = None
+            raise HTTPError(413, 'Upload exceeds the maximum size of %d bytes' % max_size)
+        if start == 0:
+            upload['file'] = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+            upload['total'] = total
+        spool = upload['file']
+        if spool is None or spool.tell() != start:
+            raise HTTPError(400, 'Chunks must be uploaded in order')
+        elif total != upload['total'] or start + len(self.request.body) > total:
+            upload['file'] = None
+            raise HTTPError(400, 'Chunks must not exceed the total size declared '
+                            'by the first chunk')
+        spool.write(self.request.body)
+        filename = unquote(self.request.headers.get('X-Filename', ''))
+        mime_type = self.request.headers.get('Content-Type', 'application/octet-stream')
+        upload['doc'].add_next_tick_callback(partial(
+            upload['callback'], filename, mime_type, spool, spool.tell(), total
+        ))
+        if spool.tell() >= total:
+            upload['file'] = None
+        self.set_status(204)
+
+
+class StreamHandler(RequestHandler):
+    """
+    Receives binary messages registered using stream_url, e.g. video
+    frames, bypassing the base64 encoding required to send them over
+    the websocket.
+    """
+
+    def post(self, token):
+        callback = state._streams.get(token)
+        if callback is None:
+            raise HTTPError(404)
+        callback(self.request.body, self.request.headers)
+        self.set_status(204)
+
+
+class MetricsHandler(RequestHandler):
+    """
+    Reports the metrics collected by servers launched with metrics
+    enabled, in the Prometheus text format at /metrics and as JSON
+    at /metrics.json.
+    """
+
+    def get(self, json_format=None):
+        _metrics.monitor(IOLoop.current())
+        applications = getattr(self.application, '_applications', {})
+        self.set_header('Cache-Control', 'no-store')
+        if json_format:
+            self.set_header('Content-Type', 'application/json')
+            self.write(json.dumps(_metrics.to_dict(applications)))
+        else:
+            self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.write(_metrics.to_prometheus(applications))
+
+
+class AdminHandler(RequestHandler):
+    """
+    Base class for handlers restricted to requests supplying the
+    token the server was launched with.
+    """
+
+    def initialize(self, token):
+        self.token = token
+
+    def prepare(self):
+        token = self.get_argument('token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8')):
+            raise HTTPError(403)
+
+
+class ProfileHandler(AdminHandler):
+    """
+    Profiles the server with cProfile and returns the profile as a
+    file, e.g.:
+
+        /panel_profile?token=<token>&seconds=10
+          Profiles all activity on the server for 10 seconds.
+        /panel_profile?token=<token>&app=/app&seconds=10&format=flamegraph
+          Profiles the creation of the next session of /app and its
+          callbacks for 10 seconds, returning folded stacks.
+    """
+
+    # Maximum duration of a profile in seconds
+    max_seconds = 600
+
+    async def get(self):
+        try:
+            seconds = float(self.get_argument('seconds', '5'))
+            timeout = float(self.get_argument('timeout', '60'))
+        except ValueError:
+            raise HTTPError(400, 'seconds and timeout must be numbers')
+        seconds = min(max(seconds, 0), self.max_seconds)
+        fmt = self.get_argument('format', 'pstats')
+        if fmt not in PROFILE_FORMATS:
+            raise HTTPError(400, 'format must be one of %s' % ', '.join(PROFILE_FORMATS))
+        app = self.get_argument('app', None)
+        try:
+            if app is None:
+                profile = await profile_server(seconds)
+                slug, session_id = 'server', 'all'
+            else:
+                app = '/' + app.strip('/')
+                profile, session_id = await profile_session(app, seconds, timeout)
+                slug = app.strip('/') or 'root'
+        except ProfilerBusy as e:
+            raise HTTPError(409, str(e))
+        except asyncio.TimeoutError:
+            raise HTTPError(504, 'No session of %s was created within %ss' % (app, timeout))
+        filename = 'panel_%s_%s_%s.%s' % (
+            re.sub(r'[^\w-]', '_', slug), session_id,
+            time.strftime('%Y%m%d-%H%M%S'), PROFILE_FORMATS[fmt]
+        )
+        self.set_header('Content-Type', 'application/octet-stream')
+        self.set_header('Content-Disposition', 'attachment; filename="%s"' % filename)
+        self.set_header('Cache-Control', 'no-store')
+        self.set_header('X-Panel-App', app or '')
+        self.set_header('X-Panel-Session', session_id)
+        self.write(export_profile(profile, fmt))
+
+
+class SessionsHandler(AdminHandler):
+    """
+    Reports the open sessions as JSON, sorted by their estimated
+    memory usage, e.g. /panel_sessions?token=<token>&limit=10 lists
+    the ten heaviest sessions.
+    """
+
+    def get(self):
+        try:
+            limit = int(self.get_argument('limit', '0')) or None
+        except ValueError:
+            raise HTTPError(400, 'limit must be an integer')
+        applications = getattr(self.application, '_applications', {})
+        self.set_header('Content-Type', 'application/json')
+        self.set_header('Cache-Control', 'no-store')
+        self.write(json.dumps(session_report(applications)[:limit]))
+
+
+# Routes added to all Panel servers
+PANEL_PATTERNS = [
+    (r'/panel_assets/(.*)', AssetHandler),
+    (r'/panel_resources/(.*)', ResourceHandler),
+    (r'/panel_download/(.*)', DownloadHandler),
+    (r'/panel_upload/(.*)', UploadHandler),
+    (r'/panel_stream/(.*)', StreamHandler),
+]
+
+# Routes added to servers launched with metrics enabled
+METRICS_PATTERNS = [
+    (r'/metrics(\.json)?', MetricsHandler),
+]
+
+
+def profiler_patterns(token):
+    """
+    Returns the routes added to servers launched with the profiler
+    enabled, accessible with the supplied token.
+    """
+    return [(r'/panel_profile', ProfileHandler, {'token': token})]
+
+
+def sessions_patterns(token):
+    """
+    Returns the routes added to servers launched with the session
+    report enabled, accessible with the supplied token.
+    """
+    return [(r'/panel_sessions', SessionsHandler, {'token': token})]
+
+
+def _log_admin_url(name, url, option, verbose):
+    if verbose:
+        print("%s available at %s" % (name, url))
+    # A generated token cannot be obtained any other way
+    level = logging.INFO if isinstance(option, str) else logging.WARNING
+    log.log(level, "%s available at %s", name, url)
+
+
 def get_server(panel, port=0, websocket_origin=None, loop=None,
                show=False, start=False, title=None, verbose=False,
-               location=True, **kwargs):
+               location=True, metrics=False, profiler=False, pool=None,
+               num_procs=1, session_idle_timeout=None, session_max_age=None,
+               compression_level=None, compression_min_size=1024,
+               sessions_report=False, **kwargs):
     """
     Returns a Server instance with this panel attached as the root
     app.
@@ -197,6 +827,53 @@ def get_server(panel, port=0, websocket_origin=None, loop=None,
     location : boolean or panel.io.location.Location
       Whether to create a Location component to observe and
       set the URL location.
+    metrics : boolean (optional, default=False)
+      Whether to collect server metrics and serve them at /metrics
+      (Prometheus format) and /metrics.json
+    profiler : boolean or str (optional, default=False)
+      Whether to enable the /panel_profile route, which profiles the
+      server on demand. If a string is supplied it is used as the
+      token required to access the route, otherwise a random token
+      is generated. The URL including the token is always logged and
+      printed if verbose.
+    pool : int or {str: int or dict} (optional, default=None)
+      Number of Documents of each app to render ahead of time, so
+      new sessions do not wait for the app to be built, or a
+      dictionary mapping from the URL slug of an app to the number
+      of Documents or to a dictionary of DocumentPool options, i.e.
+      size, max_age and max_memory. Pooled apps must not depend on
+      the request and their on_session_created hooks run after the
+      app was built.
+    num_procs : int (optional, default=1)
+      Number of worker processes to fork, sharing the listening socket
+      and state.cache; 0 starts one per CPU. The launching process
+      supervises the workers and restarts those that crash. Cannot
+      be combined with an explicit loop and is not supported on
+      Windows. Requests are not routed to a particular worker, i.e.
+      there is no session affinity, /metrics and /panel_sessions
+      only report the worker answering the request and components
+      embed their data in the document instead of serving it from
+      per-session routes.
+    session_idle_timeout : float (optional, default=None)
+      Number of seconds after which sessions without a live
+      connection are destroyed, i.e. whose clients neither sent a
+      message nor answered a ping, e.g. because they disappeared
+      without closing the connection
+    session_max_age : float (optional, default=None)
+      Number of seconds after which sessions are destroyed
+    compression_level : int (optional, default=None)
+      Enables permessage-deflate compression of websocket messages
+      with the given zlib compression level (1-9). Whether a message
+      is compressed is decided per connection based on the ratio
+      and CPU time measured on previous messages.
+    compression_min_size : int (optional, default=1024)
+      Size in bytes below which messages are never compressed
+    sessions_report : boolean or str (optional, default=False)
+      Whether to enable the /panel_sessions route, which reports the
+      open sessions with their estimated memory usage. If a string
+      is supplied it is used as the token required to access the
+      route, otherwise a random token is generated, which is logged
+      like the profiler token.
     kwargs: dict
       Additional keyword arguments to pass to Server instance
 
@@ -205,10 +882,8 @@ def get_server(panel, port=0, websocket_origin=None, loop=None,
     server : bokeh.server.server.Server
       Bokeh Server instance running this panel
     """
-    from tornado.ioloop import IOLoop
-
     server_id = kwargs.pop('server_id', uuid.uuid4().hex)
-    kwargs['extra_patterns'] = extra_patterns = kwargs.get('extra_patterns', [])
+    kwargs['extra_patterns'] = extra_patterns = kwargs.get('extra_patterns', []) + PANEL_PATTERNS
     if isinstance(panel, dict):
         apps = {}
         for slug, app in panel.items():
@@ -239,12 +914,43 @@ def get_server(panel, port=0, websocket_origin=None, loop=None,
         apps = {'/': partial(_eval_panel, panel, server_id, title, location)}
 
     opts = dict(kwargs)
-    if loop:
+    if num_procs != 1:
+        # No IOLoop may be created before the workers are forked
+        if loop:
+            raise ValueError('An explicit loop cannot be used with num_procs != 1.')
+        opts['num_procs'] = num_procs
+        if not isinstance(state.cache, SharedCache):
+            state.cache = SharedCache(state.cache)
+    elif loop:
         loop.make_current()
         opts['io_loop'] = loop
     else:
         opts['io_loop'] = IOLoop.current()
 
+    if metrics:
+        _metrics.enable()
+        extra_patterns.extend(METRICS_PATTERNS)
+
+    if session_idle_timeout is not None or session_max_age is not None:
+        session_reaper.configure(session_idle_timeout, session_max_age)
+
+    install_lazy_loading()
+    _bundle_static_css()
+
+    if compression_level is not None:
+        websocket_compression.configure(compression_level, compression_min_size)
+
+    if profiler:
+        token = profiler if isinstance(profiler, str) else uuid.uuid4().hex
+        extra_patterns.extend(profiler_patterns(token))
+
+    if sessions_report:
+        if isinstance(sessions_report, str):
+            sessions_token = sessions_report
+        else:
+            sessions_token = uuid.uuid4().hex
+        extra_patterns.extend(sessions_patterns(sessions_token))
+
     if 'index' not in opts:
         opts['index'] = INDEX_HTML
 
@@ -254,13 +960,35 @@ def get_server(panel, port=0, websocket_origin=None, loop=None,
         opts['allow_websocket_origin'] = websocket_origin
 
     server = Server(apps, port=port, **opts)
-    if verbose:
-        address = server.address or 'localhost'
+    # Only the first worker reports the server and opens the browser
+    first = task_id() in (None, 0)
+    if metrics:
+        _metrics.monitor(server.io_loop)
+    address = server.address or 'localhost'
+    if verbose and first:
         print("Launching server at http://%s:%s" % (address, server.port))
+    if profiler and first:
+        url = "http://%s:%s/panel_profile?token=%s" % (address, server.port, token)
+        _log_admin_url('Profiling', url, profiler, verbose)
+    if sessions_report and first:
+        url = "http://%s:%s/panel_sessions?token=%s" % (address, server.port, sessions_token)
+        _log_admin_url('Session report', url, sessions_report, verbose)
 
     state._servers[server_id] = (server, panel, [])
 
-    if show:
+    if pool:
+        for slug, context in server._tornado._applications.items():
+            if isinstance(pool, dict):
+                options = pool.get(slug, pool.get(slug.lstrip('/')))
+            else:
+                options = pool
+            if not options:
+                continue
+            if not isinstance(options, dict):
+                options = {'size': options}
+            DocumentPool(**options).attach(context, server.io_loop, server.prefix)
+
+    if show and first:
         def show_callback():
             server.show('/')
         server.io_loop.add_callback(show_callback)
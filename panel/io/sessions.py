@@ -0,0 +1,206 @@
+"""
+Expires sessions which have no live connection or have been alive for
+too long, even if their browser never closed the connection, and
+estimates the memory held by each session.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import logging
+import sys
+import time
+
+from functools import wraps
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from bokeh.models import ColumnDataSource
+from bokeh.server.session import ServerSession
+from bokeh.server.views.ws import WSHandler
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+def _track_activity(handler):
+    @wraps(handler)
+    def track(cls, message, connection):
+        session_reaper._touch(connection)
+        return handler(message, connection)
+    return classmethod(track)
+
+
+def _track_pong(handler):
+    @wraps(handler)
+    def on_pong(self, data):
+        if self.connection is not None:
+            session_reaper._touch(self.connection)
+        return handler(self, data)
+    return on_pong
+
+
+def _column_bytes(column):
+    if isinstance(column, np.ndarray):
+        return column.nbytes
+    elif isinstance(column, (list, tuple)):
+        size = sys.getsizeof(column)
+        if len(column):
+            size += len(column) * sys.getsizeof(column[0])
+        return size
+    return sys.getsizeof(column)
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+def session_memory(doc):
+    """
+    Estimates the memory held by a Document, returning the number of
+    models and the size of the data held by its ColumnDataSources in
+    bytes.
+    """
+    models = list((doc._all_models or {}).values())
+    cds_bytes = sum(
+        _column_bytes(column) for model in models if isinstance(model, ColumnDataSource)
+        for column in model.data.values()
+    )
+    return {'models': len(models), 'cds_bytes': cds_bytes}
+
+
+def session_report(applications, reaper=None):
+    """
+    Returns a list of the sessions of the supplied apps with their
+    number of connections and memory estimate, sorted by the estimated
+    memory, including their age and idle time in seconds if they are
+    tracked by the reaper.
+
+    Arguments
+    ---------
+    applications: dict
+      Mapping from app URL to bokeh ApplicationContext
+    reaper: SessionReaper
+      The reaper tracking the activity of sessions
+    """
+    reaper = session_reaper if reaper is None else reaper
+    now = time.monotonic()
+    report = []
+    for url, context in applications.items():
+        for session in list(context.sessions):
+            if session.destroyed:
+                continue
+            info = {
+                'session': session.id,
+                'app': url,
+                'connections': session.connection_count,
+                'age': None,
+                'idle': None
+            }
+            if session in reaper._sessions:
+                _, created, active = reaper._sessions[session]
+                info.update(age=now-created, idle=now-active)
+            info.update(session_memory(session.document))
+            report.append(info)
+    return sorted(report, key=lambda info: (-info['cds_bytes'], -info['models']))
+
+
+class SessionReaper(object):
+    """
+    Destroys sessions without a live connection for idle_timeout
+    seconds or which were opened more than max_age seconds ago,
+    closing their connections and running the session destroyed
+    hooks, which clean up all Panel components rendered in the
+    session.
+
+    A connection is live while its client sends messages or answers
+    the pings the reaper sends on each check, so sessions which only
+    receive updates from the server, e.g. a dashboard that is being
+    watched, are kept alive. Bokeh already discards sessions without
+    connections; the reaper additionally handles connections which
+    are never closed properly, e.g. clients that disappeared without
+    closing the websocket.
+    """
+
+    # Interval in seconds at which sessions are checked
+    interval = 10
+
+    def __init__(self):
+        self.idle_timeout = None
+        self.max_age = None
+        self._sessions = WeakKeyDictionary()
+        self._callbacks = WeakKeyDictionary()
+        self._patched = False
+
+    def configure(self, idle_timeout=None, max_age=None):
+        """
+        Sets the timeouts in seconds, enabling the reaper if either
+        is set. The reaper starts checking sessions on the IOLoop
+        once the first client connects.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        if (idle_timeout is None and max_age is None) or self._patched:
+            return
+        for msgtype in ('pull', 'push', 'patch'):
+            handler = getattr(ServerSession, msgtype)
+            setattr(ServerSession, msgtype, _track_activity(handler))
+        WSHandler.on_pong = _track_pong(WSHandler.on_pong)
+        self._patched = True
+
+    @property
+    def enabled(self):
+        return self.idle_timeout is not None or self.max_age is not None
+
+    def _touch(self, connection):
+        session = connection.session
+        if session is None:
+            return
+        now = time.monotonic()
+        entry = self._sessions.get(session)
+        created = now if entry is None else entry[1]
+        self._sessions[session] = (connection.application_context, created, now)
+        loop = IOLoop.current()
+        if loop not in self._callbacks and self.enabled:
+            # Live connections have to answer a ping within the timeout
+            interval = self.interval
+            if self.idle_timeout is not None:
+                interval = min(interval, self.idle_timeout/2.)
+            self._callbacks[loop] = callback = PeriodicCallback(self._check, interval*1000)
+            callback.start()
+
+    def _check(self):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        loop = IOLoop.current()
+        for session, (context, created, active) in list(self._sessions.items()):
+            if session.destroyed or context.io_loop is not loop:
+                continue
+            if ((self.max_age is not None and now - created > self.max_age) or
+                (self.idle_timeout is not None and now - active > self.idle_timeout)):
+                loop.add_callback(self.destroy, context, session)
+            elif self.idle_timeout is not None:
+                for connection in list(session._subscribed_connections):
+                    try:
+                        connection.send_ping()
+                    except Exception:
+                        pass
+
+    async def destroy(self, context, session):
+        """
+        Closes the connections of the session and destroys it.
+        """
+        self._sessions.pop(session, None)
+        log.info("Destroying expired session %r", session.id)
+        for connection in list(session._subscribed_connections):
+            socket = connection._socket
+            socket.application.client_lost(connection)
+            socket.close(1001, 'Session expired')
+        if session.id in context._sessions:
+            await context._discard_session(session, lambda session: True)
+
+
+# The global SessionReaper of all servers in the process
+session_reaper = SessionReaper()
@@ -0,0 +1,75 @@
+"""
+Dictionary-like cache shared between the worker processes of a server
+launched with num_procs > 1, which replaces state.cache so that data
+cached by one worker is available to all others.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import multiprocessing.process
+import os
+import signal
+
+from collections.abc import MutableMapping
+from multiprocessing.managers import SyncManager
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+class SharedCache(MutableMapping):
+    """
+    A mapping stored in a manager process started before the server
+    forks its workers. Keys and values are pickled on every access,
+    therefore modifying a value retrieved from the cache in place
+    does not update it for other workers; assign it again instead.
+
+    Arguments
+    ---------
+    data: dict
+      Initial contents of the cache
+    """
+
+    def __init__(self, data=None):
+        self._manager = SyncManager()
+        self._manager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+        self._data = self._manager.dict(data or {})
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Workers must neither shut down the manager owned by the
+        # supervising process on exit nor reuse its connection
+        self._manager.shutdown.cancel()
+        multiprocessing.process._children.discard(self._manager._process)
+        if hasattr(self._data._tls, 'connection'):
+            del self._data._tls.connection
+
+    def __repr__(self):
+        return 'SharedCache(%r)' % dict(self._data.items())
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data.keys())
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def setdefault(self, key, default=None):
+        return self._data.setdefault(key, default)
+
+    def clear(self):
+        self._data.clear()
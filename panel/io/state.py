@@ -5,6 +5,8 @@ from __future__ import absolute_import, division, unicode_literals
 
 import threading
 
+from collections import OrderedDict
+from collections.abc import MutableMapping
 from weakref import WeakKeyDictionary, WeakSet
 
 import param
@@ -13,6 +15,8 @@ from bokeh.document import Document
 from bokeh.io import curdoc as _curdoc
 from pyviz_comms import CommManager as _CommManager
 
+from .stats import stats as _stats
+
 
 class _state(param.Parameterized):
     """
@@ -20,9 +24,10 @@ class _state(param.Parameterized):
     apps to indicate their state to a user.
     """
 
-    cache = param.Dict(default={}, doc="""
+    cache = param.ClassSelector(default={}, class_=(dict, MutableMapping), doc="""
        Global location you can use to cache large datasets or expensive computation results
-       across multiple client sessions for a given server.""") 
+       across multiple client sessions for a given server. When serving with multiple
+       processes it is shared between them.""")
 
     webdriver = param.Parameter(default=None, doc="""
       Selenium webdriver used to export bokeh models to pngs.""")
@@ -37,6 +42,9 @@ class _state(param.Parameterized):
     # Used to ensure that events are not scheduled from the wrong thread
     _thread_id = None
 
+    # Documents bound to worker threads running callbacks of a session
+    _thread_local = threading.local()
+
     _comm_manager = _CommManager
 
     # Locations
@@ -52,12 +60,40 @@ class _state(param.Parameterized):
     # An index of all currently active servers
     _servers = {}
 
+    # Assets served by the AssetHandler indexed by content hash
+    _assets = OrderedDict()
+
+    # Total size in bytes of the assets held in memory
+    _asset_bytes = 0
+
+    # Number of sessions using each asset and the assets of each session
+    _asset_refs = {}
+    _asset_sessions = WeakKeyDictionary()
+
+    # Downloads served by the DownloadHandler indexed by token
+    _downloads = {}
+
+    # Uploads received by the UploadHandler indexed by token
+    _uploads = {}
+
+    # Callbacks receiving messages from the StreamHandler indexed by token
+    _streams = {}
+
+    # Download, upload and stream tokens registered by each session document
+    _session_tokens = WeakKeyDictionary()
+
     # Jupyter display handles
     _handles = {}
 
     # Stores a set of locked Websockets, reset after every change event
     _locks = WeakSet()
 
+    # Thread pool used to run expensive computations off the event loop
+    _thread_pool = None
+
+    # Tasks shared by all sessions of the process indexed by name
+    _scheduled_tasks = {}
+
     def __repr__(self):
         server_info = []
         for server, panel, docs in self._servers.values():
@@ -77,6 +113,61 @@ class _state(param.Parameterized):
                 pass
         self._servers = {}
 
+    def _submit(self, fn, *args, **kwargs):
+        """
+        Runs the function in a worker thread, returning a
+        concurrent.futures.Future wrapping the result.
+        """
+        if self._thread_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            type(self)._thread_pool = ThreadPoolExecutor(thread_name_prefix='panel')
+        return self._thread_pool.submit(fn, *args, **kwargs)
+
+    def schedule_task(self, name, callback, period=None, at=None, threaded=True):
+        """
+        Schedules a task which runs once per server process, no matter
+        how many sessions request it, and shares its result with all
+        sessions subscribed to it. Since app code runs for every
+        session, scheduling a task under an existing name returns the
+        task already scheduled under that name, unless the IOLoop it
+        was scheduled on no longer runs, in which case it is replaced.
+
+        Arguments
+        ---------
+        name: str
+          Unique name of the task
+        callback: callable
+          Function (or coroutine function) computing the shared value
+        period: float or datetime.timedelta
+          Interval between runs in seconds, if None the task runs once
+        at: datetime.datetime
+          Time of the first run, defaults to immediately
+        threaded: boolean
+          Whether to run the callback in a worker thread
+
+        Returns
+        -------
+        The ScheduledTask, whose subscribe method registers a callback
+        invoked with each result on the current session's Document.
+        """
+        task = self._scheduled_tasks.get(name)
+        if task is not None:
+            if not task._stale():
+                return task
+            task.cancel()
+        from .tasks import ScheduledTask
+        task = ScheduledTask(name, callback, period, at, threaded)
+        self._scheduled_tasks[name] = task
+        task.start()
+        return task
+
+    def cancel_task(self, name):
+        """
+        Cancels the task scheduled under the supplied name.
+        """
+        if name in self._scheduled_tasks:
+            self._scheduled_tasks[name].cancel()
+
     def _unblocked(self, doc):
         thread = threading.current_thread()
         thread_id = thread.ident if thread else None
@@ -84,7 +175,10 @@ class _state(param.Parameterized):
 
     @property
     def curdoc(self):
-        if self._curdoc:
+        doc = getattr(self._thread_local, 'curdoc', None)
+        if doc is not None:
+            return doc
+        elif self._curdoc:
             return self._curdoc
         elif _curdoc().session_context:
             return _curdoc()
@@ -93,6 +187,14 @@ class _state(param.Parameterized):
     def curdoc(self, doc):
         self._curdoc = doc
 
+    @property
+    def stats(self):
+        """
+        Statistics of the instrumented hot paths, recorded while
+        state.stats.enabled is True.
+        """
+        return _stats
+
     @property
     def cookies(self):
         return self.curdoc.session_context.request.cookies if self.curdoc else {}
@@ -0,0 +1,155 @@
+"""
+Opt-in instrumentation of the hot paths in Panel, recording call
+counts, wall time and outgoing message sizes per component type and
+per session.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import threading
+import time
+
+from contextlib import contextmanager
+from functools import wraps
+
+from bokeh.document import Document
+
+#---------------------------------------------------------------------
+# Private API
+#---------------------------------------------------------------------
+
+_active = threading.local()
+
+
+def _session_id(doc):
+    if doc is None:
+        from .state import state
+        doc = state.curdoc
+    if doc is None or not doc.session_context:
+        return None
+    return doc.session_context.id
+
+
+def _message_size(msg):
+    from bokeh.core.json_encoder import serialize_json
+    try:
+        return len(serialize_json(msg))
+    except Exception:
+        return 0
+
+
+def instrumented(method):
+    """
+    Decorates a method so that calls are recorded on the global Stats
+    while instrumentation is enabled. Calls made by a method to the
+    same method of the same object, e.g. via super, are only recorded
+    once.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not stats.enabled:
+            return method(self, *args, **kwargs)
+        calls = getattr(_active, 'calls', None)
+        if calls is None:
+            calls = _active.calls = set()
+        key = (id(self), name)
+        if key in calls:
+            return method(self, *args, **kwargs)
+        calls.add(key)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            calls.discard(key)
+            doc = next((arg for arg in args if isinstance(arg, Document)), None)
+            nbytes = 0
+            if name == '_update_model' and len(args) > 1:
+                nbytes = _message_size(args[1])
+            stats.record(type(self).__name__, name, duration, nbytes, _session_id(doc))
+    return wrapper
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+class Stats(object):
+    """
+    Accumulates the number of calls, wall time in seconds and bytes
+    sent by instrumented methods, indexed by component type and
+    method and by session. Times are inclusive of nested calls, e.g.
+    the time spent rendering a layout includes its children.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._recorders = []
+        self.reset()
+
+    def __repr__(self):
+        lines = ['%-40s %8s %12s %12s' % ('component.method', 'calls', 'time (ms)', 'bytes')]
+        for (component, method), (count, duration, nbytes) in sorted(
+                self.components.items(), key=lambda item: -item[1][1]):
+            lines.append('%-40s %8d %12.2f %12d' % (
+                '%s.%s' % (component, method), count, duration*1000, nbytes))
+        return '\n'.join(lines)
+
+    def record(self, component, method, duration, nbytes=0, session=None):
+        """
+        Records a call to the method of a component.
+
+        Arguments
+        ---------
+        component (str): The name of the component type
+        method (str): The name of the method
+        duration (float): The wall time of the call in seconds
+        nbytes (int): The size of the messages sent by the call
+        session (str): The id of the session the call was made in
+        """
+        key = (component, method)
+        with self._lock:
+            for entries in (self.components, self.sessions.setdefault(session, {})):
+                entry = entries.setdefault(key, [0, 0., 0])
+                entry[0] += 1
+                entry[1] += duration
+                entry[2] += nbytes
+            recorders = list(self._recorders)
+        for recorder in recorders:
+            recorder.record(component, method, duration, nbytes, session)
+
+    def reset(self):
+        """
+        Discards all recorded statistics.
+        """
+        with self._lock:
+            self.components = {}
+            self.sessions = {}
+
+
+# The global Stats available as state.stats
+stats = Stats()
+
+
+@contextmanager
+def instrument():
+    """
+    Context manager which enables instrumentation within its body and
+    yields a Stats object holding only the calls recorded within it.
+
+        with instrument() as recorded:
+            slider.value = 3
+        print(recorded)
+    """
+    enabled = stats.enabled
+    recorded = Stats()
+    with stats._lock:
+        stats._recorders.append(recorded)
+    stats.enabled = True
+    try:
+        yield recorded
+    finally:
+        with stats._lock:
+            stats._recorders.remove(recorded)
+        stats.enabled = enabled
@@ -0,0 +1,186 @@
+"""
+Tasks scheduled once per server process with state.schedule_task,
+whose results are shared by all sessions subscribing to them.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import asyncio
+import datetime as dt
+import logging
+import time
+
+from functools import partial
+
+from tornado.ioloop import IOLoop
+
+from .state import state
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------
+# Public API
+#---------------------------------------------------------------------
+
+class ScheduledTask(object):
+    """
+    Runs a callback once per server process, immediately, at a
+    specific time and/or periodically, and notifies all subscribed
+    sessions of the result on their own Document's next tick. A run
+    is skipped if the previous one has not finished yet, so runs
+    never overlap.
+
+    Arguments
+    ---------
+    name: str
+      Unique name of the task
+    callback: callable
+      Function (or coroutine function) computing the shared value
+    period: float or datetime.timedelta
+      Interval between runs in seconds, if None the task runs once
+    at: datetime.datetime
+      Time of the first run, defaults to immediately
+    threaded: boolean
+      Whether to run the callback in a worker thread, keeping the
+      IOLoop responsive while it runs
+    """
+
+    def __init__(self, name, callback, period=None, at=None, threaded=True):
+        if isinstance(period, dt.timedelta):
+            period = period.total_seconds()
+        if period is not None and period <= 0:
+            raise ValueError('The period of a scheduled task must be positive.')
+        self.name = name
+        self.callback = callback
+        self.period = period
+        self.at = at
+        self.threaded = threaded
+        self.value = None
+        self.error = None
+        self.last_run = None
+        self._subscribers = {}
+        self._running = False
+        self._next = None
+        self._handle = None
+        self._loop = None
+
+    def __repr__(self):
+        return 'ScheduledTask(name=%r, period=%r, last_run=%r)' % (
+            self.name, self.period, self.last_run)
+
+    def start(self, io_loop=None):
+        """
+        Schedules the first run of the task on the IOLoop.
+        """
+        self._loop = io_loop or IOLoop.current()
+        delay = 0
+        if self.at is not None:
+            delay = (self.at - dt.datetime.now(self.at.tzinfo)).total_seconds()
+        self._next = self._loop.time() + max(delay, 0)
+        self._handle = self._loop.call_at(self._next, self._run)
+
+    def _stale(self):
+        """
+        Whether the IOLoop the task was scheduled on no longer runs,
+        e.g. because the server which scheduled it was stopped.
+        """
+        if self._loop is None or self._loop is IOLoop.current():
+            return False
+        loop = getattr(self._loop, 'asyncio_loop', None)
+        return loop is None or loop.is_closed() or not loop.is_running()
+
+    def cancel(self):
+        """
+        Stops the task and removes it from the scheduled tasks.
+        """
+        if self._handle is not None:
+            self._loop.remove_timeout(self._handle)
+            self._handle = None
+        if state._scheduled_tasks.get(self.name) is self:
+            del state._scheduled_tasks[self.name]
+
+    def subscribe(self, callback, doc=None):
+        """
+        Subscribes the callback to the results of the task. It is
+        called with each new result on the next tick of the Document
+        of the current session, and immediately with the last result
+        if the task already ran. The subscription ends when the
+        session is destroyed.
+
+        Arguments
+        ---------
+        callback: callable
+          Function called with the result of each run
+        doc: bokeh.Document
+          Document to notify, defaults to the current session's
+        """
+        doc = doc or state.curdoc
+        if doc not in self._subscribers:
+            self._subscribers[doc] = []
+            if doc is not None:
+                doc.on_session_destroyed(partial(self._clear, doc))
+        self._subscribers[doc].append(callback)
+        if self.last_run is not None:
+            self._notify(doc, callback, self.value)
+
+    def unsubscribe(self, callback, doc=None):
+        """
+        Removes a callback previously subscribed to the task.
+        """
+        doc = doc or state.curdoc
+        callbacks = self._subscribers.get(doc, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def _clear(self, doc, session_context):
+        self._subscribers.pop(doc, None)
+
+    def _notify(self, doc, callback, value):
+        if doc is None:
+            callback(value)
+        else:
+            doc.add_next_tick_callback(partial(callback, value))
+
+    def _run(self):
+        self._handle = None
+        if self.period is not None:
+            now = self._loop.time()
+            while self._next <= now:
+                self._next += self.period
+            self._handle = self._loop.call_at(self._next, self._run)
+        if self._running:
+            log.warning("Skipping run of scheduled task %r, the previous "
+                        "run has not finished.", self.name)
+            return
+        if asyncio.iscoroutinefunction(self.callback):
+            future = asyncio.ensure_future(self.callback())
+        elif self.threaded:
+            future = state._submit(self.callback)
+        else:
+            try:
+                value = self.callback()
+            except Exception as e:
+                self._failed(e)
+            else:
+                self._publish(value)
+            return
+        self._running = True
+        self._loop.add_future(future, self._done)
+
+    def _done(self, future):
+        self._running = False
+        try:
+            value = future.result()
+        except Exception as e:
+            self._failed(e)
+        else:
+            self._publish(value)
+
+    def _publish(self, value):
+        self.value, self.error, self.last_run = value, None, time.time()
+        for doc, callbacks in list(self._subscribers.items()):
+            for callback in list(callbacks):
+                self._notify(doc, callback, value)
+
+    def _failed(self, error):
+        self.error = error
+        log.error("Scheduled task %r failed: %r", self.name, error, exc_info=error)
@@ -8,6 +8,6 @@ files.
 from .ipywidget import IPyWidget # noqa
 from .layout import Card # noqa
 from .location import Location # noqa
-from .markup import JSON, HTML # noqa
+from .markup import JSON, HTML, Log # noqa
 from .state import State # noqa
-from .widgets import Audio, FileDownload, Player, Progress, Video, VideoStream # noqa
+from .widgets import Audio, FileDownload, FileInput, Player, Progress, Video, VideoStream # noqa
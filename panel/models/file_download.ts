@@ -139,9 +139,13 @@ export class FileDownloadView extends InputWidgetView {
   }
 
   _update_href() : void {
-    if ( this.model.data ) {
+    if ( this.model.data == null )
+      return
+    if ( this.model.data.startsWith('data:') ) {
       const blob = dataURItoBlob(this.model.data)
       this.anchor_el.href = (URL as any).createObjectURL(blob)
+    } else {
+      this.anchor_el.href = this.model.data
     }
   }
 
@@ -0,0 +1,65 @@
+import {FileInput as BkFileInput, FileInputView as BkFileInputView} from "@bokehjs/models/widgets/file_input"
+import * as p from "@bokehjs/core/properties"
+
+export class FileInputView extends BkFileInputView {
+  model: FileInput
+
+  async load_files(files: FileList): Promise<void> {
+    if (this.model.upload_url == null || this.model.multiple) {
+      await super.load_files(files)
+      return
+    }
+    const file = files[0]
+    if (file == null)
+      return
+    const {chunk_size, upload_url} = this.model
+    let start = 0
+    do {
+      const end = Math.min(start + chunk_size, file.size)
+      const range = file.size ? `${start}-${end-1}` : '*'
+      const response = await fetch(upload_url, {
+        method: 'POST',
+        headers: {
+          'Content-Range': `bytes ${range}/${file.size}`,
+          'Content-Type': file.type || 'application/octet-stream',
+          'X-Filename': encodeURIComponent(file.name),
+        },
+        body: file.slice(start, end),
+      })
+      if (!response.ok) {
+        console.error(`Uploading ${file.name} failed: ${response.statusText}`)
+        return
+      }
+      start = end
+    } while (start < file.size)
+  }
+}
+
+export namespace FileInput {
+  export type Attrs = p.AttrsOf<Props>
+  export type Props = BkFileInput.Props & {
+    chunk_size: p.Property<number>
+    upload_url: p.Property<string | null>
+  }
+}
+
+export interface FileInput extends FileInput.Attrs {}
+
+export class FileInput extends BkFileInput {
+  properties: FileInput.Props
+
+  constructor(attrs?: Partial<FileInput.Attrs>) {
+    super(attrs)
+  }
+
+  static __module__ = "panel.models.widgets"
+
+  static init_FileInput(): void {
+    this.prototype.default_view = FileInputView
+
+    this.define<FileInput.Props>({
+      chunk_size: [ p.Number, 1024*1024 ],
+      upload_url: [ p.String, null      ],
+    })
+  }
+}
@@ -7,8 +7,10 @@ export {HTML} from "./html"
 export {IPyWidget} from "./ipywidget"
 export {JSON} from "./json"
 export {FileDownload} from "./file_download"
+export {FileInput} from "./file_input"
 export {KaTeX} from "./katex"
 export {Location} from "./location"
+export {Log} from "./log"
 export {MathJax} from "./mathjax"
 export {Player} from "./player"
 export {PlotlyPlot} from "./plotly"
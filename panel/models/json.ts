@@ -5,19 +5,115 @@ import {PanelMarkupView} from "./layout"
 
 export class JSONView extends PanelMarkupView {
   model: JSON
+  protected _json: any
+  protected _text: string | null
+  protected _open: Set<string>
+  protected _placeholders: Set<string>
+
+  initialize(): void {
+    super.initialize()
+    // The element is reused by every render, so the listener is only added once
+    this.el.addEventListener('click', (event) => this._toggle(event), true)
+  }
+
+  connect_signals(): void {
+    super.connect_signals()
+    this.connect(this.model.properties.subtree.change, () => this._insert_subtree())
+  }
+
+  protected _insert_subtree(): void {
+    if (this.model.subtree == null || this._json == null)
+      return
+    const [, key, text, placeholders] = this.model.subtree
+    if (!this._placeholders.has(key))
+      return
+    const path: string[] = window.JSON.parse(key)
+    const value = window.JSON.parse(text)
+    if (path.length) {
+      let parent = this._json
+      for (const k of path.slice(0, -1))
+        parent = parent[k]
+      parent[path[path.length-1]] = value
+    } else
+      this._json = value
+    this._placeholders.delete(key)
+    for (const placeholder of placeholders)
+      this._placeholders.add(placeholder)
+    this._open.add(key)
+  }
+
+  protected _path(row: Element): string[] {
+    // Reconstructs the path of a row from the keys of its ancestors
+    const path: string[] = []
+    let el: Element | null = row
+    while (el != null && el !== this.markup_el) {
+      if (el.classList.contains('json-formatter-row')) {
+        const key = el.querySelector(':scope > .json-formatter-toggler-link > .json-formatter-key')
+        if (key != null && key.textContent != null)
+          path.unshift(key.textContent.slice(0, -1))
+      }
+      el = el.parentElement
+    }
+    return path
+  }
+
+  protected _toggle(event: MouseEvent): void {
+    const link = (event.target as Element).closest('.json-formatter-toggler-link')
+    const row = link == null ? null : link.closest('.json-formatter-row')
+    if (row == null || this._placeholders == null)
+      return
+    const key = window.JSON.stringify(this._path(row))
+    if (this._placeholders.has(key)) {
+      // Request collapsed subtrees which have not been loaded
+      event.stopPropagation()
+      event.preventDefault()
+      this.model.request = key
+    } else if (row.classList.contains('json-formatter-open'))
+      this._open.delete(key)
+    else
+      this._open.add(key)
+  }
+
+  protected _reopen(rendered: Element): void {
+    const paths = Array.from(this._open).map((key) => window.JSON.parse(key))
+    paths.sort((a, b) => a.length - b.length)
+    for (const path of paths) {
+      let row: Element | undefined = rendered
+      for (const k of path) {
+        const children: Element[] = Array.from(row.querySelectorAll(':scope > .json-formatter-children > .json-formatter-row'))
+        row = children.find((child) => {
+          const key = child.querySelector(':scope > .json-formatter-toggler-link > .json-formatter-key')
+          return key != null && key.textContent == `${k}:`
+        })
+        if (row == null)
+          break
+      }
+      if (row != null && !row.classList.contains('json-formatter-open')) {
+        const link = row.querySelector(':scope > .json-formatter-toggler-link') as HTMLElement | null
+        if (link != null)
+          link.click()
+      }
+    }
+  }
 
   render(): void {
     super.render();
-    const text = this.model.text.replace(/(\r\n|\n|\r)/gm, "").replace("'", '"')
-    let json;
-    try {
-      json = window.JSON.parse(text)
-    } catch(err) {
-      this.markup_el.innerHTML = "<b>Invalid JSON:</b> " + err.toString()
+    if (this.model.text !== this._text) {
+      const text = this.model.text.replace(/(\r\n|\n|\r)/gm, "").replace("'", '"')
+      try {
+        this._json = window.JSON.parse(text)
+      } catch(err) {
+        this._json = null
+        this.markup_el.innerHTML = "<b>Invalid JSON:</b> " + err.toString()
+        return
+      }
+      this._text = this.model.text
+      this._open = new Set()
+      this._placeholders = new Set(this.model.placeholders)
+    } else if (this._json == null)
       return
-    }
     const config = {hoverPreviewEnabled: this.model.hover_preview, theme: this.model.theme}
-    const formatter = new JSONFormatter(json, this.model.depth, config)
+    const formatter = new JSONFormatter(this._json, this.model.depth, config)
     const rendered = formatter.render()
     let style = "border-radius: 5px; padding: 10px;";
     if (this.model.theme == "dark")
@@ -25,6 +121,7 @@ export class JSONView extends PanelMarkupView {
     else
       rendered.style.cssText = style;
     this.markup_el.append(rendered)
+    this._reopen(rendered)
   }
 }
 
@@ -35,7 +132,10 @@ export namespace JSON {
   export type Attrs = p.AttrsOf<Props>
   export type Props = Markup.Props & {
     depth: p.Property<number>
-    hover_preview: p.Property<boolean> 
+    hover_preview: p.Property<boolean>
+    placeholders: p.Property<string[]>
+    request: p.Property<string | null>
+    subtree: p.Property<[number, string, string, string[]] | null>
     theme: p.Property<"light" | "dark">
   }
 }
@@ -56,6 +156,9 @@ export class JSON extends Markup {
     this.define<JSON.Props>({
       depth: [p.Number, 1],
       hover_preview: [p.Boolean, false],
+      placeholders: [p.Array, []],
+      request: [p.String, null],
+      subtree: [p.Any, null],
       theme: [p.Enum(Theme), "dark"],
     })
   }
@@ -0,0 +1,113 @@
+import * as p from "@bokehjs/core/properties"
+import {HTMLBox} from "@bokehjs/models/layouts/html_box"
+
+import {PanelHTMLBoxView} from "./layout"
+
+function trim_lines(text: string, max_lines: number): string {
+  // Retains only the last max_lines lines of the text
+  let index = text.endsWith('\n') ? text.length-1 : text.length
+  for (let i = 0; i < max_lines; i++) {
+    index = text.lastIndexOf('\n', index-1)
+    if (index < 0)
+      return text
+  }
+  return text.slice(index+1)
+}
+
+export class LogView extends PanelHTMLBoxView {
+  model: Log
+  protected pre_el: HTMLPreElement
+  protected _length: number
+
+  connect_signals(): void {
+    super.connect_signals()
+    const {chunk, style, text} = this.model.properties
+    this.on_change([style, text], () => {
+      this.render()
+      this.invalidate_layout()
+    })
+    this.connect(chunk.change, () => this.append())
+  }
+
+  render(): void {
+    super.render()
+    this.el.style.overflowY = 'auto'
+    this.pre_el = document.createElement('pre')
+    Object.assign(this.pre_el.style, this.model.style)
+    this.pre_el.textContent = this.model.log
+    this._length = this.model.log.length
+    this.el.appendChild(this.pre_el)
+  }
+
+  append(): void {
+    if (this.model.chunk == null)
+      return
+    const {log} = this.model
+    const [, text, reset] = this.model.chunk
+    const scrolled = this.el.scrollTop + this.el.clientHeight >= this.el.scrollHeight - 1
+    if (!reset && log.length == this._length + text.length)
+      this.pre_el.appendChild(document.createTextNode(text))
+    else
+      this.pre_el.textContent = log
+    this._length = log.length
+    if (scrolled)
+      this.el.scrollTop = this.el.scrollHeight
+    if (this.model.height == null)
+      this.invalidate_layout()
+  }
+}
+
+export namespace Log {
+  export type Attrs = p.AttrsOf<Props>
+  export type Props = HTMLBox.Props & {
+    chunk: p.Property<[number, string, boolean] | null>
+    max_lines: p.Property<number>
+    style: p.Property<{[key: string]: string}>
+    text: p.Property<string>
+  }
+}
+
+export interface Log extends Log.Attrs {}
+
+export class Log extends HTMLBox {
+  properties: Log.Props
+
+  // The retained log text, including appended chunks
+  log: string
+
+  constructor(attrs?: Partial<Log.Attrs>) {
+    super(attrs)
+  }
+
+  static __module__ = "panel.models.markup"
+
+  static init_Log(): void {
+    this.prototype.default_view = LogView
+
+    this.define<Log.Props>({
+      chunk:     [ p.Any,    null ],
+      max_lines: [ p.Number, 1000 ],
+      style:     [ p.Any,    {}   ],
+      text:      [ p.String, ''   ],
+    })
+  }
+
+  initialize(): void {
+    super.initialize()
+    this.log = trim_lines(this.text, this.max_lines)
+  }
+
+  connect_signals(): void {
+    super.connect_signals()
+    const {chunk, max_lines, text} = this.properties
+    this.on_change([max_lines, text], () => {
+      this.log = trim_lines(this.text, this.max_lines)
+    })
+    this.connect(chunk.change, () => {
+      if (this.chunk == null)
+        return
+      const [, text, reset] = this.chunk
+      this.log = trim_lines(reset ? text : this.log + text, this.max_lines)
+    })
+  }
+}
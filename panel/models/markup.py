@@ -3,7 +3,8 @@ Custom bokeh Markup models.
 """
 from __future__ import absolute_import, division, unicode_literals
 
-from bokeh.core.properties import Bool, Either, Int, Float, String
+from bokeh.core.properties import Any, Bool, Dict, Either, Int, Float, List, String
+from bokeh.models.layouts import HTMLBox
 from bokeh.models.widgets import Markup
 
 
@@ -22,4 +23,35 @@ class JSON(Markup):
 
     hover_preview = Bool(default=False, help="Whether to show a hover preview for collapsed nodes.")
 
+    placeholders = List(String, help="""
+        JSON encoded paths of the collapsed subtrees which are loaded
+        on request.""")
+
+    request = String(default=None, help="""
+        JSON encoded path of a subtree requested by the frontend, reset
+        to None once the subtree was sent.""")
+
+    subtree = Any(default=None, help="""
+        The most recently requested subtree, as a sequence number, the
+        JSON encoded path, the JSON text and the paths of its
+        placeholders.""")
+
     theme = String(default='dark', help="Whether to expand all JSON nodes.")
+
+
+class Log(HTMLBox):
+    """
+    A bokeh model that renders a log of text, which may be appended to
+    incrementally.
+    """
+
+    chunk = Any(default=None, help="""
+        The latest chunk of text appended to the log, as a tuple of a
+        sequence number, the text and whether the text replaces the
+        log rather than being appended to it.""")
+
+    max_lines = Int(default=1000, help="Maximum number of lines retained in the log.")
+
+    style = Dict(String, Any, default={}, help="CSS styles applied to the log.")
+
+    text = String(default='', help="The text of the log.")
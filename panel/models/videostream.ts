@@ -12,6 +12,7 @@ export class VideoStreamView extends PanelHTMLBoxView {
     'video': true
   }
   protected timer: any
+  protected sending: boolean = false
 
   initialize(): void {
     super.initialize()
@@ -47,12 +48,41 @@ export class VideoStreamView extends PanelHTMLBoxView {
   }
 
   snapshot(): void{
-    this.canvasEl.width = this.videoEl.videoWidth
-    this.canvasEl.height = this.videoEl.videoHeight
+    // Skip frames while the previous frame is still being sent
+    if (this.sending)
+      return
+    const width = this.canvasEl.width = this.videoEl.videoWidth
+    const height = this.canvasEl.height = this.videoEl.videoHeight
     const context = this.canvasEl.getContext('2d')
     if (context)
-      context.drawImage(this.videoEl, 0, 0, this.canvasEl.width, this.canvasEl.height)
-    this.model.value = this.canvasEl.toDataURL("image/"+this.model.format, 0.95)
+      context.drawImage(this.videoEl, 0, 0, width, height)
+    const {format, frame_url} = this.model
+    if (frame_url == null) {
+      const mime = format == 'raw' ? 'png' : format
+      this.model.value = this.canvasEl.toDataURL("image/"+mime, 0.95)
+      return
+    }
+    const send = (body: Blob | ArrayBuffer | null) => {
+      if (body == null) {
+        this.sending = false
+        return
+      }
+      const headers = {
+        'Content-Type': 'application/octet-stream',
+        'X-Frame-Format': format,
+        'X-Frame-Height': `${height}`,
+        'X-Frame-Width': `${width}`,
+      }
+      fetch(frame_url, {method: 'POST', body, headers}).then(
+        () => { this.sending = false },
+        (error) => { this.sending = false; console.error(error) }
+      )
+    }
+    this.sending = true
+    if (format == 'raw')
+      send(context ? context.getImageData(0, 0, width, height).data.buffer : null)
+    else
+      this.canvasEl.toBlob(send, "image/"+format, 0.95)
   }
 
   remove(): void {
@@ -96,6 +126,7 @@ export namespace VideoStream {
   export type Attrs = p.AttrsOf<Props>
   export type Props = HTMLBox.Props & {
     format: p.Property<string>
+    frame_url: p.Property<string | null>
     paused: p.Property<boolean>
     snapshot: p.Property<boolean>
     timeout: p.Property<number>
@@ -118,11 +149,12 @@ export class VideoStream extends HTMLBox {
     this.prototype.default_view = VideoStreamView
 
     this.define<VideoStream.Props>({
-      format:   [ p.String, 'png'  ],
-      paused:   [ p.Boolean, false ],
-      snapshot: [ p.Boolean, false ],
-      timeout:  [ p.Number,  0     ],
-      value:    [ p.Any,           ]
+      format:    [ p.String, 'png'  ],
+      frame_url: [ p.String, null   ],
+      paused:    [ p.Boolean, false ],
+      snapshot:  [ p.Boolean, false ],
+      timeout:   [ p.Number,  0     ],
+      value:     [ p.Any,           ]
     })
 
     this.override({
@@ -7,7 +7,7 @@ from bokeh.core.properties import (String, Bool, Dict, Any, Override,
                                    List)
 from bokeh.core.has_props import abstract
 from bokeh.core.enums import enumeration
-from bokeh.models import HTMLBox, Model, ColorMapper
+from bokeh.models import HTMLBox, Model, ColorMapper, ColumnDataSource
 
 vtk_cdn = "https://unpkg.com/vtk.js"
 
@@ -76,6 +76,11 @@ class VTKPlot(AbstractVTKPlot):
 
     data = String(help="""The serialized vtk.js data""")
 
+    arrays = Instance(ColumnDataSource, help="""
+        The files making up the vtk.js scene, files which were already
+        sent to the model are transferred without content and reused
+        from the copy kept by the model in the frontend.""")
+
     axes = Instance(VTKAxes)
 
     enable_keybindings = Bool(default=False)
@@ -87,7 +92,12 @@ class VTKVolumePlot(AbstractVTKPlot):
     (3D geometry objects are not suported)
     """
 
-    data = Dict(String, Any)
+    data = Dict(String, Any, help="""
+        Metadata (dimensions, spacing, dtype...) of the volume.""")
+
+    arrays = Instance(ColumnDataSource, help="""
+        Flat voxel buffer of the volume, held in a ColumnDataSource
+        so it is synced using binary transport.""")
 
     colormap = String(help="Colormap Name")
 
@@ -122,3 +132,8 @@ class VTKVolumePlot(AbstractVTKPlot):
     interpolation = Enum(enumeration('fast_linear','linear','nearest'))
 
     mapper = Dict(String, Any)
+
+    rendered_level = List(Int, help="""
+        Generation and level of the volume the view last rendered
+        while the user was not interacting with it, requesting the
+        next level of the volume pyramid.""")
@@ -1,18 +1,22 @@
 import * as p from "@bokehjs/core/properties"
 
 import {canvas} from "@bokehjs/core/dom"
+import {ColumnDataSource} from "@bokehjs/models/sources/column_data_source"
 
 import {VTKAxes} from "./vtkaxes"
 import {AbstractVTKView, AbstractVTKPlot} from "./vtk_layout"
-import {vtk, vtkns} from "./vtk_utils"
+import {vtk, vtkns, scene_access_helper} from "./vtk_utils"
 
 export class VTKPlotView extends AbstractVTKView {
   model: VTKPlot
   protected _axes: any
   protected _axes_initialized: boolean = false
+  protected _scene_actors: any[] = []
 
   connect_signals(): void {
     super.connect_signals()
+    this.connect(this.model.properties.data.change, () => this.invalidate_render())
+    this.connect(this.model.arrays.change, () => this._plot_scene())
     this.connect(this.model.properties.axes.change, () => {
       this._delete_axes()
       if(this.model.axes)
@@ -40,6 +44,7 @@ export class VTKPlotView extends AbstractVTKView {
     super.render()
     this._axes = null
     this._axes_initialized = false
+    this._scene_actors = []
     this._plot()
   }
 
@@ -99,7 +104,36 @@ export class VTKPlotView extends AbstractVTKView {
     }
   }
 
+  _plot_scene(): void {
+    const {files} = this.model
+    if (!Object.keys(files).length)
+      return
+
+    const renderer = this._vtk_renwin.getRenderer()
+    this._scene_actors.forEach((actor: any) => renderer.removeActor(actor))
+    this._scene_actors = []
+    const previous_actors = renderer.getActors()
+    const sceneImporter = vtkns.HttpSceneLoader.newInstance({
+      renderer,
+      dataAccessHelper: scene_access_helper(files),
+    })
+    const fn = vtk.macro.debounce(() => {
+      this._scene_actors = renderer.getActors().filter(
+        (actor: any) => previous_actors.indexOf(actor) < 0
+      )
+      if (this._axes == null && this.model.axes)
+        this._set_axes()
+      this.model.properties.camera.change.emit()
+    }, 100)
+    sceneImporter.setUrl('index.json')
+    sceneImporter.onReady(fn)
+  }
+
   _plot(): void{
+    if (this.model.arrays.get_length()) {
+      this._plot_scene()
+      return
+    }
     if (!this.model.data) {
       this._vtk_renwin.getRenderWindow().render()
       return
@@ -126,6 +160,7 @@ export class VTKPlotView extends AbstractVTKView {
 export namespace VTKPlot {
   export type Attrs = p.AttrsOf<Props>
   export type Props = AbstractVTKPlot.Props & {
+    arrays: p.Property<ColumnDataSource>
     axes: p.Property<VTKAxes>
     enable_keybindings: p.Property<boolean>
   }
@@ -139,6 +174,9 @@ export class VTKPlot extends AbstractVTKPlot {
   outline: any
   outline_actor: any
 
+  // The scene files received by the model, shared by all its views
+  files: {[path: string]: Uint8Array}
+
   constructor(attrs?: Partial<VTKPlot.Attrs>) {
     super(attrs)
     this.outline = vtkns.OutlineFilter.newInstance() //use to display bouding box of a selected actor
@@ -148,11 +186,37 @@ export class VTKPlot extends AbstractVTKPlot {
     this.outline_actor.setMapper(mapper)
   }
 
+  initialize(): void {
+    super.initialize()
+    this.files = {}
+    this._update_files()
+  }
+
+  connect_signals(): void {
+    super.connect_signals()
+    // Connected before the views, so they render the updated files
+    this.connect(this.arrays.change, () => this._update_files())
+  }
+
+  protected _update_files(): void {
+    // Files already sent to the model are transferred without content,
+    // reuse the copy received on a previous update
+    if (this.arrays == null)
+      return
+    const paths = (this.arrays.data.path || []) as string[]
+    const contents = (this.arrays.data.content || []) as Uint8Array[]
+    const files: {[path: string]: Uint8Array} = {}
+    for (let i = 0; i < paths.length; i++)
+      files[paths[i]] = contents[i].length ? contents[i] : this.files[paths[i]]
+    this.files = files
+  }
+
   static init_VTKPlot(): void {
     this.prototype.default_view = VTKPlotView
 
     this.define<VTKPlot.Props>({
       data:               [ p.String         ],
+      arrays:             [ p.Instance       ],
       axes:               [ p.Instance       ],
       enable_keybindings: [ p.Boolean, false ],
     })
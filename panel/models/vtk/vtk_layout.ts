@@ -76,9 +76,6 @@ export abstract class AbstractVTKView extends PanelHTMLBoxView{
 
   connect_signals(): void {
     super.connect_signals()
-    this.connect(this.model.properties.data.change, () => {
-      this.invalidate_render()
-    })
     this.connect(this.model.properties.orientation_widget.change, () => {
       this._orientation_widget_visibility(this.model.orientation_widget)
     })
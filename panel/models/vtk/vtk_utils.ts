@@ -1,4 +1,5 @@
-import {ARRAY_TYPES, DType} from "@bokehjs/core/util/serialization"
+import {DType} from "@bokehjs/core/util/serialization"
+import {TypedArray} from "@bokehjs/core/types"
 import {linspace} from "@bokehjs/core/util/array"
 
 export const vtk = (window as any).vtk
@@ -35,12 +36,14 @@ if (vtk) {
 }
 
 export type VolumeType = {
-  buffer: string
   dims: number[]
+  original_dims: number[]
   dtype: DType
   spacing: number[]
   origin: number[] | null
   extent: number[] | null
+  level: number
+  generation: number
 }
 
 export function hexToRGB(color: string): number[] {
@@ -89,16 +92,39 @@ export function vtkLutToMapper(vtk_lut: any):  Mapper {
 }
 
 
-function utf8ToAB(utf8_str: string): ArrayBuffer {
-  var buf = new ArrayBuffer(utf8_str.length) // 2 bytes for each char
-  var bufView = new Uint8Array(buf)
-  for (var i=0, strLen=utf8_str.length; i<strLen; i++) {
-    bufView[i] = utf8_str.charCodeAt(i)
+function clean_path(path: string): string {
+  return path.split('/').filter((part: string) => part && part != '.').join('/')
+}
+
+export function scene_access_helper(files: {[path: string]: Uint8Array}): any {
+  // DataAccessHelper resolving the files of a vtkjs scene from memory
+  const decoder = new TextDecoder()
+  const fetch_text = (url: string): Promise<string> => {
+    const content = files[clean_path(url)]
+    if (content == null)
+      return Promise.reject(`File ${url} not found in scene`)
+    return Promise.resolve(decoder.decode(content))
+  }
+  return {
+    fetchJSON(_instance: any, url: string): Promise<any> {
+      return fetch_text(url).then((text: string) => JSON.parse(text))
+    },
+    fetchText(_instance: any, url: string): Promise<string> {
+      return fetch_text(url)
+    },
+    fetchArray(_instance: any, baseURL: string, array: any): Promise<any> {
+      const url = clean_path([baseURL, array.ref.basepath, array.ref.id].join('/'))
+      const content = files[url]
+      if (content == null)
+        return Promise.reject(`Array ${url} not found in scene`)
+      array.buffer = content.buffer.slice(content.byteOffset, content.byteOffset + content.byteLength)
+      array.values = new (window as any)[array.dataType](array.buffer)
+      return Promise.resolve(array)
+    },
   }
-  return buf
 }
 
-export function data2VTKImageData(data: VolumeType): any{
+export function data2VTKImageData(data: VolumeType, values: TypedArray): any{
   const source = vtkns.ImageData.newInstance({
     spacing: data.spacing
   })
@@ -107,7 +133,7 @@ export function data2VTKImageData(data: VolumeType): any{
   const dataArray = vtkns.DataArray.newInstance({
     name: "scalars",
     numberOfComponents: 1,
-    values: new ARRAY_TYPES[data.dtype as DType](utf8ToAB(atob(data.buffer)))
+    values: values
   })
   source.getPointData().setScalars(dataArray)
   return source
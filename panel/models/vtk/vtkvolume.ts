@@ -1,4 +1,6 @@
 import * as p from "@bokehjs/core/properties"
+import {TypedArray} from "@bokehjs/core/types"
+import {ColumnDataSource} from "@bokehjs/models/sources/column_data_source"
 
 
 import {AbstractVTKPlot, AbstractVTKView} from "./vtk_layout"
@@ -10,9 +12,19 @@ export class VTKVolumePlotView extends AbstractVTKView {
   model: VTKVolumePlot
   protected _controllerWidget: any
   protected _vtk_image_data: any
+  protected _refine_pending: boolean = false
 
   connect_signals(): void {
     super.connect_signals()
+    this.connect(this.model.arrays.change, () => {
+      // The voxels are sent after the metadata in the data property,
+      // finer levels of the same volume are swapped in place to
+      // preserve the camera and the controller state
+      if ((this.model.data as VolumeType).level > 0)
+        this._update_volume_data()
+      else
+        this.invalidate_render()
+    })
     this.connect(this.model.properties.colormap.change, () => {
       this.colormap_slector.value = this.model.colormap
       const event = new Event('change');
@@ -62,15 +74,15 @@ export class VTKVolumePlotView extends AbstractVTKView {
       this._vtk_renwin.getRenderWindow().render()
     })
     this.connect(this.model.properties.slice_i.change, () => {
-      this.image_actor_i.getMapper().setISlice(this.model.slice_i)
+      this.image_actor_i.getMapper().setISlice(this._slice_index(0))
       this._vtk_renwin.getRenderWindow().render()
     })
     this.connect(this.model.properties.slice_j.change, () => {
-      this.image_actor_j.getMapper().setJSlice(this.model.slice_j)
+      this.image_actor_j.getMapper().setJSlice(this._slice_index(1))
       this._vtk_renwin.getRenderWindow().render()
     })
     this.connect(this.model.properties.slice_k.change, () => {
-      this.image_actor_k.getMapper().setKSlice(this.model.slice_k)
+      this.image_actor_k.getMapper().setKSlice(this._slice_index(2))
       this._vtk_renwin.getRenderWindow().render()
     })
     this.connect(this.model.properties.render_background.change, () => {
@@ -115,6 +127,61 @@ export class VTKVolumePlotView extends AbstractVTKView {
     return (this.el.querySelector('.js-color-preset') as HTMLSelectElement)
   }
 
+  _slice_index(axis: number): number {
+    // Slices are expressed in the dimensions of the original volume
+    const data = this.model.data as VolumeType
+    const slice = [this.model.slice_i, this.model.slice_j, this.model.slice_k][axis]
+    if (data.original_dims == null)
+      return slice
+    return Math.round(slice * data.dims[axis] / data.original_dims[axis])
+  }
+
+  get voxels(): TypedArray {
+    return this.model.arrays.data.buffer as TypedArray
+  }
+
+  _update_volume_data(): void {
+    const source = data2VTKImageData(this.model.data as VolumeType, this.voxels)
+    this._vtk_image_data = source
+    this.volume.getMapper().setInputData(source)
+    this.volume.getMapper().setSampleDistance(
+      0.7 * Math.sqrt(source.getSpacing()
+                            .map((v: number) => v * v)
+                            .reduce((a: number, b: number) => a + b, 0))
+    )
+    this.volume.getProperty().setScalarOpacityUnitDistance(
+      0,
+      vtkns.BoundingBox.getDiagonalLength(source.getBounds()) /
+        Math.max(...source.getDimensions())
+    )
+    const actors = [this.image_actor_i, this.image_actor_j, this.image_actor_k]
+    actors.forEach((actor: any) => actor.getMapper().setInputData(source))
+    this.image_actor_i.getMapper().setISlice(this._slice_index(0))
+    this.image_actor_j.getMapper().setJSlice(this._slice_index(1))
+    this.image_actor_k.getMapper().setKSlice(this._slice_index(2))
+    this._vtk_renwin.getRenderWindow().render()
+    this._report_rendered()
+  }
+
+  _report_rendered(): void {
+    // Requests the next level of the volume once the current level
+    // was rendered and the user is not interacting with the view
+    const data = this.model.data as VolumeType
+    if (data.generation == null || data.level == null)
+      return
+    if (this._vtk_renwin.getInteractor().isAnimating()) {
+      this._refine_pending = true
+      return
+    }
+    this._refine_pending = false
+    const idle = (window as any).requestIdleCallback || ((cb: () => void) => setTimeout(cb, 0))
+    idle(() => {
+      const current = this.model.data as VolumeType
+      if (current.generation === data.generation && current.level === data.level)
+        this.model.rendered_level = [data.generation, data.level]
+    })
+  }
+
   _set_interpolation(interpolation: InterpolationType): void {
     if (interpolation == 'fast_linear'){
       this.volume.getProperty().setInterpolationTypeToFastLinear()
@@ -134,7 +201,7 @@ export class VTKVolumePlotView extends AbstractVTKView {
       size: [400, 150],
       rescaleColorMap: this.model.rescale,
     })
-    this._vtk_image_data = data2VTKImageData((this.model.data as VolumeType))
+    this._vtk_image_data = data2VTKImageData(this.model.data as VolumeType, this.voxels)
     this._controllerWidget.setContainer(this.el)
     this._vtk_renwin.getRenderWindow().getInteractor()
     this._vtk_renwin.getRenderWindow().getInteractor().setDesiredUpdateRate(45)
@@ -146,6 +213,11 @@ export class VTKVolumePlotView extends AbstractVTKView {
     this._vtk_renwin.getRenderer().setBackground(...hexToRGB(this.model.render_background))
     this._set_interpolation(this.model.interpolation)
     this._vtk_renwin.getRenderer().resetCamera()
+    this._vtk_renwin.getInteractor().onEndAnimation(() => {
+      if (this._refine_pending)
+        this._report_rendered()
+    })
+    this._report_rendered()
   }
 
   _connect_controls(): void{
@@ -255,15 +327,15 @@ export class VTKVolumePlotView extends AbstractVTKView {
     const image_mapper_k = vtkns.ImageMapper.newInstance()
 
     image_mapper_i.setInputData(source)
-    image_mapper_i.setISlice(this.model.slice_i)
+    image_mapper_i.setISlice(this._slice_index(0))
     image_actor_i.setMapper(image_mapper_i)
 
     image_mapper_j.setInputData(source)
-    image_mapper_j.setJSlice(this.model.slice_j)
+    image_mapper_j.setJSlice(this._slice_index(1))
     image_actor_j.setMapper(image_mapper_j)
 
     image_mapper_k.setInputData(source)
-    image_mapper_k.setKSlice(this.model.slice_k)
+    image_mapper_k.setKSlice(this._slice_index(2))
     image_actor_k.setMapper(image_mapper_k)
 
     // set_color and opacity
@@ -299,6 +371,7 @@ export class VTKVolumePlotView extends AbstractVTKView {
 export namespace VTKVolumePlot {
   export type Attrs = p.AttrsOf<Props>
   export type Props = AbstractVTKPlot.Props & {
+    arrays: p.Property<ColumnDataSource>
     shadow: p.Property<boolean>,
     sampling: p.Property<number>,
     edge_gradient: p.Property<number>,
@@ -316,6 +389,7 @@ export namespace VTKVolumePlot {
     render_background: p.Property<string>
     interpolation: p.Property<InterpolationType>
     mapper: p.Property<Mapper>
+    rendered_level: p.Property<number[]>
   }
 }
 
@@ -333,6 +407,7 @@ export class VTKVolumePlot extends AbstractVTKPlot {
 
     this.define<VTKVolumePlot.Props>({
       data:              [ p.Instance               ],
+      arrays:            [ p.Instance               ],
       shadow:            [ p.Boolean,          true ],
       sampling:          [ p.Number,            0.4 ],
       edge_gradient:     [ p.Number,            0.2 ],
@@ -350,6 +425,7 @@ export class VTKVolumePlot extends AbstractVTKPlot {
       render_background: [ p.String,      '#52576e' ],
       interpolation:     [ p.Any,      'fast_linear'],
       mapper:            [ p.Instance               ],
+      rendered_level:    [ p.Array,              [] ],
     })
   }
 }
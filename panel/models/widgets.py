@@ -6,7 +6,21 @@ from __future__ import absolute_import, division, unicode_literals
 from bokeh.core.enums import ButtonType
 from bokeh.core.properties import Int, Float, Override, Enum, Any, Bool, Dict, String
 from bokeh.models.layouts import HTMLBox
-from bokeh.models.widgets import InputWidget, Widget
+from bokeh.models.widgets import FileInput as BkFileInput, InputWidget, Widget
+
+
+class FileInput(BkFileInput):
+    """
+    Extends the bokeh FileInput with support for uploading files to
+    the server in chunks.
+    """
+
+    chunk_size = Int(1024**2, help="""
+        The size in bytes of the chunks the file is uploaded in.""")
+
+    upload_url = String(default=None, help="""
+        The URL the file is uploaded to in chunks. If unset the file
+        is sent as base64 encoded data.""")
 
 
 class Player(Widget):
@@ -74,7 +88,11 @@ class Video(HTMLBox):
 
 class VideoStream(HTMLBox):
 
-    format = Enum('png', 'jpeg', default='png')
+    format = Enum('png', 'jpeg', 'raw', default='png')
+
+    frame_url = String(default=None, help="""
+        If set frames are POSTed to this URL as binary data instead
+        of updating the value.""")
 
     paused = Bool(False, help="""Whether the video is paused""")
 
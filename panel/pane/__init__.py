@@ -14,7 +14,7 @@ from .deckgl import DeckGL # noqa
 from .holoviews import HoloViews # noqa
 from .ipywidget import IPyWidget # noqa
 from .image import GIF, JPG, PNG, SVG # noqa
-from .markup import DataFrame, HTML, JSON, Markdown, Str # noqa
+from .markup import DataFrame, HTML, JSON, Log, Markdown, Str # noqa
 from .media import Audio, Video # noqa
 from .plotly import Plotly # noqa
 from .plot import Bokeh, Matplotlib, RGGPlot, YT # noqa
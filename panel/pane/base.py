@@ -102,6 +102,8 @@ class PaneBase(Reactive):
     # List of parameters that trigger a rerender of the Bokeh model
     _rerender_params = ['object']
 
+    _instrumented_methods = Reactive._instrumented_methods + ['_update_pane']
+
     __abstract = True
 
     def __init__(self, object=None, **params):
@@ -5,35 +5,92 @@ SymPy objects.
 from __future__ import absolute_import, division, unicode_literals
 
 import sys
+import threading
 
+from collections import OrderedDict
 from six import string_types
 
 import param
 
 from pyviz_comms import JupyterComm
 
+from ..io.state import state
 from .markup import DivPaneBase
 
+# Maximum number of SymPy expressions held in the LaTeX cache
+LATEX_CACHE_SIZE = 500
+
+_latex_cache = OrderedDict()
+_latex_futures = {}
+_latex_lock = threading.Lock()
+
 
 def is_sympy_expr(obj):
     """Test for sympy.Expr types without usually needing to import sympy"""
-    if 'sympy' in sys.modules and 'sympy' in str(type(obj).__class__):
+    if 'sympy' in sys.modules:
         import sympy
-        if isinstance(obj, sympy.Expr):
-            return True
+        return isinstance(obj, sympy.Expr)
     return False
 
 
+def _sympy_latex(expr):
+    """
+    Converts a SymPy expression to LaTeX, memoizing the result in an
+    LRU cache keyed by the structural hash of the expression.
+    """
+    with _latex_lock:
+        if expr in _latex_cache:
+            _latex_cache.move_to_end(expr)
+            return _latex_cache[expr]
+    if hasattr(expr, '_repr_latex_'):
+        latex = expr._repr_latex_()
+    else:
+        import sympy
+        latex = r'$'+sympy.latex(expr)+'$'
+    with _latex_lock:
+        _latex_cache[expr] = latex
+        while len(_latex_cache) > LATEX_CACHE_SIZE:
+            _latex_cache.popitem(last=False)
+    return latex
+
+
+def _sympy_latex_async(expr):
+    """
+    Converts a SymPy expression to LaTeX in a worker thread, returning
+    a Future. Concurrent conversions of the same expression are shared.
+    """
+    with _latex_lock:
+        if expr in _latex_futures:
+            return _latex_futures[expr]
+        _latex_futures[expr] = future = state._submit(_sympy_latex, expr)
+
+    def done(future):
+        with _latex_lock:
+            _latex_futures.pop(expr, None)
+
+    future.add_done_callback(done)
+    return future
+
+
 class LaTeX(DivPaneBase):
 
     renderer = param.ObjectSelector(default=None, allow_None=True,
                                     objects=['katex', 'mathjax'], doc="""
         The JS renderer used to render the LaTeX expression.""")
 
+    threaded = param.Boolean(default=False, doc="""
+        Whether to convert uncached SymPy expressions to LaTeX in a
+        worker thread in a server session, updating the pane once the
+        conversion is done.""")
+
     # Priority is dependent on the data type
     priority = None
 
-    _rename = {"renderer": None}
+    _rename = {"renderer": None, "threaded": None}
+
+    def __init__(self, object=None, **params):
+        super(LaTeX, self).__init__(object=object, **params)
+        self._pending = None
 
     @classmethod
     def applies(cls, obj):
@@ -64,20 +121,58 @@ class LaTeX(DivPaneBase):
         return getattr(sys.modules['panel.models.'+module], model)
 
     def _get_model(self, doc, root=None, parent=None, comm=None):
-        model = self._get_model_type(comm)(**self._get_properties())
+        model = self._get_model_type(comm)(**self._get_properties(doc))
         if root is None:
             root = model
         self._models[root.ref['id']] = (model, parent)
         return model
 
-    def _get_properties(self):
+    def _update(self, model):
+        # Keep displaying the previous expression until converted
+        if self._data_pending(model.document):
+            return
+        model.update(**self._get_properties(model.document))
+
+    def _data_pending(self, doc):
+        """
+        Returns whether a SymPy expression is still being converted to
+        LaTeX off the event loop.
+        """
+        expr = self.object
+        if (not self.threaded or doc is None or not doc.session_context or
+            not is_sympy_expr(expr)):
+            return False
+        with _latex_lock:
+            if expr in _latex_cache:
+                return False
+
+        # Views and repeated checks share a single update per conversion
+        future = _sympy_latex_async(expr)
+        if future is self._pending:
+            return True
+        self._pending = future
+
+        def update(future):
+            if self._pending is future:
+                self._pending = None
+            if self.object is not expr:
+                return
+            elif future.exception() is None:
+                doc.add_next_tick_callback(self._update_pane)
+            else:
+                self.param.warning('Converting the expression to LaTeX '
+                                   'failed: %s' % future.exception())
+
+        future.add_done_callback(update)
+        return True
+
+    def _get_properties(self, doc=None):
         properties = super(LaTeX, self)._get_properties()
         obj = self.object
-        if obj is None:
+        if obj is None or self._data_pending(doc):
             obj = ''
+        elif is_sympy_expr(obj):
+            obj = _sympy_latex(obj)
         elif hasattr(obj, '_repr_latex_'):
             obj = obj._repr_latex_()
-        elif is_sympy_expr(obj):
-            import sympy
-            obj = r'$'+sympy.latex(obj)+'$'
         return dict(properties, text=obj)
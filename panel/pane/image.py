@@ -5,15 +5,105 @@ file types.
 from __future__ import absolute_import, division, unicode_literals
 
 import base64
+import threading
+import time
 
+from collections import OrderedDict
 from io import BytesIO
 from six import string_types
 
 import param
 
 from .markup import escape, DivPaneBase
+from ..io.server import asset_url, session_routes
+from ..io.state import state
 from ..util import isfile, isurl
 
+# Maximum number of responses held in the URL cache
+URL_CACHE_SIZE = 100
+
+# Age in seconds after which cached responses are revalidated
+URL_MAX_AGE = 30
+
+# Maximum number of connections kept open to a single host
+URL_POOL_SIZE = 10
+
+# Seconds after which connecting to or reading from a host times out
+URL_TIMEOUT = 10
+
+_url_cache = OrderedDict()
+_url_futures = {}
+_url_lock = threading.Lock()
+_url_session = None
+
+
+def _http_session():
+    global _url_session
+    if _url_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _url_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=URL_POOL_SIZE, pool_maxsize=URL_POOL_SIZE)
+        _url_session.mount('http://', adapter)
+        _url_session.mount('https://', adapter)
+    return _url_session
+
+
+def _request_url(url):
+    """
+    Requests the URL, revalidating a cached response using its ETag,
+    and stores the response in the LRU cache. Raises an error without
+    caching the response if the request failed.
+    """
+    with _url_lock:
+        entry = _url_cache.get(url)
+    headers = {'If-None-Match': entry[0]} if entry is not None and entry[0] else {}
+    r = _http_session().get(url, headers=headers, timeout=URL_TIMEOUT)
+    if r.status_code == 304 and entry is not None:
+        etag, content = entry[0], entry[1]
+    else:
+        r.raise_for_status()
+        etag, content = r.headers.get('ETag'), r.content
+    with _url_lock:
+        _url_cache[url] = (etag, content, time.time())
+        _url_cache.move_to_end(url)
+        while len(_url_cache) > URL_CACHE_SIZE:
+            _url_cache.popitem(last=False)
+    return content
+
+
+def _fetch_url(url, max_age=0):
+    """
+    Returns the content of the URL from the LRU cache, responses older
+    than max_age are revalidated unless that is already in progress.
+    """
+    with _url_lock:
+        entry = _url_cache.get(url)
+        pending = url in _url_futures
+    if entry is not None and (pending or (time.time() - entry[2]) < max_age):
+        return entry[1]
+    return _request_url(url)
+
+
+def _fetch_url_async(url):
+    """
+    Fetches the URL in a worker thread, returning a Future. Concurrent
+    requests for the same URL share a single fetch, once it completed
+    or failed the URL is fetched again on the next request.
+    """
+    with _url_lock:
+        if url in _url_futures:
+            return _url_futures[url]
+        _url_futures[url] = future = state._submit(_request_url, url)
+
+    def done(future):
+        with _url_lock:
+            if _url_futures.get(url) is future:
+                del _url_futures[url]
+
+    future.add_done_callback(done)
+    return future
+
 
 class ImageBase(DivPaneBase):
     """
@@ -38,7 +128,9 @@ class ImageBase(DivPaneBase):
         website.""")
 
     embed = param.Boolean(default=True, doc="""
-        Whether to embed the image as base64.""")
+        Whether to embed the image as base64. When served the image
+        is instead sent once and served by content hash, allowing
+        browsers to cache it.""")
 
     imgtype = 'None'
 
@@ -78,17 +170,74 @@ class ImageBase(DivPaneBase):
         if hasattr(self.object, 'read'):
             return self.object.read()
         if isurl(self.object, [self.imgtype]):
-            import requests
-            r = requests.request(url=self.object, method='GET')
-            return r.content
+            return _fetch_url(self.object, URL_MAX_AGE)
 
     def _imgshape(self, data):
         """Calculate and return image width,height"""
         raise NotImplementedError
 
-    def _get_properties(self):
+    @property
+    def _mime_type(self):
+        return "image/" + self.imgtype
+
+    def _src(self, data, mime_type, doc=None):
+        """
+        Returns the image src, in a server session the image is served
+        by the server, otherwise it is embedded as base64.
+        """
+        if session_routes(doc):
+            extension = mime_type.split('/')[-1].split('+')[0]
+            return asset_url(data, extension, doc)
+        b64 = base64.b64encode(data).decode("utf-8")
+        return "data:{mime};base64,{b64}".format(mime=mime_type, b64=b64)
+
+    def _data_pending(self, doc):
+        """
+        Returns whether the image data is still being loaded off the
+        event loop.
+
+        In a server session URLs are fetched in a worker thread so the
+        event loop is not blocked. Cached responses are used immediately and
+        revalidated in the background once they are stale, the pane is
+        rerendered when a fetch updated the image.
+        """
+        url = self.object
+        if (doc is None or not doc.session_context or
+            hasattr(url, '_repr_{}_'.format(self.imgtype)) or
+            not isurl(url, [self.imgtype]) or isfile(url)):
+            return False
+        with _url_lock:
+            entry = _url_cache.get(url)
+        if entry is not None and (time.time() - entry[2]) < URL_MAX_AGE:
+            return False
+
+        def update(future):
+            if self.object != url:
+                return
+            elif future.exception() is not None:
+                self.param.warning('Fetching %s failed: %s' % (url, future.exception()))
+            elif entry is None or future.result() is not entry[1]:
+                doc.add_next_tick_callback(self._update_pane)
+
+        _fetch_url_async(url).add_done_callback(update)
+        return entry is None
+
+    def _get_model(self, doc, root=None, parent=None, comm=None):
+        model = self._bokeh_model(**self._get_properties(doc))
+        if root is None:
+            root = model
+        self._models[root.ref['id']] = (model, parent)
+        return model
+
+    def _update(self, model):
+        # Keep displaying the previous image until the new one is loaded
+        if self._data_pending(model.document):
+            return
+        model.update(**self._get_properties(model.document))
+
+    def _get_properties(self, doc=None):
         p = super(ImageBase, self)._get_properties()
-        if self.object is None:
+        if self.object is None or self._data_pending(doc):
             return dict(p, text='<img></img>')
         data = self._img()
         if not isinstance(data, bytes):
@@ -106,8 +255,7 @@ class ImageBase(DivPaneBase):
         if not self.embed:
             src = self.object
         else:
-            b64 = base64.b64encode(data).decode("utf-8")
-            src = "data:image/"+self.imgtype+";base64,{b64}".format(b64=b64)
+            src = self._src(data, self._mime_type, doc)
 
         smode = self.sizing_mode
         if smode in ['fixed', None]:
@@ -208,9 +356,9 @@ class SVG(ImageBase):
     def _imgshape(self, data):
         return (self.width, self.height)
 
-    def _get_properties(self):
+    def _get_properties(self, doc=None):
         p = super(ImageBase, self)._get_properties()
-        if self.object is None:
+        if self.object is None or self._data_pending(doc):
             return dict(p, text='<img></img>')
         data = self._img()
         width, height = self._imgshape(data)
@@ -218,8 +366,7 @@ class SVG(ImageBase):
             data = data.encode('utf-8')
 
         if self.encode:
-            b64 = base64.b64encode(data).decode("utf-8")
-            src = "data:image/svg+xml;base64,{b64}".format(b64=b64)
+            src = self._src(data, "image/svg+xml", doc)
             html = "<img src='{src}' width={width} height={height}></img>".format(
                 src=src, width=width, height=height
             )
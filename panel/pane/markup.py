@@ -6,16 +6,61 @@ from __future__ import absolute_import, division, unicode_literals
 
 import json
 import textwrap
+import threading
 
+from collections import OrderedDict
+from functools import partial
 from six import string_types
 
 import param
 
-from ..models import HTML as _BkHTML, JSON as _BkJSON
+from ..io.notebook import push
+from ..io.server import unlocked
+from ..io.state import state
+from ..models import HTML as _BkHTML, JSON as _BkJSON, Log as _BkLog
 from ..util import escape
 from ..viewable import Layoutable
 from .base import PaneBase
 
+# Maximum number of rendered Markdown documents held in the cache
+MARKDOWN_CACHE_SIZE = 500
+
+_markdown_cache = OrderedDict()
+_markdown_renderers = {}
+_markdown_lock = threading.Lock()
+
+
+def _render_markdown(text, dedent, extensions):
+    """
+    Renders Markdown to HTML using a shared Markdown instance for each
+    set of extensions, caching the output in an LRU cache.
+    """
+    import markdown
+    key = (text, dedent, tuple(extensions))
+    try:
+        hash(key)
+    except TypeError:
+        key = None
+    with _markdown_lock:
+        if key in _markdown_cache:
+            _markdown_cache.move_to_end(key)
+            return _markdown_cache[key]
+        if dedent:
+            text = textwrap.dedent(text)
+        if key is None:
+            return markdown.markdown(text, extensions=extensions,
+                                     output_format='html5')
+        renderer = _markdown_renderers.get(key[2])
+        if renderer is None:
+            renderer = markdown.Markdown(extensions=extensions,
+                                         output_format='html5')
+            _markdown_renderers[key[2]] = renderer
+        html = renderer.reset().convert(text)
+        _markdown_cache[key] = html
+        while len(_markdown_cache) > MARKDOWN_CACHE_SIZE:
+            _markdown_cache.popitem(last=False)
+    return html
+
 
 class DivPaneBase(PaneBase):
     """
@@ -249,6 +294,117 @@ class Str(DivPaneBase):
         return dict(properties, text=escape(text))
 
 
+def _trim_lines(text, max_lines):
+    """
+    Retains only the last max_lines lines of the text.
+    """
+    index = len(text)-1 if text.endswith('\n') else len(text)
+    for _ in range(max_lines):
+        index = text.rfind('\n', 0, index)
+        if index < 0:
+            return text
+    return text[index+1:]
+
+
+class Log(DivPaneBase):
+    """
+    A Log pane displays a stream of text, e.g. the output of a long
+    running job. Text added using the write and append methods is sent
+    to the frontend incrementally, coalescing all writes in a server
+    session into a single message per tick, and only the last
+    max_lines lines are retained.
+    """
+
+    max_lines = param.Integer(default=1000, bounds=(1, None), doc="""
+        Maximum number of lines retained in the scrollback buffer.""")
+
+    priority = 0
+
+    _bokeh_model = _BkLog
+
+    _rename = {'object': 'text'}
+
+    _rerender_params = ['object', 'max_lines']
+
+    def __init__(self, object=None, **params):
+        super(Log, self).__init__(object=object, **params)
+        self._pending = {}
+        self._sequence = 0
+
+    @classmethod
+    def applies(cls, obj):
+        return isinstance(obj, string_types)
+
+    def _get_properties(self):
+        properties = super(Log, self)._get_properties()
+        text = _trim_lines(self.object or '', self.max_lines)
+        return dict(properties, text=text, max_lines=self.max_lines)
+
+    def _update(self, model):
+        for ref, (m, _) in self._models.items():
+            if m is model:
+                self._pending.pop(ref, None)
+        properties = self._get_properties()
+        if model.chunk is not None and model.text == properties['text']:
+            # The text of the model does not include the chunks sent
+            # since, so the log has to be reset explicitly
+            self._sequence += 1
+            properties['chunk'] = (self._sequence, properties['text'], True)
+        model.update(**properties)
+
+    def _flush(self, ref):
+        chunks = self._pending.pop(ref, None)
+        if not chunks or ref not in self._models or ref not in state._views:
+            return
+        self._sequence += 1
+        self._models[ref][0].chunk = (self._sequence, ''.join(chunks), False)
+        viewable, root, doc, comm = state._views[ref]
+        if comm and 'embedded' not in root.tags:
+            push(doc, comm)
+
+    def write(self, text):
+        """
+        Writes text to the end of the log.
+
+        Arguments
+        ---------
+        text (str): The text to write
+        """
+        text = str(text)
+        if not text:
+            return
+        with param.discard_events(self):
+            self.object = _trim_lines((self.object or '') + text, self.max_lines)
+        for ref in self._models:
+            if ref not in state._views or ref in state._fake_roots:
+                continue
+            viewable, root, doc, comm = state._views[ref]
+            pending = self._pending.setdefault(ref, [])
+            pending.append(text)
+            if len(pending) > 1:
+                continue
+            if comm is None and doc.session_context:
+                doc.add_next_tick_callback(partial(self._flush, ref))
+            else:
+                self._flush(ref)
+
+    def append(self, line):
+        """
+        Appends a line to the log.
+
+        Arguments
+        ---------
+        line (str): The line to append
+        """
+        self.write(str(line) + '\n')
+
+    def clear(self):
+        """
+        Clears the log.
+        """
+        self.object = ''
+
+
 class Markdown(DivPaneBase):
     """
     A Markdown pane renders the markdown markup language to HTML and
@@ -281,23 +437,26 @@ class Markdown(DivPaneBase):
             return False
 
     def _get_properties(self):
-        import markdown
         data = self.object
         if data is None:
             data = ''
         elif not isinstance(data, string_types):
             data = data._repr_markdown_()
-        if self.dedent:
-            data = textwrap.dedent(data)
         properties = super(Markdown, self)._get_properties()
         properties['style'] = properties.get('style', {})
         css_classes = properties.pop('css_classes', []) + ['markdown']
-        html = markdown.markdown(data, extensions=self.extensions,
-                                 output_format='html5')
+        html = _render_markdown(data, self.dedent, self.extensions)
         return dict(properties, text=escape(html), css_classes=css_classes)
 
 
 
+def _json_key(key):
+    """
+    Returns the key of a dictionary as it is represented in JSON.
+    """
+    return key if isinstance(key, string_types) else json.dumps(key)
+
+
 class JSON(DivPaneBase):
 
     depth = param.Integer(default=1, bounds=(-1, None), doc="""
@@ -309,6 +468,10 @@ class JSON(DivPaneBase):
     hover_preview = param.Boolean(default=False, doc="""
         Whether to display a hover preview for collapsed nodes.""")
 
+    lazy = param.Boolean(default=False, doc="""
+        Whether to only serialize the levels expanded up to the depth,
+        loading collapsed subtrees from Python when they are expanded.""")
+
     margin = param.Parameter(default=(5, 20, 5, 5), doc="""
         Allows to create additional space around the component. May
         be specified as a two-tuple of the form (vertical, horizontal)
@@ -321,7 +484,14 @@ class JSON(DivPaneBase):
 
     _applies_kw = True
     _bokeh_model = _BkJSON
-    _rename = {"name": None, "object": "text", "encoder": None}
+    _rename = {"name": None, "object": "text", "encoder": None, "lazy": None}
+
+    _rerender_params = ['object', 'depth', 'encoder', 'lazy']
+
+    def __init__(self, object=None, **params):
+        super(JSON, self).__init__(object=object, **params)
+        self._subtrees = {}
+        self._sequence = 0
 
     @classmethod
     def applies(cls, obj, **params):
@@ -339,10 +509,90 @@ class JSON(DivPaneBase):
 
     def _get_properties(self):
         properties = super(JSON, self)._get_properties()
+        placeholders = []
         if isinstance(self.object, string_types):
             text = self.object
+        elif self.lazy and self.depth >= 0:
+            text, placeholders = self._serialize_subtree((), self.depth)
         else:
             text = json.dumps(self.object or {}, cls=self.encoder)
         depth = float('inf') if self.depth < 0 else self.depth
-        return dict(text=text, theme=self.theme, depth=depth,
+        return dict(text=text, theme=self.theme, depth=depth, placeholders=placeholders,
                     hover_preview=self.hover_preview, **properties)
+
+    def _get_model(self, doc, root=None, parent=None, comm=None):
+        model = super(JSON, self)._get_model(doc, root, parent, comm)
+        self._link_props(model, ['request'], doc, root or model, comm)
+        return model
+
+    def _process_events(self, events):
+        if 'request' in events:
+            events = dict(events)
+            self._load_subtree(events.pop('request'))
+        if events:
+            super(JSON, self)._process_events(events)
+
+    def _update_pane(self, *events):
+        self._subtrees.clear()
+        super(JSON, self)._update_pane(*events)
+
+    def _serialize_subtree(self, path, depth):
+        """
+        Serializes the subtree at the path to the supplied depth,
+        replacing deeper containers with placeholders which can be
+        loaded on request. Returns the JSON text and the paths of the
+        placeholders, caching the result by path.
+        """
+        key = (tuple(path), depth)
+        if key in self._subtrees:
+            return self._subtrees[key]
+        placeholders = []
+
+        def truncate(obj, path, level):
+            if isinstance(obj, dict):
+                if level >= depth and obj:
+                    placeholders.append(json.dumps(path))
+                    return {'\u2026': 'Object'}
+                return {k: truncate(v, path+[_json_key(k)], level+1)
+                        for k, v in obj.items()}
+            elif isinstance(obj, (list, tuple)):
+                if level >= depth and obj:
+                    placeholders.append(json.dumps(path))
+                    return {'\u2026': 'Array[%d]' % len(obj)}
+                return [truncate(v, path+[str(i)], level+1)
+                        for i, v in enumerate(obj)]
+            return obj
+
+        obj = self.object or {}
+        for k in path:
+            if isinstance(obj, dict):
+                obj = obj[k] if k in obj else next(
+                    v for ok, v in obj.items() if _json_key(ok) == k)
+            else:
+                obj = obj[int(k)]
+        text = json.dumps(truncate(obj, list(path), 0), cls=self.encoder)
+        self._subtrees[key] = (text, placeholders)
+        return text, placeholders
+
+    def _load_subtree(self, request):
+        if not request:
+            return
+        text, placeholders = self._serialize_subtree(json.loads(request), 1)
+        # The sequence number and resetting the request ensure that the
+        # same subtree can be requested and sent again after a rerender
+        self._sequence += 1
+        msg = {'request': None, 'subtree': [self._sequence, request, text, placeholders]}
+        for ref, (model, _) in self._models.items():
+            # Only reply to the views which requested the subtree
+            if (model.request != request or ref not in state._views or
+                ref in state._fake_roots):
+                continue
+            viewable, root, doc, comm = state._views[ref]
+            if comm or not doc.session_context or state._unblocked(doc):
+                with unlocked():
+                    self._update_model({}, msg, root, model, doc, comm)
+                if comm and 'embedded' not in root.tags:
+                    push(doc, comm)
+            else:
+                cb = partial(self._update_model, {}, msg, root, model, doc, comm)
+                doc.add_next_tick_callback(cb)
@@ -12,6 +12,7 @@ from six import string_types
 import numpy as np
 import param
 
+from ..io.server import asset_url, file_url, session_routes
 from ..models import Audio as _BkAudio, Video as _BkVideo
 from ..util import isfile, isurl
 from .base import PaneBase
@@ -66,6 +67,8 @@ class _MediaBase(PaneBase):
 
     def _get_model(self, doc, root=None, parent=None, comm=None):
         props = self._process_param_change(self._init_properties())
+        if 'value' in props:
+            props['value'] = self._media_src(props['value'], doc)
         model = self._bokeh_model(**props)
         if root is None:
             root = model
@@ -79,30 +82,37 @@ class _MediaBase(PaneBase):
         wavfile.write(buffer, self.sample_rate, data)
         return buffer
 
-    def _process_param_change(self, msg):
-        msg = super(_MediaBase, self)._process_param_change(msg)
+    def _update_model(self, events, msg, root, model, doc, comm):
         if 'value' in msg:
-            value = msg['value']
-            if isinstance(value, np.ndarray):
-                fmt = 'wav'
-                buffer = self._from_numpy(value)
-                data = b64encode(buffer.getvalue())
-            elif os.path.isfile(value):
-                fmt = value.split('.')[-1]
-                with open(value, 'rb') as f:
-                    data = f.read()
-                data = b64encode(data)
-            elif value.lower().startswith('http'):
-                return msg
-            elif not value:
-                data, fmt = b'', self._default_mime
-            else:
-                raise ValueError('Object should be either path to a sound file or numpy array')
-            template = 'data:audio/{mime};base64,{data}'
-            msg['value'] = template.format(data=data.decode('utf-8'),
-                                           mime=fmt)
-            
-        return msg
+            msg = dict(msg, value=self._media_src(msg['value'], doc))
+        super(_MediaBase, self)._update_model(events, msg, root, model, doc, comm)
+
+    def _media_src(self, value, doc):
+        """
+        Returns the src for the media, in a server session local files
+        and arrays are served by the server, which supports range
+        requests, otherwise they are embedded as base64.
+        """
+        served = session_routes(doc)
+        if isinstance(value, np.ndarray):
+            fmt = 'wav'
+            data = self._from_numpy(value).getvalue()
+            if served:
+                return asset_url(data, fmt, doc)
+        elif os.path.isfile(value):
+            fmt = value.split('.')[-1]
+            if served:
+                return file_url(value, doc)
+            with open(value, 'rb') as f:
+                data = f.read()
+        elif value.lower().startswith('http'):
+            return value
+        elif not value:
+            data, fmt = b'', self._default_mime
+        else:
+            raise ValueError('Object should be either path to a sound file or numpy array')
+        template = 'data:audio/{mime};base64,{data}'
+        return template.format(data=b64encode(data).decode('utf-8'), mime=fmt)
 
 
 class Audio(_MediaBase):
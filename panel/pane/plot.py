@@ -4,19 +4,58 @@ Pane class which render plots from different libraries
 from __future__ import absolute_import, division, unicode_literals
 
 import sys
+import threading
+import weakref
 
+from collections import OrderedDict
 from io import BytesIO
 
 import param
 
 from bokeh.models import LayoutDOM, CustomJS, Spacer as BkSpacer
 
-from ..io import remove_root
+from ..io import remove_root, state
 from ..viewable import Layoutable
 from .base import PaneBase
 from .markup import HTML
 from .image import PNG
 
+# Render state of each matplotlib figure, which may be shown by
+# several panes and sessions
+_figure_states = weakref.WeakKeyDictionary()
+_figure_states_lock = threading.Lock()
+
+
+class _FigureState(object):
+    """
+    Serializes the renders of a matplotlib figure, which is not
+    thread safe, and versions the figure to invalidate cached
+    renders. The stale_callback of the figure, which is called
+    whenever an artist on the figure is modified, is wrapped once to
+    bump the version, except while the figure is being rendered.
+    """
+
+    def __init__(self, fig):
+        self.lock = threading.RLock()
+        self.version = 0
+        self.rendering = False
+        callback = fig.stale_callback
+
+        def stale_callback(artist, val):
+            if not self.rendering:
+                self.version += 1
+            if callback is not None:
+                callback(artist, val)
+
+        fig.stale_callback = stale_callback
+
+
+def _figure_state(fig):
+    with _figure_states_lock:
+        if fig not in _figure_states:
+            _figure_states[fig] = _FigureState(fig)
+        return _figure_states[fig]
+
 
 class Bokeh(PaneBase):
     """
@@ -64,16 +103,31 @@ class Matplotlib(PNG):
     pixels is determined by scaling the size of the figure in inches
     by a dpi of 72, increasing the dpi therefore controls the
     resolution of the image not the displayed size.
+
+    Rendered images are cached until the figure is modified and in a
+    server session figures are rendered in a worker thread.
     """
 
     dpi = param.Integer(default=144, bounds=(1, None), doc="""
         Scales the dpi of the matplotlib figure.""")
 
+    format = param.ObjectSelector(default='png', objects=['png', 'svg'], doc="""
+        The format to render the figure to, unlike png an svg can be
+        scaled by the browser without rendering it again.""")
+
     tight = param.Boolean(default=False, doc="""
         Automatically adjust the figure size to fit the
         subplots and other artist elements.""")
 
-    _rerender_params = PNG._rerender_params + ['object', 'dpi', 'tight']
+    _rerender_params = PNG._rerender_params + ['object', 'dpi', 'format', 'tight']
+
+    # Number of rendered images to cache
+    _render_cache_size = 4
+
+    def __init__(self, object=None, **params):
+        super(Matplotlib, self).__init__(object, **params)
+        self._renders = OrderedDict()
+        self._pending = None
 
     @classmethod
     def applies(cls, obj):
@@ -91,17 +145,72 @@ class Matplotlib(PNG):
         w, h = self.object.get_size_inches()
         return int(w*72), int(h*72)
 
-    def _img(self):
-        self.object.set_dpi(self.dpi)
+    @property
+    def _mime_type(self):
+        return 'image/svg+xml' if self.format == 'svg' else 'image/png'
+
+    def _update_pane(self, *events):
+        for event in events:
+            if event.name == 'object' and self.object is not None:
+                # Explicitly triggered figures may have been modified
+                # without marking them stale
+                _figure_state(self.object).version += 1
+        super(Matplotlib, self)._update_pane(*events)
+
+    def _render_key(self):
+        version = _figure_state(self.object).version
+        return (id(self.object), version, self.dpi, self.tight, self.format)
+
+    def _render(self, key):
+        _, _, dpi, tight, fmt = key
+        fig = self.object
         b = BytesIO()
+        figure_state = _figure_state(fig)
+        with figure_state.lock:
+            figure_state.rendering = True
+            try:
+                fig.set_dpi(dpi)
+                fig.canvas.print_figure(
+                    b, bbox_inches='tight' if tight else None, format=fmt
+                )
+            finally:
+                figure_state.rendering = False
+        self._renders[key] = data = b.getvalue()
+        while len(self._renders) > self._render_cache_size:
+            self._renders.popitem(last=False)
+        return data
+
+    def _data_pending(self, doc):
+        """
+        In a server session uncached figures are rendered in a worker
+        thread, updating the pane once the render is done.
+        """
+        if doc is None or not doc.session_context or self.object is None:
+            return False
+        key = self._render_key()
+        if key in self._renders:
+            return False
+        elif self._pending == key:
+            return True
+        self._pending = key
+
+        def update(future):
+            if self._pending != key:
+                return
+            self._pending = None
+            if future.exception() is None:
+                doc.add_next_tick_callback(self._update_pane)
+            else:
+                self.param.warning('Rendering the figure failed: %s' % future.exception())
+
+        state._submit(self._render, key).add_done_callback(update)
+        return True
 
-        if self.tight:
-            bbox_inches = 'tight'
-        else:
-            bbox_inches = None
-
-        self.object.canvas.print_figure(b, bbox_inches=bbox_inches)
-        return b.getvalue()
+    def _img(self):
+        key = self._render_key()
+        if key in self._renders:
+            return self._renders[key]
+        return self._render(key)
 
 
 class RGGPlot(PNG):
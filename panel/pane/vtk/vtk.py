@@ -4,8 +4,13 @@ Defines a VTKPane which renders a vtk plot using VTKPlot bokeh model.
 """
 from __future__ import absolute_import, division, unicode_literals
 
+import os
 import sys
 import base64
+import hashlib
+import weakref
+
+from collections import OrderedDict
 
 try:
     from urllib.request import urlopen
@@ -17,10 +22,15 @@ from six import string_types
 import param
 import numpy as np
 
+from bokeh.models import ColumnDataSource
+from bokeh.util.serialization import BINARY_ARRAY_TYPES
 from pyviz_comms import JupyterComm
+from tornado.ioloop import IOLoop
 
 from .enums import PRESET_CMAPS
 from ..base import PaneBase
+from ...config import config
+from ...io import push, state, unlocked
 from ...util import isfile
 
 if sys.version_info >= (2, 7):
@@ -29,6 +39,48 @@ else:
     base64encode = lambda x: x.encode('base64')
 
 
+def _binary_array(array):
+    """
+    Casts the array to a dtype supported by bokeh's binary transport.
+    """
+    if array.dtype in BINARY_ARRAY_TYPES:
+        return array
+    elif array.dtype.kind == 'b':
+        return array.view(np.uint8)
+    elif array.dtype.kind in 'iu':
+        dtype = np.dtype(array.dtype.kind + '4')
+        info = np.iinfo(dtype)
+        if array.size and info.min <= array.min() and array.max() <= info.max:
+            return array.astype(dtype)
+    elif array.dtype.itemsize < 4:
+        return array.astype(np.float32)
+    return array.astype(np.float64)
+
+
+def _subsample(array, spacing, max_data_size):
+    """
+    Subsamples the array so that its size does not exceed
+    max_data_size (in MB), returning the subsampled array and its
+    spacing.
+    """
+    original_shape = array.shape
+    extent = tuple((o_s - 1) * s for o_s, s in zip(original_shape, spacing))
+    dim_ratio = np.cbrt((np.prod(original_shape) / 1e6) / max_data_size)
+    max_shape = tuple(int(o_s / dim_ratio) for o_s in original_shape)
+    dowsnscale_factor = [max(o_s, m_s) / m_s for m_s, o_s in zip(max_shape, original_shape)]
+
+    if not any([d_f > 1 for d_f in dowsnscale_factor]):
+        return array, spacing
+    try:
+        import scipy.ndimage as nd
+        sub_array = nd.interpolation.zoom(array, zoom=[1 / d_f for d_f in dowsnscale_factor], order=0)
+    except ImportError:
+        sub_array = array[::int(np.ceil(dowsnscale_factor[0])),
+                          ::int(np.ceil(dowsnscale_factor[1])),
+                          ::int(np.ceil(dowsnscale_factor[2]))]
+    return sub_array, tuple(e / (s - 1) for e, s in zip(extent, sub_array.shape))
+
+
 class VTKVolume(PaneBase):
 
     ambient = param.Number(default=0.2, step=1e-2, doc="""
@@ -126,9 +178,22 @@ class VTKVolume(PaneBase):
 
     _updates = True
 
+    # Size in MB below which volumes are sent in a single level
+    _min_level_size = 1
+
+    # Subsampled arrays shared between all VTKVolume panes, indexed
+    # by object identity/version, spacing and max_data_size
+    _subsample_cache = OrderedDict()
+
+    # Number of subsampled arrays kept in the cache
+    _subsample_cache_size = 4
+
     def __init__(self, object=None, **params):
         super(VTKVolume, self).__init__(object, **params)
         self._sub_spacing = self.spacing
+        self._levels = []
+        self._generation = 0
+        self._prefetching = None
         self._update()
 
     @classmethod
@@ -158,13 +223,15 @@ class VTKVolume(PaneBase):
             VTKVolumePlot = getattr(sys.modules['panel.models.vtk'], 'VTKVolumePlot')
 
         props = self._process_param_change(self._init_properties())
-        volume_data = self._volume_data
+        progressive = (comm is not None or doc.session_context) and not config.embed
+        volume_data = self._levels[0] if progressive and self._levels else self._volume_data
 
-        model = VTKVolumePlot(data=volume_data,
-                              **props)
+        model = VTKVolumePlot(arrays=ColumnDataSource(), **props)
+        self._set_volume(model, volume_data)
         if root is None:
             root = model
-        self._link_props(model, ['colormap', 'orientation_widget', 'camera', 'mapper'], doc, root, comm)
+        self._link_props(model, ['colormap', 'orientation_widget', 'camera', 'mapper',
+                                 'rendered_level'], doc, root, comm)
         self._models[root.ref['id']] = (model, parent)
         return model
 
@@ -184,43 +251,134 @@ class VTKVolume(PaneBase):
         else:
             return self.object.GetDimensions()
 
-    def _process_param_change(self, msg):
-        msg = super(VTKVolume, self)._process_param_change(msg)
-        if self.object is not None:
-            slice_params = {'slice_i':0, 'slice_j':1, 'slice_k':2}
-            for k, v in msg.items():
-                sub_dim = self._subsample_dimensions
-                ori_dim = self._orginal_dimensions
-                if k in slice_params:
-                    index = slice_params[k]
-                    msg[k] = int(np.round(v * sub_dim[index] / ori_dim[index]))
-        return msg
+    def _update_pane(self, *events):
+        for event in events:
+            if event.name == 'object' and event.old is event.new:
+                # The object may have been modified inplace
+                self._clear_subsample(event.new)
+        if self._prefetch_subsample(events):
+            return
+        self._update()
+        super(VTKVolume, self)._update_pane(*events)
 
-    def _process_property_change(self, msg):
-        msg = super(VTKVolume, self)._process_property_change(msg)
-        if self.object is not None:
-            slice_params = {'slice_i':0, 'slice_j':1, 'slice_k':2}
-            for k, v in msg.items():
-                sub_dim = self._subsample_dimensions
-                ori_dim = self._orginal_dimensions
-                if k in slice_params:
-                    index = slice_params[k]
-                    msg[k] = int(np.round(v * ori_dim[index] / sub_dim[index]))
-        return msg
+    def _prefetch_subsample(self, events):
+        """
+        When the pane is displayed in a server session the subsampling
+        is computed in a worker thread to avoid blocking the event
+        loop, the views are updated once the result is cached.
+        """
+        docs = [state._views[ref][2] for ref in self._models
+                if ref in state._views and state._views[ref][3] is None]
+        docs = [doc for doc in docs if doc.session_context]
+        if not docs:
+            return False
+        array, spacing = self._object_array()
+        if array is None:
+            return False
+        key = self._subsample_key(array, spacing)
+        if self._cached_subsample(key) is not None:
+            return False
+        elif self._prefetching == key:
+            return True
+        self._prefetching = key
+        obj = self.object
+
+        def update():
+            if self.object is not obj or self._prefetching != key:
+                return
+            self._prefetching = None
+            self._cache_subsample(key, future.result())
+            self._update()
+            super(VTKVolume, self)._update_pane(*events)
+
+        future = state._submit(_subsample, array, spacing, self.max_data_size)
+        # Document callbacks must be added from the thread of the IOLoop
+        IOLoop.current().add_future(future, lambda f: docs[0].add_next_tick_callback(update))
+        return True
+
+    def _process_events(self, events):
+        if 'rendered_level' in events:
+            events = dict(events)
+            generation, level = events.pop('rendered_level')
+            self._refine_rendered(generation, level)
+        if events:
+            super(VTKVolume, self)._process_events(events)
 
     def _update(self, model=None):
+        """
+        Without a model the volume levels are recomputed from the
+        object, otherwise the model is reset to the coarsest level,
+        the view requests the finer levels once it is idle.
+        """
+        if model is not None:
+            refs = [ref for ref, (m, _) in self._models.items() if m is model]
+            if refs and refs[0] in state._views:
+                _, _, doc, comm = state._views[refs[0]]
+                if self._levels and (comm or doc.session_context):
+                    self._set_volume(model, self._levels[0])
+                    return
+            self._set_volume(model, self._volume_data)
+            return
+
+        self._generation += 1
+        self._levels = []
         self._volume_data = self._get_volume_data()
         if self._volume_data:
+            if not self._levels:
+                self._levels = [self._volume_data]
             self._orginal_dimensions = self._get_object_dimensions()
             self._subsample_dimensions = self._volume_data['dims']
+            for level in self._levels:
+                level['original_dims'] = self._orginal_dimensions
             self.param.slice_i.bounds = (0, self._orginal_dimensions[0]-1)
             self.slice_i = (self._orginal_dimensions[0]-1)//2
             self.param.slice_j.bounds = (0, self._orginal_dimensions[1]-1)
             self.slice_j = (self._orginal_dimensions[1]-1)//2
             self.param.slice_k.bounds = (0, self._orginal_dimensions[2]-1)
             self.slice_k = (self._orginal_dimensions[2]-1)//2
-        if model is not None:
-            model.data = self._volume_data
+
+    def _refine_rendered(self, generation, level):
+        """
+        Sends the next level of the volume pyramid to the views which
+        rendered the supplied level, which the view reports once it
+        is idle, i.e. the user is not interacting with it.
+        """
+        if generation != self._generation or level+1 >= len(self._levels):
+            return
+        for ref, (model, _) in list(self._models.items()):
+            if ref not in state._views or model.data.get('level') != level:
+                continue
+            doc = state._views[ref][2]
+            if state.curdoc is None or doc is state.curdoc:
+                self._refine(model, level+1, generation)
+
+    def _refine(self, model, level, generation):
+        if generation != self._generation or level >= len(self._levels):
+            return
+        refs = [ref for ref, (m, _) in self._models.items() if m is model]
+        if not refs or refs[0] not in state._views:
+            return
+        _, root, doc, comm = state._views[refs[0]]
+        if comm:
+            with unlocked():
+                self._set_volume(model, self._levels[level])
+            if 'embedded' not in root.tags:
+                push(doc, comm)
+        else:
+            self._set_volume(model, self._levels[level])
+
+    def _set_volume(self, model, volume):
+        """
+        Sends the volume metadata followed by the voxels, which are
+        transferred as binary buffers through a ColumnDataSource.
+        """
+        if volume is None:
+            model.data = {}
+            model.arrays.data = {}
+            return
+        model.data = dict({k: v for k, v in volume.items() if k != 'buffer'},
+                          generation=self._generation)
+        model.arrays.data = {'buffer': volume['buffer']}
 
     @classmethod
     def register_serializer(cls, class_type, serializer):
@@ -232,12 +390,36 @@ class VTKVolume(PaneBase):
         cls._serializers.update({class_type:serializer})
 
     def _volume_from_array(self, sub_array):
-        return dict(buffer=base64encode(sub_array.ravel(order='F' if sub_array.flags['F_CONTIGUOUS'] else 'C')),
+        """
+        Serializes the subsampled array, additionally computing a
+        pyramid of coarser levels which are sent first to make large
+        volumes interactive before the full resolution has arrived.
+        """
+        spacing = self._sub_spacing
+        extent = tuple((s - 1) * sp for s, sp in zip(sub_array.shape, spacing))
+        levels = [sub_array]
+        while (levels[0].nbytes / 1e6 > self._min_level_size and
+               min(levels[0].shape) > 2):
+            levels.insert(0, levels[0][::2, ::2, ::2])
+        self._levels = []
+        for i, array in enumerate(levels):
+            if array is not sub_array:
+                array = np.asfortranarray(array) if sub_array.flags['F_CONTIGUOUS'] else np.ascontiguousarray(array)
+                spacing = tuple(e / max(s - 1, 1) for e, s in zip(extent, array.shape))
+            else:
+                spacing = self._sub_spacing
+            self._levels.append(self._volume_level(array, spacing, i))
+        return self._levels[-1]
+
+    def _volume_level(self, sub_array, spacing, level=0):
+        buffer = _binary_array(sub_array.ravel(order='F' if sub_array.flags['F_CONTIGUOUS'] else 'C'))
+        return dict(buffer=buffer,
                     dims=sub_array.shape if sub_array.flags['F_CONTIGUOUS'] else sub_array.shape[::-1],
-                    spacing=self._sub_spacing if sub_array.flags['F_CONTIGUOUS'] else self._sub_spacing[::-1],
+                    spacing=spacing if sub_array.flags['F_CONTIGUOUS'] else spacing[::-1],
                     origin=self.origin,
                     data_range=(sub_array.min(), sub_array.max()),
-                    dtype=sub_array.dtype.name)
+                    dtype=buffer.dtype.name,
+                    level=level)
 
     def _get_volume_data(self):
         if self.object is None:
@@ -248,15 +430,11 @@ class VTKVolume(PaneBase):
             available_serializer = [v for k, v in VTKVolume._serializers.items() if isinstance(self.object, k)]
             if not available_serializer:
                 import vtk
-                from vtk.util import numpy_support
 
                 def volume_serializer(inst):
-                    imageData = inst.object
-                    array = numpy_support.vtk_to_numpy(imageData.GetPointData().GetScalars())
-                    dims = imageData.GetDimensions()[::-1]
-                    inst.spacing = imageData.GetSpacing()[::-1]
-                    inst.origin = imageData.GetOrigin()
-                    return inst._volume_from_array(inst._subsample_array(array.reshape(dims, order='C')))
+                    array, inst.spacing = inst._image_data_array(inst.object)
+                    inst.origin = inst.object.GetOrigin()
+                    return inst._volume_from_array(inst._subsample_array(array))
 
                 VTKVolume.register_serializer(vtk.vtkImageData, volume_serializer)
                 serializer = volume_serializer
@@ -264,26 +442,64 @@ class VTKVolume(PaneBase):
                 serializer = available_serializer[0]
             return serializer(self)
 
+    @staticmethod
+    def _image_data_array(image_data):
+        from vtk.util import numpy_support
+        array = numpy_support.vtk_to_numpy(image_data.GetPointData().GetScalars())
+        dims = image_data.GetDimensions()[::-1]
+        return array.reshape(dims, order='C'), image_data.GetSpacing()[::-1]
+
+    def _object_array(self):
+        """
+        Returns the array and spacing of the object if it can be
+        subsampled ahead of the serialization.
+        """
+        if isinstance(self.object, np.ndarray):
+            return self.object, self.spacing
+        elif 'vtk' in sys.modules:
+            import vtk
+            if isinstance(self.object, vtk.vtkImageData):
+                return self._image_data_array(self.object)
+        return None, None
+
+    def _subsample_key(self, array, spacing):
+        obj = self.object
+        version = obj.GetMTime() if hasattr(obj, 'GetMTime') else None
+        return (id(obj), version, array.shape, tuple(spacing), self.max_data_size)
+
+    def _cached_subsample(self, key):
+        cache = VTKVolume._subsample_cache
+        if key not in cache:
+            return None
+        ref, subsampled = cache[key]
+        if ref() is not self.object:
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return subsampled
+
+    def _cache_subsample(self, key, subsampled):
+        cache = VTKVolume._subsample_cache
+        try:
+            ref = weakref.ref(self.object)
+        except TypeError:
+            ref = lambda obj=self.object: obj
+        cache[key] = (ref, subsampled)
+        while len(cache) > self._subsample_cache_size:
+            cache.popitem(last=False)
+
+    def _clear_subsample(self, obj):
+        cache = VTKVolume._subsample_cache
+        for key in [k for k in cache if k[0] == id(obj)]:
+            del cache[key]
+
     def _subsample_array(self, array):
-        original_shape = array.shape
-        spacing = self.spacing
-        extent = tuple((o_s - 1) * s for o_s, s in zip(original_shape, spacing))
-        dim_ratio = np.cbrt((np.prod(original_shape) / 1e6) / self.max_data_size)
-        max_shape = tuple(int(o_s / dim_ratio) for o_s in original_shape)
-        dowsnscale_factor = [max(o_s, m_s) / m_s for m_s, o_s in zip(max_shape, original_shape)]
-
-        if any([d_f > 1 for d_f in dowsnscale_factor]):
-            try:
-                import scipy.ndimage as nd
-                sub_array = nd.interpolation.zoom(array, zoom=[1 / d_f for d_f in dowsnscale_factor], order=0)
-            except ImportError:
-                sub_array = array[::int(np.ceil(dowsnscale_factor[0])),
-                                  ::int(np.ceil(dowsnscale_factor[1])),
-                                  ::int(np.ceil(dowsnscale_factor[2]))]
-            self._sub_spacing = tuple(e / (s - 1) for e, s in zip(extent, sub_array.shape))
-        else:
-            sub_array = array
-            self._sub_spacing = self.spacing
+        key = self._subsample_key(array, self.spacing)
+        subsampled = self._cached_subsample(key)
+        if subsampled is None:
+            subsampled = _subsample(array, self.spacing, self.max_data_size)
+            self._cache_subsample(key, subsampled)
+        sub_array, self._sub_spacing = subsampled
         return sub_array
 
 
@@ -345,8 +561,13 @@ class VTK(PaneBase):
         super(VTK, self).__init__(object, **params)
         self._legend = None
         self._vtkjs = None
+        self._scene = None
+        self._manifests = {}
         if self.serialize_on_instantiation:
-            self._vtkjs = self._get_vtkjs()
+            if self._diffable():
+                self._get_scene()
+            else:
+                self._get_vtkjs()
             self.color_mappers = self._construct_color_mappers()
 
     @classmethod
@@ -375,10 +596,9 @@ class VTK(PaneBase):
         else:
             VTKPlot = getattr(sys.modules['panel.models.vtk'], 'VTKPlot')
 
-        vtkjs = self._get_vtkjs()
-        data = base64encode(vtkjs) if vtkjs is not None else vtkjs
         props = self._process_param_change(self._init_properties())
-        model = VTKPlot(data=data, **props)
+        model = VTKPlot(arrays=ColumnDataSource(), **props)
+        self._update_data(model)
         if root is None:
             root = model
         self._link_props(model, ['camera', 'enable_keybindings', 'orientation_widget'], doc, root, comm)
@@ -389,6 +609,17 @@ class VTK(PaneBase):
         self._legend = None
         super(VTK, self)._update_object(ref, doc, root, parent, comm)
 
+    def _update_pane(self, *events):
+        self._vtkjs = None
+        self._scene = None
+        super(VTK, self)._update_pane(*events)
+
+    def _cleanup(self, root):
+        ref = root.ref['id']
+        if ref in self._models:
+            self._manifests.pop(self._models[ref][0].ref['id'], None)
+        super(VTK, self)._cleanup(root)
+
     def _construct_color_mappers(self):
         if self._legend is None:
             try:
@@ -449,6 +680,36 @@ class VTK(PaneBase):
         """
         cls._serializers.update({class_type:serializer})
 
+    def _get_serializer(self):
+        available_serializer = [v for k, v in VTK._serializers.items() if isinstance(self.object, k)]
+        if len(available_serializer) == 0:
+            import vtk
+            from .vtkjs_serializer import render_window_serializer
+
+            VTK.register_serializer(vtk.vtkRenderWindow, render_window_serializer)
+            return render_window_serializer
+        return available_serializer[0]
+
+    def _diffable(self):
+        """
+        Whether the object is serialized by the default render window
+        serializer, which allows sending only the changed files of the
+        scene on update.
+        """
+        if (self.object is None or isinstance(self.object, string_types) or
+            hasattr(self.object, 'read')):
+            return False
+        serializer = self._get_serializer()
+        module = sys.modules.get('panel.pane.vtk.vtkjs_serializer')
+        return module is not None and serializer is module.render_window_serializer
+
+    def _get_scene(self):
+        if self._scene is None:
+            from .vtkjs_serializer import scene_serializer
+            self._scene = [(path.replace(os.sep, '/'), content)
+                           for path, content in scene_serializer(self.object)]
+        return self._scene
+
     def _get_vtkjs(self):
         if self._vtkjs is None and self.object is not None:
             if isinstance(self.object, string_types) and self.object.endswith('.vtkjs'):
@@ -460,25 +721,52 @@ class VTK(PaneBase):
                     vtkjs = data_url.read()
             elif hasattr(self.object, 'read'):
                 vtkjs = self.object.read()
+            elif self._diffable():
+                from .vtkjs_serializer import zip_scene
+                vtkjs = zip_scene(self._get_scene())
             else:
-                available_serializer = [v for k, v in VTK._serializers.items() if isinstance(self.object, k)]
-                if len(available_serializer) == 0:
-                    import vtk
-                    from .vtkjs_serializer import render_window_serializer
-
-                    VTK.register_serializer(vtk.vtkRenderWindow, render_window_serializer)
-                    serializer = render_window_serializer
-                else:
-                    serializer = available_serializer[0]
-                vtkjs = serializer(self.object)
+                vtkjs = self._get_serializer()(self.object)
             self._vtkjs = vtkjs
 
         return self._vtkjs
 
+    def _scene_data(self, manifest):
+        """
+        Converts the serialized scene to ColumnDataSource data. The
+        content of files listed in the manifest of files previously
+        sent to the model is omitted, the frontend model reuses its
+        copy for all of its views.
+        """
+        paths, contents, new_manifest = [], [], {}
+        for path, content in self._get_scene():
+            if not isinstance(content, bytes):
+                content = content.encode('utf-8')
+            if path.endswith('.json'):
+                digest = hashlib.md5(content).hexdigest()
+            else:
+                # Data arrays are stored under their md5 hash
+                digest = path.split('/')[-1]
+            if manifest.get(path) == digest:
+                content = b''
+            new_manifest[path] = digest
+            paths.append(path)
+            contents.append(np.frombuffer(content, dtype=np.uint8))
+        return {'path': paths, 'content': contents}, new_manifest
+
+    def _update_data(self, model):
+        ref = model.ref['id']
+        if self._diffable():
+            data, self._manifests[ref] = self._scene_data(self._manifests.get(ref, {}))
+            model.arrays.data = data
+            model.data = None
+        else:
+            vtkjs = self._get_vtkjs()
+            self._manifests.pop(ref, None)
+            model.arrays.data = {}
+            model.data = base64encode(vtkjs) if vtkjs is not None else vtkjs
+
     def _update(self, model):
-        self._vtkjs = None
-        vtkjs = self._get_vtkjs()
-        model.data = base64encode(vtkjs) if vtkjs is not None else vtkjs
+        self._update_data(model)
         self.color_mappers = self._construct_color_mappers()
 
     def export_vtkjs(self, filename='vtk_panel.vtkjs'):
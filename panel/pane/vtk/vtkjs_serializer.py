@@ -8,7 +8,7 @@ Licence :
 https://github.com/Kitware/vtk-js/blob/master/LICENSE
 """
 
-import os, sys, json, hashlib, zipfile
+import os, sys, json, hashlib, itertools, zipfile
 from io import BytesIO
 
 if sys.version_info < (3,):
@@ -82,6 +82,21 @@ def _get_object_id(obj, objIds):
         return len(objIds)
 
 
+_component_ids = itertools.count()
+
+
+def _get_component_name(renProp):
+    # The address of the prop (its __this__) is reused once the prop
+    # is freed, so a new prop could be mistaken for a stale file when
+    # diffing scenes. Instead tag each prop with a counter based name
+    # which VTK keeps on the object for as long as it is alive.
+    name = getattr(renProp, '_panel_component_name', None)
+    if name is None:
+        name = 'component_%d' % next(_component_ids)
+        renProp._panel_component_name = name
+    return name
+
+
 def _dump_data_array(scDirs, datasetDir, dataDir, array):
     root = {}
     if not array:
@@ -377,10 +392,37 @@ def construct_palettes(render_window):
 
 
 def render_window_serializer(render_window):
+    """
+    Function to convert a vtk render window in the binary zip stream
+    of the corresponding `vtkjs` file.
+    """
+    return zip_scene(scene_serializer(render_window))
+
+
+def zip_scene(scene):
+    """
+    Compresses a list of 2-tuple as returned by `scene_serializer`
+    into the binary zip stream of a `vtkjs` file.
+    """
+    compression = zipfile.ZIP_DEFLATED
+    with BytesIO() as in_memory:
+        zf = zipfile.ZipFile(in_memory, mode="w")
+        try:
+            for dirPath, data in scene:
+                zf.writestr(dirPath, data, compress_type=compression)
+        finally:
+                zf.close()
+        in_memory.seek(0)
+        return in_memory.read()
+
+
+def scene_serializer(render_window):
     """
     Function to convert a vtk render window in a list of 2-tuple where first value
     correspond to a relative file path in the `vtkjs` directory structure and values
-    of the binary content of the corresponding file.
+    of the binary content of the corresponding file. Data arrays are stored
+    under a path containing the md5 hash of their content, which allows
+    diffing two serializations of the same scene.
     """
     render_window.OffScreenRenderingOn() # to not pop a vtk windows
     render_window.Render()
@@ -427,7 +469,7 @@ def render_window_serializer(render_window):
                     dataset = gf.GetOutputDataObject(0)
 
                 if dataset and dataset.GetPoints():
-                    componentName = str(id(renProp))
+                    componentName = _get_component_name(renProp)
                     scalar_visibility = mapper.GetScalarVisibility()
                     array_access_mode = mapper.GetArrayAccessMode()
                     array_name = mapper.GetArrayName() # if arrayAccessMode == 1 else mapper.GetArrayId()
@@ -476,7 +518,7 @@ def render_window_serializer(render_window):
                         },
                         "actor": {
                             # customProp
-                            "id": renProp.__this__,
+                            "id": componentName,
                             # vtkProp
                             "visibility": renProp.GetVisibility() if renProp.IsA('vtkProp') else 0,
                             "pickable": renProp.GetPickable()  if renProp.IsA('vtkProp') else 0,
@@ -526,16 +568,5 @@ def render_window_serializer(render_window):
     }
 
     scDirs.append(['index.json', json.dumps(sceneDescription, indent=4)])
-
-    # create binary stream of the vtkjs directory structure
-    compression = zipfile.ZIP_DEFLATED
-    with BytesIO() as in_memory:
-        zf = zipfile.ZipFile(in_memory, mode="w")
-        try:
-            for dirPath, data in scDirs:
-                zf.writestr(dirPath, data, compress_type=compression)
-        finally:
-                zf.close()
-        in_memory.seek(0)
-        return in_memory.read()
+    return scDirs
 
@@ -6,6 +6,7 @@ models rendered on the frontend.
 
 import difflib
 import threading
+import time
 
 from collections import namedtuple
 from functools import partial
@@ -15,6 +16,7 @@ from tornado import gen
 
 from .callbacks import PeriodicCallback
 from .config import config
+from .io.metrics import metrics
 from .io.model import hold
 from .io.notebook import push
 from .io.server import unlocked
@@ -51,6 +53,10 @@ class Syncable(Renderable):
 
     __abstract = True
 
+    _instrumented_methods = Renderable._instrumented_methods + [
+        '_param_change', '_process_events', '_update_model'
+    ]
+
     events = []
 
     def __init__(self, **params):
@@ -195,7 +201,10 @@ class Syncable(Renderable):
             state._thread_id = thread_id
             events = self._events
             self._events = {}
+            start = time.perf_counter()
             self._process_events(events)
+            if metrics.enabled:
+                metrics.record_callback('event', time.perf_counter()-start)
         finally:
             self._processing = False
             state.curdoc = None
@@ -239,7 +248,8 @@ class Reactive(Syncable, Viewable):
     #----------------------------------------------------------------
 
     def add_periodic_callback(self, callback, period=500, count=None,
-                              timeout=None, start=True):
+                              timeout=None, start=True, threaded=False,
+                              mode='skip'):
         """
         Schedules a periodic callback to be run at an interval set by
         the period. Returns a PeriodicCallback object with the option
@@ -257,13 +267,19 @@ class Reactive(Syncable, Viewable):
           Timeout in seconds when the callback should be stopped.
         start: boolean (default=True)
           Whether to start callback immediately.
+        threaded: boolean (default=False)
+          Whether to run the callback on a thread pool.
+        mode: str (default='skip')
+          Whether to 'skip' or 'coalesce' ticks occurring while the
+          previous run of the callback is still in progress.
 
         Returns
         -------
         Return a PeriodicCallback object with start and stop methods.
         """
         cb = PeriodicCallback(callback=callback, period=period,
-                              count=count, timeout=timeout)
+                              count=count, timeout=timeout,
+                              threaded=threaded, mode=mode)
         if start:
             cb.start()
         return cb
@@ -0,0 +1,29 @@
+from panel.io.compression import PROBE_INTERVAL, PROBE_MESSAGES, _ConnectionCompression
+
+
+def test_connection_compression_min_size():
+    stats = _ConnectionCompression()
+    assert not stats.should_compress(100, 1024)
+    assert stats.should_compress(2048, 1024)
+
+
+def test_connection_compression_backs_off_on_cpu_cost():
+    stats = _ConnectionCompression()
+    for _ in range(PROBE_MESSAGES):
+        assert stats.should_compress(100000, 1024)
+        stats.record_compression(100000, 10000, 0.001)
+
+    # Compression is used while it pays off regardless of the client
+    assert stats.should_compress(100000, 1024)
+
+    # Incompressible data costs CPU time without saving bytes
+    stats = _ConnectionCompression()
+    for _ in range(PROBE_MESSAGES):
+        stats.should_compress(100000, 1024)
+        stats.record_compression(100000, 99990, 0.001)
+    assert not stats.should_compress(100000, 1024)
+
+    # Compression is periodically probed to refresh the measurements
+    while stats.messages % PROBE_INTERVAL != PROBE_INTERVAL - 1:
+        stats.should_compress(100000, 1024)
+    assert stats.should_compress(100000, 1024)
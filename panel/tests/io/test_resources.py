@@ -0,0 +1,86 @@
+import os
+
+from panel.io.resources import (
+    _bundle, _bundle_static_css, _bundles, _local_css, _lookup_bundle, _read,
+    _server_css
+)
+
+
+def test_read_cached_until_modified(tmpdir):
+    path = tmpdir.join('style.css')
+    path.write('.a {}')
+    assert _read(str(path)) == '.a {}'
+
+    content = _read(str(path))
+    assert _read(str(path)) is content
+
+    path.write('.b { color: red; }')
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert _read(str(path)) == '.b { color: red; }'
+
+
+def test_bundle_content_hashed():
+    name = _bundle(['.a {}', '.b {}'])
+    assert _bundle(['.a {}', '.b {}']) == name
+    assert _bundle(['.a {}']) != name
+    assert _bundles[name]['identity'] == b'.a {}\n.b {}'
+    assert 'gzip' in _bundles[name]
+
+
+def test_lookup_bundle_does_not_build_missing_bundle():
+    from panel.config import config
+
+    with config.set(raw_css=['.missing {}']):
+        name = _bundle(_local_css())
+        del _bundles[name]
+        # e.g. discarded or rendered with CSS of another process
+        bundles = list(_bundles)
+        assert _lookup_bundle(name) is None
+        assert list(_bundles) == bundles
+
+
+def test_server_css_inlines_css_added_after_start():
+    from panel.config import config
+
+    try:
+        with config.set(raw_css=['.static {}']):
+            _bundle_static_css()
+            bundle, inline = _server_css()
+            assert _bundles[bundle]['identity'].endswith(b'.static {}')
+            assert inline == []
+
+            config.raw_css = ['.static {}', '.session {}']
+            assert _server_css() == (bundle, ['.session {}'])
+
+            config.raw_css = ['.session {}']
+            assert _server_css() == (None, _local_css())
+    finally:
+        _bundle_static_css()
+
+
+def test_exclude_unused_model_resources():
+    from bokeh.resources import Resources
+    from panel.io.lazy import _rendering
+    from panel.models.ace import AcePlot
+    from panel.models.markup import HTML
+
+    resources = Resources(mode='cdn')
+    assert any('ace.js' in f for f in resources.js_files)
+    _rendering.classes = {HTML}
+    try:
+        assert not any('ace.js' in f for f in resources.js_files)
+        _rendering.classes = {HTML, AcePlot}
+        assert any('ace.js' in f for f in resources.js_files)
+    finally:
+        _rendering.classes = None
+
+
+def test_require_components_does_not_consume_requirements():
+    from panel.compiler import require_components
+    from panel.models.ace import AcePlot
+
+    configs, requirements, exports, skip = require_components()
+    assert 'ace' in exports
+    assert 'exports' in AcePlot.__js_require__
+    assert require_components() == (configs, requirements, exports, skip)
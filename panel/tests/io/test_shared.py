@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+from panel.io.shared import SharedCache
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='fork is not available on Windows')
+def test_shared_cache_across_fork():
+    cache = SharedCache({'a': 1})
+    try:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                cache['b'] = cache['a'] + 1
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        assert dict(cache) == {'a': 1, 'b': 2}
+        del cache['a']
+        assert 'a' not in cache
+        assert len(cache) == 1
+    finally:
+        cache._manager.shutdown()
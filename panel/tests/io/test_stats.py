@@ -0,0 +1,35 @@
+from panel.io.state import state
+from panel.io.stats import instrument
+from panel.layout import Row
+from panel.pane import Markdown
+from panel.widgets import FloatSlider
+
+
+def test_instrument_records_hot_paths(document, comm):
+    slider = FloatSlider()
+    row = Row(slider, Markdown('A'))
+
+    with instrument() as recorded:
+        row.get_root(document, comm=comm)
+        slider.value = 0.5
+        row[1].object = 'B'
+
+    components = recorded.components
+    assert components[('Row', 'get_root')][0] == 1
+    assert components[('FloatSlider', '_get_model')][0] == 1
+    assert components[('FloatSlider', '_param_change')][0] == 1
+    assert components[('FloatSlider', '_update_model')][2] > 0
+    assert components[('Markdown', '_update_pane')][0] == 1
+    assert set(recorded.sessions) == {None}
+
+
+def test_instrument_disabled_outside_context(document, comm):
+    slider = FloatSlider()
+    slider.get_root(document, comm=comm)
+
+    with instrument() as recorded:
+        pass
+    slider.value = 0.5
+
+    assert not state.stats.enabled
+    assert recorded.components == {}
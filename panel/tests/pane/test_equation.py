@@ -1,7 +1,16 @@
 from __future__ import absolute_import, division, unicode_literals
 
+import pytest
+
+try:
+    import sympy
+except Exception:
+    sympy = None
+
 from panel.pane import LaTeX
 
+sympy_available = pytest.mark.skipif(sympy is None, reason="requires sympy")
+
 
 def test_latex_pane(document, comm):
     pane = LaTeX(r"$\frac{p^3}{q}$")
@@ -29,3 +38,20 @@ def test_latex_mathjax_pane(document, comm):
     # Cleanup
     pane._cleanup(model)
     assert pane._models == {}
+
+
+@sympy_available
+def test_latex_sympy_cache(document, comm):
+    from panel.pane.equation import _latex_cache
+    x = sympy.Symbol('x')
+    pane = LaTeX(sympy.sin(x)**2)
+
+    model = pane.get_root(document, comm=comm)
+    assert model.text == r'$\displaystyle \sin^{2}{\left(x \right)}$'
+
+    # Structurally equal expressions share the cache entry
+    _latex_cache[sympy.sin(sympy.Symbol('x'))**2] = '$cached$'
+    pane.param.trigger('object')
+    assert model.text == '$cached$'
+    _latex_cache.clear()
+
@@ -118,3 +118,91 @@ def test_image_link_url(document, comm):
     model = image_pane.get_root(document, comm)
 
     assert model.text.startswith('&lt;a href=&quot;http://anaconda.org&quot;')
+
+
+def test_image_url_cache_revalidates_etag():
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from panel.pane import image
+
+    data = b64decode(twopixel['png'])
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.headers.get('If-None-Match'))
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = 'http://localhost:%d/image.png' % server.server_port
+        pane = PNG(url)
+        assert pane._img() == data
+        assert pane._img() == data
+        assert requests == [None]
+
+        # Stale responses are revalidated using the ETag
+        image._fetch_url(url)
+        assert requests == [None, '"v1"']
+        assert image._fetch_url(url, max_age=60) == data
+    finally:
+        server.shutdown()
+        image._url_cache.pop(url, None)
+
+
+def test_image_url_fetch_failure_is_not_cached():
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from requests import HTTPError
+    from panel.pane import image
+
+    data = b64decode(twopixel['png'])
+    codes = [500, 200]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            code = codes.pop(0)
+            self.send_response(code)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = 'http://localhost:%d/image.png' % server.server_port
+        future = image._fetch_url_async(url)
+        with pytest.raises(HTTPError):
+            future.result()
+        assert url not in image._url_cache
+        # The done callback may run after result() returned
+        for _ in range(100):
+            if url not in image._url_futures:
+                break
+            time.sleep(0.01)
+        assert url not in image._url_futures
+
+        # The failed fetch is retried
+        assert image._fetch_url_async(url).result() == data
+        assert image._url_cache[url][1] == data
+    finally:
+        server.shutdown()
+        image._url_cache.pop(url, None)
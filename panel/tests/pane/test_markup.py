@@ -5,7 +5,7 @@ import json
 
 import numpy as np
 
-from panel.pane import DataFrame, JSON, HTML, Markdown, PaneBase, Pane, Str
+from panel.pane import DataFrame, JSON, HTML, Log, Markdown, PaneBase, Pane, Str
 from panel.tests.util import pd_available, streamz_available
 
 
@@ -94,6 +94,60 @@ def test_markdown_pane_extensions(document, comm):
     assert model.text.startswith('&lt;pre&gt;&lt;code class=&quot;python')
 
 
+def test_markdown_pane_render_cache(document, comm):
+    from panel.pane.markup import _markdown_cache, _markdown_renderers
+    _markdown_cache.clear()
+
+    pane = Markdown("# Cached")
+    pane.get_root(document, comm=comm)
+    key = ("# Cached", True, ("extra", "smarty", "codehilite"))
+    assert key in _markdown_cache
+    renderer = _markdown_renderers[key[2]]
+
+    other = Markdown("## Other")
+    model = other.get_root(document, comm=comm)
+    assert _markdown_renderers[key[2]] is renderer
+    assert model.text == '&lt;h2&gt;Other&lt;/h2&gt;'
+
+    _markdown_cache[key] = '<p>From cache</p>'
+    model = Markdown("# Cached").get_root(document, comm=comm)
+    assert model.text == '&lt;p&gt;From cache&lt;/p&gt;'
+    _markdown_cache.clear()
+
+
+def test_log_pane_incremental(document, comm):
+    log = Log("a\n", max_lines=3)
+
+    model = log.get_root(document, comm=comm)
+    assert model.text == "a\n"
+    assert model.chunk is None
+
+    log.append("b")
+    assert model.chunk == (1, "b\n", False)
+    log.write("c\nd")
+    assert model.chunk == (2, "c\nd", False)
+    assert model.text == "a\n"
+    assert log.object == "b\nc\nd"
+
+    log.clear()
+    assert model.text == ""
+    assert log.object == ""
+
+
+def test_log_pane_clear_after_write(document, comm):
+    log = Log()
+
+    model = log.get_root(document, comm=comm)
+    log.write("a\nb")
+    assert model.chunk == (1, "a\nb", False)
+    assert model.text == ""
+
+    # The text of the model is unchanged so the log is reset explicitly
+    log.clear()
+    assert model.chunk == (2, "", True)
+    assert log.object == ""
+
+
 def test_html_pane(document, comm):
     pane = HTML("<h1>Test</h1>")
 
@@ -210,3 +264,36 @@ def test_json_pane(document, comm):
     # Cleanup
     pane._cleanup(model)
     assert pane._models == {}
+
+
+def test_json_pane_lazy(document, comm):
+    pane = JSON({'a': {'b': [1, {'c': 2}], 1: {'d': 3}}, 'e': []}, lazy=True)
+
+    model = pane.get_root(document, comm=comm)
+    assert model.text == '{"a": {"\\u2026": "Object"}, "e": []}'
+    assert model.placeholders == ['["a"]']
+
+    model.request = '["a"]'
+    assert model.subtree == [
+        1, '["a"]', '{"b": {"\\u2026": "Array[2]"}, "1": {"\\u2026": "Object"}}',
+        ['["a", "b"]', '["a", "1"]']
+    ]
+    assert model.request is None
+    model.request = '["a", "1"]'
+    assert model.subtree == [2, '["a", "1"]', '{"d": 3}', []]
+    assert (('a', '1'), 1) in pane._subtrees
+
+    # The same subtree is sent again when requested after a rerender
+    model.request = '["a", "1"]'
+    assert model.subtree == [3, '["a", "1"]', '{"d": 3}', []]
+
+    # Only the view which requested the subtree receives it
+    other = pane.get_root(document, comm=comm)
+    other.request = '["a"]'
+    assert other.subtree[:2] == [4, '["a"]']
+    assert other.request is None
+    assert model.subtree[0] == 3
+
+    pane.object = {'f': 1}
+    assert model.text == '{"f": 1}'
+    assert pane._subtrees == {((), 1): ('{"f": 1}', [])}
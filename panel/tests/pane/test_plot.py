@@ -61,3 +61,85 @@ def test_matplotlib_pane(document, comm):
     assert pane._models == {}
 
 
+@mpl_available
+def test_matplotlib_pane_render_cache(document, comm):
+    fig = mpl_figure()
+    pane = Pane(fig)
+    model = pane.get_root(document, comm=comm)
+    png = pane._img()
+    assert pane._img() is png
+
+    # Layout changes reuse the cached render
+    pane.width = 300
+    assert pane._img() is png
+
+    # Modifying the figure invalidates the cache
+    fig.axes[0].lines[0].set_color('red')
+    red_png = pane._img()
+    assert red_png is not png
+
+    # Renders at other resolutions are cached separately
+    pane.dpi = 72
+    assert pane._img() is not red_png
+    pane.dpi = 144
+    assert pane._img() is red_png
+
+    # Cleanup
+    pane._cleanup(model)
+
+
+@mpl_available
+def test_matplotlib_panes_share_figure(document, comm):
+    fig = mpl_figure()
+    pane1, pane2 = Matplotlib(fig, dpi=72), Matplotlib(fig, dpi=144)
+    png1, png2 = pane1._img(), pane2._img()
+
+    # Rendering at another dpi does not invalidate the other pane
+    assert pane1._img() is png1
+    assert pane2._img() is png2
+
+    # Reassigning the figure wraps its stale_callback only once
+    callback = fig.stale_callback
+    pane1.object = mpl_figure()
+    pane1.object = fig
+    pane1._img()
+    assert fig.stale_callback is callback
+
+    fig.axes[0].lines[0].set_color('red')
+    assert pane1._img() is not png1
+    assert pane2._img() is not png2
+
+
+@mpl_available
+def test_matplotlib_pane_svg(document, comm):
+    pane = Pane(mpl_figure(), format='svg')
+    model = pane.get_root(document, comm=comm)
+    assert b'<svg' in pane._img()
+    assert 'data:image/svg+xml;base64' in model.text
+
+    # Cleanup
+    pane._cleanup(model)
+
+
+@mpl_available
+def test_matplotlib_pane_renders_serialized_per_figure():
+    from concurrent.futures import ThreadPoolExecutor
+
+    fig = mpl_figure()
+    print_figure = fig.canvas.print_figure
+    active, overlapping = [], []
+
+    def tracked_print_figure(*args, **kwargs):
+        active.append(1)
+        overlapping.append(len(active) > 1)
+        try:
+            return print_figure(*args, **kwargs)
+        finally:
+            active.pop()
+
+    fig.canvas.print_figure = tracked_print_figure
+    panes = [Matplotlib(fig, dpi=dpi) for dpi in (50, 60, 70, 80)]
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(lambda p: p._render(p._render_key()), panes))
+    assert len(overlapping) == 4
+    assert not any(overlapping)
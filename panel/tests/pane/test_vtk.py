@@ -3,7 +3,6 @@
 from __future__ import absolute_import
 
 import os
-import base64
 from io import BytesIO
 from zipfile import ZipFile
 
@@ -116,11 +115,10 @@ def test_vtk_pane_from_renwin(document, comm, tmp_path):
     assert isinstance(model, VTKPlot)
     assert pane._models[model.ref['id']][0] is model
 
-    with BytesIO(base64.b64decode(model.data.encode())) as in_memory:
-        with ZipFile(in_memory) as zf:
-            filenames = zf.namelist()
-            assert len(filenames) == 4
-            assert 'index.json' in filenames
+    filenames = model.arrays.data['path']
+    assert model.data is None
+    assert len(filenames) == 4
+    assert 'index.json' in filenames
 
     # Export Update and Read
     tmpfile = os.path.join(*tmp_path.joinpath('export.vtkjs').parts)
@@ -133,6 +131,61 @@ def test_vtk_pane_from_renwin(document, comm, tmp_path):
     assert pane._models == {}
 
 
+@vtk_available
+def test_vtk_pane_renwin_update_sends_changed_files(document, comm):
+    renWin = make_render_window()
+    pane = VTK(renWin)
+
+    model = pane.get_root(document, comm=comm)
+    sizes = dict(zip(model.arrays.data['path'], map(len, model.arrays.data['content'])))
+    assert all(size > 0 for size in sizes.values())
+
+    # Moving the camera only changes the scene description
+    renWin.GetRenderers().GetFirstRenderer().GetActiveCamera().Azimuth(30)
+    pane.param.trigger('object')
+    updated = dict(zip(model.arrays.data['path'], map(len, model.arrays.data['content'])))
+    assert list(updated) == list(sizes)
+    assert [path for path, size in updated.items() if size] == ['index.json']
+
+    # A new view receives the full scene
+    new_model = pane.get_root(document, comm=comm)
+    assert all(len(content) for content in new_model.arrays.data['content'])
+
+    # Exported file contains the full scene
+    with BytesIO(pane._get_vtkjs()) as in_memory:
+        with ZipFile(in_memory) as zf:
+            assert sorted(zf.namelist()) == sorted(updated)
+
+    pane._cleanup(model)
+    assert model.ref['id'] not in pane._manifests
+
+
+@vtk_available
+def test_vtk_pane_renwin_replaced_actor_sends_new_files(document, comm):
+    renWin = make_render_window()
+    pane = VTK(renWin)
+
+    model = pane.get_root(document, comm=comm)
+    old_paths = list(model.arrays.data['path'])
+
+    # Replace the actor, the freed prop must not be confused with the new one
+    ren = renWin.GetRenderers().GetFirstRenderer()
+    ren.RemoveAllViewProps()
+    sphere = vtk.vtkSphereSource()
+    mapper = vtk.vtkPolyDataMapper()
+    mapper.SetInputConnection(sphere.GetOutputPort())
+    actor = vtk.vtkActor()
+    actor.SetMapper(mapper)
+    ren.AddActor(actor)
+    pane.param.trigger('object')
+
+    updated = dict(zip(model.arrays.data['path'], model.arrays.data['content']))
+    new_paths = [path for path in updated if path not in old_paths]
+    assert new_paths
+    assert all(len(updated[path]) for path in new_paths)
+    assert not any('_p_vtk' in path for path in updated)
+
+
 @pyvista_available
 def test_vtk_pane_more_complex(document, comm):
     renWin = pyvista_render_window()
@@ -150,11 +203,9 @@ def test_vtk_pane_more_complex(document, comm):
     assert cb_title == 'test'
     assert cb_model.color_mapper.palette == pane._legend[cb_title]['palette']
 
-    with BytesIO(base64.b64decode(model.data.encode())) as in_memory:
-        with ZipFile(in_memory) as zf:
-            filenames = zf.namelist()
-            assert len(filenames) == 12
-            assert 'index.json' in filenames
+    filenames = model.arrays.data['path']
+    assert len(filenames) == 12
+    assert 'index.json' in filenames
 
     # add axes
     pane.axes = dict(
@@ -183,19 +234,108 @@ def test_vtk_pane_volume_from_np_array(document, comm):
     model = pane.get_root(document, comm=comm)
     assert isinstance(model, VTKVolumePlot)
     assert pane._models[model.ref['id']][0] is model
-    assert np.all(np.frombuffer(base64.b64decode(model.data['buffer'].encode())) == 1)
+    assert 'buffer' not in model.data
+    assert np.all(model.arrays.data['buffer'] == 1)
     assert all([eq(getattr(pane, k), getattr(model, k))
                 for k in ['slice_i', 'slice_j', 'slice_k']])
 
     # Test update data
     pane.object = 2*np.ones((10,10,10))
-    assert np.all(np.frombuffer(base64.b64decode(model.data['buffer'].encode())) == 2)
+    assert np.all(model.arrays.data['buffer'] == 2)
 
     # Cleanup
     pane._cleanup(model)
     assert pane._models == {}
 
 
+def test_vtk_pane_volume_progressive_levels(document, comm):
+    pane = VTKVolume(np.random.rand(100, 100, 100), max_data_size=10)
+    assert [level['dims'] for level in pane._levels] == [(50, 50, 50), (100, 100, 100)]
+
+    # New views receive the coarsest level first
+    model = pane.get_root(document, comm=comm)
+    assert model.data['dims'] == (50, 50, 50)
+    assert model.data['original_dims'] == (100, 100, 100)
+    assert model.slice_i == pane.slice_i
+
+    # Finer levels are sent once the view reports rendering a level
+    assert model.data['level'] == 0
+    pane._process_events({'rendered_level': [pane._generation, 0]})
+    assert model.data['dims'] == (100, 100, 100)
+    assert model.data['level'] == 1
+
+    # Refinements for a previous object are discarded
+    generation = pane._generation
+    pane.object = np.random.rand(20, 20, 20)
+    assert len(pane._levels) == 1
+    assert model.data['dims'] == (20, 20, 20)
+    pane._process_events({'rendered_level': [generation, 0]})
+    assert model.data['dims'] == (20, 20, 20)
+
+    # Static rendering sends the full resolution
+    pane.object = np.random.rand(100, 100, 100)
+    static = pane.get_root(document)
+    assert static.data['dims'] == (100, 100, 100)
+
+
+def test_vtk_pane_volume_binary_dtype(document, comm):
+    pane = VTKVolume(np.arange(1000, dtype='int64').reshape(10, 10, 10))
+    model = pane.get_root(document, comm=comm)
+    assert model.arrays.data['buffer'].dtype == np.int32
+    assert model.data['dtype'] == 'int32'
+
+
+def test_vtk_pane_volume_subsample_cache(document, comm):
+    array = np.random.rand(100, 100, 100)
+    pane = VTKVolume(array, max_data_size=0.5)
+    sub_array = pane._subsample_array(array)
+    assert sub_array.size < array.size
+
+    # Subsampled arrays are reused between panes for the same array
+    other = VTKVolume(array, max_data_size=0.5)
+    assert other._subsample_array(array) is sub_array
+
+    # Changing the subsampling parameters invalidates the cache
+    other.max_data_size = 0.25
+    assert other._subsample_array(array) is not sub_array
+
+    # Triggering the object discards arrays modified inplace
+    pane.param.trigger('object')
+    assert pane._subsample_array(array) is not sub_array
+
+
+def test_vtk_pane_volume_trigger_in_server_session(monkeypatch):
+    import asyncio
+    from bokeh.client import pull_session
+    from panel.pane.vtk import vtk as vtk_module
+
+    submitted = []
+
+    def subsample(*args):
+        submitted.append(args)
+        return _subsample(*args)
+
+    _subsample = vtk_module._subsample
+    monkeypatch.setattr(vtk_module, '_subsample', subsample)
+
+    array = np.random.rand(100, 100, 100)
+    pane = VTKVolume(array, max_data_size=0.5)
+    server = pane._get_server(port=5025)
+    try:
+        pull_session(session_id='Volume', url="http://localhost:5025/", io_loop=server.io_loop)
+        model = list(pane._models.values())[0][0]
+
+        # Triggering the object subsamples it once in a worker thread
+        submitted.clear()
+        server.io_loop.add_callback(pane.param.trigger, 'object')
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.5))
+        assert len(submitted) == 1
+        assert pane._prefetching is None
+        assert model.data['original_dims'] == (100, 100, 100)
+    finally:
+        server.stop()
+
+
 @vtk_available
 def test_vtk_pane_volume_from_image_data(document, comm):
     image_data = make_image_data()
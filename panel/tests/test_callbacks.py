@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tornado.ioloop import IOLoop
+
+from panel.callbacks import PeriodicCallback
+
+
+def test_periodic_callback_count():
+    calls = []
+    cb = PeriodicCallback(callback=lambda: calls.append(1), period=10, count=3)
+    cb.start()
+    IOLoop.current().run_sync(lambda: asyncio.sleep(0.1))
+    assert len(calls) == 3
+    assert cb._cb is None
+    assert cb.stats['runs'] == 3
+
+
+def test_periodic_callback_timeout_checked_before_run():
+    calls = []
+    cb = PeriodicCallback(callback=lambda: calls.append(1), period=10, timeout=0)
+    cb.start()
+    IOLoop.current().run_sync(lambda: asyncio.sleep(0.05))
+    assert calls == []
+    assert cb._cb is None
+
+
+class _ManualLoop(object):
+    """
+    IOLoop stand-in whose clock only advances when told to, running
+    each timeout 1 ms after it is due.
+    """
+
+    def __init__(self):
+        self.now = 0.
+        self.timeouts = []
+
+    def time(self):
+        return self.now
+
+    def call_at(self, when, callback):
+        timeout = (when, callback)
+        self.timeouts.append(timeout)
+        return timeout
+
+    def remove_timeout(self, timeout):
+        if timeout in self.timeouts:
+            self.timeouts.remove(timeout)
+
+    def advance(self, seconds):
+        end = self.now + seconds
+        while self.timeouts:
+            timeout = min(self.timeouts, key=lambda t: t[0])
+            if timeout[0] > end:
+                break
+            self.timeouts.remove(timeout)
+            self.now = max(self.now, timeout[0] + 0.001)
+            timeout[1]()
+        self.now = max(self.now, end)
+
+
+def test_periodic_callback_does_not_drift(monkeypatch):
+    loop = _ManualLoop()
+    monkeypatch.setattr(IOLoop, 'current', staticmethod(lambda *args, **kwargs: loop))
+    times = []
+
+    def callback():
+        times.append(loop.time())
+        loop.now += 0.004 if len(times) != 5 else 0.025
+
+    cb = PeriodicCallback(callback=callback, period=10)
+    cb.start()
+    loop.advance(0.195)
+    cb.stop()
+
+    # Runs happen shortly after multiples of the period from the start,
+    # rescheduling relative to the previous run would accumulate the
+    # duration of the callback and drift through the whole period. The
+    # tick missed by the slow fifth run is skipped.
+    assert times[:5] == pytest.approx([0.011, 0.021, 0.031, 0.041, 0.051])
+    assert times[5] == pytest.approx(0.076)
+    assert times[6:] == pytest.approx([0.081 + 0.01*i for i in range(12)])
+    assert cb.stats['skipped'] == 1
+    assert cb.stats['jitter']['max'] == pytest.approx(0.016)
+    assert loop.timeouts == []
+
+
+def test_periodic_callback_async_skip():
+    running = []
+
+    async def callback():
+        running.append(1)
+        await asyncio.sleep(0.035)
+        running.pop()
+
+    cb = PeriodicCallback(callback=callback, period=10)
+    cb.start()
+    IOLoop.current().run_sync(lambda: asyncio.sleep(0.1))
+    cb.stop()
+    stats = cb.stats
+    assert 2 <= stats['runs'] <= 3
+    assert stats['skipped'] >= 4
+    assert stats['coalesced'] == 0
+    assert stats['latency']['mean'] >= 0.035
+
+
+def test_periodic_callback_threaded_coalesce():
+    threads = []
+
+    def callback():
+        threads.append(threading.current_thread().name)
+        time.sleep(0.035)
+
+    cb = PeriodicCallback(callback=callback, period=10, threaded=True, mode='coalesce')
+    cb.start()
+    IOLoop.current().run_sync(lambda: asyncio.sleep(0.1))
+    cb.stop()
+    stats = cb.stats
+    assert all(name.startswith('panel') for name in threads)
+    assert stats['coalesced'] >= 2
+    assert stats['runs'] >= 2
+
+
+def test_periodic_callback_threaded_binds_document():
+    from bokeh.document import Document
+    from panel.io.state import state
+
+    doc = Document()
+    cb = PeriodicCallback(callback=lambda: state.curdoc, threaded=True)
+    cb._doc = doc
+    assert state._submit(cb._threaded_callback).result() is doc
+    assert state._submit(lambda: state.curdoc).result() is None
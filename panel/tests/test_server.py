@@ -1,3 +1,8 @@
+import asyncio
+import time
+
+from io import BytesIO
+
 import pytest
 
 from panel.models import HTML as BkHTML
@@ -57,3 +62,765 @@ def test_multiple_titles(multiple_apps_server_sessions):
     with pytest.raises(KeyError):
         session1, session2 = multiple_apps_server_sessions(
             slugs=('app1', 'app2'), titles={'badkey': 'APP1', 'app2': 'APP2'})
+
+
+def test_server_image_asset():
+    import os
+    from bokeh.client import pull_session
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.pane import PNG
+
+    path = os.path.join(os.path.dirname(__file__), 'test_data', 'logo.png')
+    png = PNG(path)
+    server = png._get_server(port=5008)
+    try:
+        session = pull_session(
+            session_id='Test', url="http://localhost:5008/", io_loop=server.io_loop
+        )
+        text = session.document.roots[0].text
+        assert 'base64' not in text
+        src = text.split('src=&quot;')[1].split('&quot;')[0]
+        assert src.startswith('/panel_assets/')
+
+        def fetch(**kwargs):
+            return server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+                "http://localhost:5008" + src, raise_error=False, **kwargs
+            ))
+
+        r = fetch()
+        with open(path, 'rb') as f:
+            assert r.body == f.read()
+        assert r.headers['Content-Type'] == 'image/png'
+        assert 'max-age' in r.headers['Cache-Control']
+        r = fetch(headers={'If-None-Match': r.headers['ETag']})
+        assert r.code == 304
+    finally:
+        server.stop()
+
+
+def test_server_assets_released_with_session(monkeypatch):
+    from bokeh.document import Document
+    from panel.io import server
+
+    monkeypatch.setattr(server, '_server_prefix', lambda doc: '')
+    monkeypatch.setattr(server, 'ASSET_CACHE_BYTES', 10)
+    doc1, doc2 = Document(), Document()
+    url = server.asset_url(b'abcd', 'png', doc1)
+    key = url.split('/')[-1]
+    assert server.asset_url(b'abcd', 'png', doc2) == url
+
+    # Assets are released once no session uses them
+    server._release_assets(doc1, None)
+    assert key in state._assets
+    server._release_assets(doc2, None)
+    assert key not in state._assets
+
+    # The total size of the assets is bounded
+    keys = [server.asset_url(data, 'png', doc1).split('/')[-1]
+            for data in (b'1234', b'5678', b'abcdef')]
+    assert [k for k in keys if k in state._assets] == keys[1:]
+    assert state._asset_bytes == 10
+    server._release_assets(doc1, None)
+    assert state._asset_bytes == 0
+
+
+def test_server_media_range_requests(tmpdir):
+    from bokeh.client import pull_session
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.pane import Video
+
+    path = str(tmpdir.join('video.mp4'))
+    data = bytes(range(256)) * 1000
+    with open(path, 'wb') as f:
+        f.write(data)
+    video = Video(path)
+    server = video._get_server(port=5009)
+    try:
+        session = pull_session(
+            session_id='Test', url="http://localhost:5009/", io_loop=server.io_loop
+        )
+        src = session.document.roots[0].value
+        assert src.startswith('/panel_assets/')
+
+        def fetch(**kwargs):
+            return server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+                "http://localhost:5009" + src, raise_error=False, **kwargs
+            ))
+
+        r = fetch()
+        assert r.code == 200
+        assert r.body == data
+        assert r.headers['Content-Type'] == 'video/mp4'
+        assert r.headers['Accept-Ranges'] == 'bytes'
+
+        r = fetch(headers={'Range': 'bytes=1000-1999'})
+        assert r.code == 206
+        assert r.body == data[1000:2000]
+        assert r.headers['Content-Range'] == 'bytes 1000-1999/%d' % len(data)
+
+        r = fetch(headers={'Range': 'bytes=-100'})
+        assert r.code == 206
+        assert r.body == data[-100:]
+
+        r = fetch(headers={'Range': 'bytes=%d-' % len(data)})
+        assert r.code == 416
+
+        # Modified files no longer match the immutable URL
+        with open(path, 'wb') as f:
+            f.write(data[:100])
+        assert fetch().code == 404
+    finally:
+        server.stop()
+
+
+def test_server_file_download_streamed(tmpdir):
+    from bokeh.client import pull_session
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.widgets import FileDownload
+
+    def chunks():
+        yield b'abc'
+        yield 'def'
+
+    download = FileDownload(callback=chunks, filename='data.csv')
+    server = download._get_server(port=5010)
+    try:
+        session = pull_session(
+            session_id='Test', url="http://localhost:5010/", io_loop=server.io_loop
+        )
+        session.document.roots[0].clicks = 1
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.5))
+        assert download.data.startswith('/panel_download/')
+
+        def fetch():
+            return server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+                "http://localhost:5010" + download.data, raise_error=False
+            ))
+
+        r = fetch()
+        assert r.code == 200
+        assert r.body == b'abcdef'
+        assert r.headers['Content-Type'] == 'text/plain;charset=UTF-8'
+        assert r.headers['Content-Disposition'] == "attachment; filename*=UTF-8''data.csv"
+
+        # Iterators can only be consumed once
+        assert fetch().code == 404
+    finally:
+        server.stop()
+
+
+def test_server_file_input_chunked_upload():
+    from bokeh.client import pull_session
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.widgets import FileInput
+
+    file_input = FileInput()
+    server = file_input._get_server(port=5011)
+    try:
+        session = pull_session(
+            session_id='Test', url="http://localhost:5011/", io_loop=server.io_loop
+        )
+        url = session.document.roots[0].upload_url
+        assert url.startswith('/panel_upload/')
+
+        data = bytes(range(256)) * 10
+        progress = []
+        file_input.param.watch(lambda e: progress.append(e.new), 'progress')
+
+        def post(start, end, total=len(data)):
+            headers = {
+                'Content-Range': 'bytes %d-%d/%d' % (start, end-1, total),
+                'Content-Type': 'application/octet-stream',
+                'X-Filename': 'data%20file.bin'
+            }
+            r = server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+                "http://localhost:5011" + url, method='POST', body=data[start:end],
+                headers=headers, raise_error=False
+            ))
+            server.io_loop.run_sync(lambda: asyncio.sleep(0.1))
+            return r
+
+        assert post(0, 1000).code == 204
+        assert post(2000, 2560).code == 400
+        assert post(1000, 2000).code == 204
+        assert post(2000, 2560).code == 204
+
+        assert progress == [39, 78, 100]
+        assert file_input.filename == 'data file.bin'
+        assert file_input.mime_type == 'application/octet-stream'
+        assert file_input.value.read() == data
+
+        out = BytesIO()
+        file_input.save(out)
+        assert out.getvalue() == data
+
+        # The total size may not change between chunks
+        assert post(0, 1000).code == 204
+        assert post(1000, 2000, total=10**6).code == 400
+        assert post(1000, 2000).code == 400
+
+        # Uploads exceeding the maximum size are rejected
+        file_input.max_size = 2000
+        assert post(0, 1000).code == 413
+        assert progress == [39, 78, 100, 39]
+    finally:
+        server.stop()
+
+
+def test_server_video_stream_binary_frames():
+    from bokeh.client import pull_session
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.widgets import VideoStream
+
+    frames = []
+    video = VideoStream(format='raw', callback=frames.append)
+    server = video._get_server(port=5012)
+    try:
+        session = pull_session(
+            session_id='Test', url="http://localhost:5012/", io_loop=server.io_loop
+        )
+        url = session.document.roots[0].frame_url
+        assert url.startswith('/panel_stream/')
+
+        headers = {'X-Frame-Format': 'raw', 'X-Frame-Width': '3', 'X-Frame-Height': '2'}
+        r = server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+            "http://localhost:5012" + url, method='POST', body=bytes(range(24)),
+            headers=headers, raise_error=False
+        ))
+        assert r.code == 204
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.1))
+
+        assert len(frames) == 1
+        array = frames[0].array
+        assert array.dtype == 'uint8'
+        assert array.shape == (2, 3, 4)
+        assert list(array[1, 2]) == [20, 21, 22, 23]
+        assert video.value == ''
+
+        # Unsetting the callback outside the session's lock updates
+        # the model on the next tick of its Document
+        video.callback = None
+        model, _ = list(video._models.values())[0]
+        assert model.frame_url == url
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.1))
+        assert model.frame_url is None
+    finally:
+        server.stop()
+
+
+def test_server_log_coalesces_writes():
+    from bokeh.client import pull_session
+    from panel.pane import Log
+
+    log = Log("start\n")
+    server = log._get_server(port=5013)
+    try:
+        pull_session(
+            session_id='Test', url="http://localhost:5013/", io_loop=server.io_loop
+        )
+        (ref, (model, _)), = log._models.items()
+        doc = state._views[ref][2]
+
+        def write():
+            for i in range(100):
+                log.append(i)
+        doc.add_next_tick_callback(write)
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.2))
+
+        assert model.chunk == (1, ''.join('%d\n' % i for i in range(100)), False)
+        assert model.text == "start\n"
+    finally:
+        server.stop()
+
+
+def test_server_latex_threaded_conversion(monkeypatch):
+    import threading
+    sympy = pytest.importorskip('sympy')
+    from bokeh.client import pull_session
+    from panel.pane import LaTeX, equation
+    from panel.pane.equation import _latex_cache
+
+    _latex_cache.clear()
+    x = sympy.Symbol('x')
+    latex = LaTeX(sympy.exp(x)/x, threaded=True)
+    server = latex._get_server(port=5014)
+    try:
+        pull_session(
+            session_id='Test', url="http://localhost:5014/", io_loop=server.io_loop
+        )
+        (model, _), = latex._models.values()
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.5))
+        assert model.text == r'$\displaystyle \frac{e^{x}}{x}$'
+        assert sympy.exp(x)/x in _latex_cache
+
+        # A pending conversion schedules a single update of the pane
+        updates = []
+        latex._update_pane = lambda *events: (
+            updates.append(events), LaTeX._update_pane(latex, *events))
+        converted = threading.Event()
+        convert = equation._sympy_latex
+        monkeypatch.setattr(equation, '_sympy_latex', lambda expr: (
+            converted.wait(5), convert(expr))[1])
+        latex.object = sympy.exp(x)/x**2
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.1))
+        latex.param.trigger('object')
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.1))
+        assert model.text == r'$\displaystyle \frac{e^{x}}{x}$'
+        converted.set()
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.5))
+        assert len(updates) == 1
+        assert model.text == r'$\displaystyle \frac{e^{x}}{x^{2}}$'
+    finally:
+        server.stop()
+        _latex_cache.clear()
+
+
+def test_server_metrics():
+    import json
+    from bokeh.client import pull_session
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.io.metrics import metrics
+    from panel.widgets import TextInput
+
+    text = TextInput(value='A')
+    server = text._get_server(port=5015, metrics=True)
+    try:
+        session = pull_session(
+            session_id='Test', url="http://localhost:5015/", io_loop=server.io_loop
+        )
+        model = session.document.roots[0]
+        model.value = 'B'
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.2))
+        assert text.value == 'B'
+
+        def fetch(path):
+            return server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+                "http://localhost:5015" + path, raise_error=False
+            ))
+
+        r = fetch('/metrics.json')
+        assert r.headers['Content-Type'] == 'application/json'
+        data = json.loads(r.body)
+        assert data['sessions']['active'] == {'/': 1}
+        assert data['sessions']['created'] == 1
+        assert data['sessions']['creation_seconds']['count'] == 1
+        messages = {(m['direction'], m['msgtype']): m for m in data['messages']}
+        assert messages[('in', 'PATCH-DOC')]['count'] == 1
+        assert messages[('in', 'PATCH-DOC')]['bytes'] > 0
+        assert messages[('out', 'PULL-DOC-REPLY')]['bytes'] > 0
+        assert data['callbacks']['event']['count'] == 1
+
+        r = fetch('/metrics')
+        assert r.headers['Content-Type'].startswith('text/plain')
+        body = r.body.decode('utf-8')
+        assert 'panel_sessions_active{app="/"} 1' in body
+        assert 'panel_messages_total{direction="in",msgtype="PATCH-DOC"} 1' in body
+        assert 'panel_callback_seconds_count{kind="event"} 1' in body
+        assert '# TYPE panel_ioloop_lag_seconds gauge' in body
+    finally:
+        server.stop()
+        metrics.enabled = False
+        metrics.reset()
+
+
+def test_server_admin_tokens_logged(caplog):
+    import logging
+    import re
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.pane import Markdown
+
+    with caplog.at_level(logging.WARNING, logger='panel.io.server'):
+        server = Markdown('A')._get_server(port=5026, profiler=True, sessions_report=True)
+    try:
+        token, = re.findall(r'/panel_profile\?token=(\w+)', caplog.text)
+        sessions_token, = re.findall(r'/panel_sessions\?token=(\w+)', caplog.text)
+        assert token != sessions_token
+
+        def fetch(url):
+            return server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+                "http://localhost:5026" + url, raise_error=False
+            ))
+
+        assert fetch("/panel_sessions?token=%s" % sessions_token).code == 200
+        assert fetch("/panel_sessions?token=%s" % token).code == 403
+    finally:
+        server.stop()
+
+
+def test_server_profile_session():
+    import marshal
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.pane import Markdown
+
+    md = Markdown('# Profiled')
+    server = md._get_server(port=5016, profiler='secret')
+    url = "http://localhost:5016/panel_profile?token=%s&app=/&seconds=0.1&format=%s"
+
+    async def profile(token, fmt='pstats'):
+        response = AsyncHTTPClient().fetch(url % (token, fmt), raise_error=False)
+        await asyncio.sleep(0.1)
+        await AsyncHTTPClient().fetch("http://localhost:5016/?bokeh-session-id=Profiled")
+        return await response
+
+    try:
+        r = server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+            url % ('wrong', 'pstats'), raise_error=False
+        ))
+        assert r.code == 403
+
+        r = server.io_loop.run_sync(lambda: profile('secret'))
+        assert r.code == 200
+        assert r.headers['X-Panel-Session'] == 'Profiled'
+        assert 'panel_root_Profiled_' in r.headers['Content-Disposition']
+        stats = marshal.loads(r.body)
+        assert any(name == '_get_model' for (_, _, name) in stats)
+    finally:
+        server.stop()
+
+
+def test_folded_stacks():
+    from panel.io.profiler import _folded_stacks
+
+    root, child = ('~', 0, 'root'), ('app.py', 3, 'child')
+    stats = {
+        root: (1, 1, 0.001, 0.003, {}),
+        child: (1, 1, 0.002, 0.002, {root: (1, 1, 0.002, 0.002)}),
+    }
+    assert _folded_stacks(stats) == 'root 1000\nroot;app.py:3(child) 2000\n'
+
+
+def test_server_document_pool():
+    from bokeh.client import pull_session
+    from panel.io.pool import _pools
+    from panel.io.server import get_server
+    from panel.pane import Markdown
+
+    built = []
+
+    def app():
+        built.append(Markdown('# Pooled'))
+        return built[-1]
+
+    server = get_server(app, port=5017, pool=1)
+    try:
+        pool = _pools[server._tornado._applications['/']]
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.1))
+        assert len(pool) == 1
+        assert len(built) == 1
+        prepared = pool._docs[0][1]
+
+        pull_session(
+            session_id='Pooled', url="http://localhost:5017/", io_loop=server.io_loop
+        )
+        assert server.get_session('/', 'Pooled').document is prepared
+        assert prepared.session_context.id == 'Pooled'
+        (model, _), = built[0]._models.values()
+        assert model.document is prepared
+
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.1))
+        assert len(pool) == 1
+        assert len(built) == 2
+    finally:
+        server.stop()
+
+
+def test_get_server_num_procs_with_loop():
+    from tornado.ioloop import IOLoop
+    from panel.io.server import get_server
+    from panel.pane import Markdown
+
+    with pytest.raises(ValueError):
+        get_server(Markdown('A'), port=5018, loop=IOLoop.current(), num_procs=2)
+
+
+def test_server_worker_process_embeds_session_data(monkeypatch):
+    import os
+    from bokeh.client import pull_session
+    from panel.layout import Row
+    from panel.pane import PNG
+    from panel.widgets import FileInput
+
+    # Requests are not routed to the worker which registered a route
+    monkeypatch.setattr('panel.io.server.task_id', lambda: 1)
+    path = os.path.join(os.path.dirname(__file__), 'test_data', 'logo.png')
+    row = Row(PNG(path), FileInput())
+    server = row._get_server(port=5027)
+    try:
+        session = pull_session(
+            session_id='Test', url="http://localhost:5027/", io_loop=server.io_loop
+        )
+        png, file_input = session.document.roots[0].children
+        assert 'base64' in png.text
+        assert file_input.upload_url is None
+    finally:
+        server.stop()
+
+
+def test_server_session_reaper(monkeypatch):
+    import json
+    from bokeh.client import pull_session
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.io.sessions import session_reaper
+    from panel.layout import Row
+    from panel.pane import Markdown
+
+    monkeypatch.setattr(session_reaper, 'interval', 0.1)
+    md = Markdown('A')
+    row = Row(md)
+    server = row._get_server(port=5019, sessions_report='secret', session_idle_timeout=0.3)
+    try:
+        session = pull_session(
+            session_id='Idle', url="http://localhost:5019/", io_loop=server.io_loop
+        )
+        assert len(md._models) == 1
+
+        r = server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+            "http://localhost:5019/panel_sessions?token=secret", raise_error=False
+        ))
+        report, = json.loads(r.body)
+        assert report['session'] == 'Idle'
+        assert report['app'] == '/'
+        assert report['models'] > 0
+        assert report['idle'] < 0.3
+
+        # A connected client answers pings, even if it sends no messages
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.6))
+        assert len(server.get_sessions('/')) == 1
+        assert len(md._models) == 1
+
+        # Without a live connection the session is destroyed
+        session._connection._socket.close()
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.6))
+        assert server.get_sessions('/') == []
+        assert md._models == {}
+        assert row._models == {}
+    finally:
+        server.stop()
+        session_reaper.configure()
+
+
+def test_server_scheduled_task():
+    from bokeh.client import pull_session
+    from panel.io.server import get_server
+    from panel.pane import Markdown
+
+    calls = []
+
+    def count():
+        calls.append(len(calls))
+        return len(calls)
+
+    panes = []
+
+    def app():
+        task = state.schedule_task('count', count, period=0.1)
+        md = Markdown('0')
+        panes.append(md)
+        task.subscribe(lambda value: setattr(md, 'object', str(value)))
+        return md
+
+    server = get_server(app, port=5020)
+    start = time.monotonic()
+    try:
+        pull_session(session_id='A', url="http://localhost:5020/", io_loop=server.io_loop)
+        pull_session(session_id='B', url="http://localhost:5020/", io_loop=server.io_loop)
+        server.io_loop.run_sync(lambda: asyncio.sleep(0.35))
+        task = state._scheduled_tasks['count']
+        assert 3 <= len(calls) <= (time.monotonic() - start) / 0.1 + 1
+        assert len(task._subscribers) == 2
+        assert [md.object for md in panes] == [str(task.value)]*2
+    finally:
+        state.cancel_task('count')
+        server.stop()
+    assert 'count' not in state._scheduled_tasks
+
+
+def test_schedule_task_replaces_task_of_stopped_loop():
+    from tornado.ioloop import IOLoop
+    from panel.io.tasks import ScheduledTask
+
+    loop = IOLoop(make_current=False)
+    stale = ScheduledTask('stale', lambda: 1, period=10)
+    stale.start(loop)
+    state._scheduled_tasks['stale'] = stale
+    loop.close()
+    try:
+        task = state.schedule_task('stale', lambda: 2, period=10)
+        assert task is not stale
+        assert task._loop is IOLoop.current()
+        assert state.schedule_task('stale', lambda: 3) is task
+    finally:
+        state.cancel_task('stale')
+    assert 'stale' not in state._scheduled_tasks
+
+
+def test_server_websocket_compression():
+    import json
+    from bokeh.util.token import generate_jwt_token
+    from tornado.websocket import websocket_connect
+    from panel.io.compression import websocket_compression
+    from panel.pane import Markdown
+
+    md = Markdown('A'*10000)
+    server = md._get_server(port=5021, compression_level=6, compression_min_size=100)
+
+    async def pull_doc():
+        token = generate_jwt_token('Compressed')
+        ws = await websocket_connect(
+            "ws://localhost:5021/ws", subprotocols=['bokeh', token],
+            compression_options={}
+        )
+        header, metadata, content = [await ws.read_message() for _ in range(3)]
+        assert json.loads(header)['msgtype'] == 'ACK'
+        for frame in ({'msgid': '1', 'msgtype': 'PULL-DOC-REQ'}, {}, {}):
+            await ws.write_message(json.dumps(frame))
+        header, metadata, content = [await ws.read_message() for _ in range(3)]
+        assert json.loads(header)['msgtype'] == 'PULL-DOC-REPLY'
+        stats = websocket_compression.stats()
+        ws.close()
+        return stats, len(content)
+
+    try:
+        stats, size = server.io_loop.run_sync(pull_doc)
+    finally:
+        server.stop()
+        websocket_compression.configure(None)
+    totals = stats['totals']
+    assert totals['connections'] == 1
+    assert totals['messages'] == 6
+    assert totals['compressed'] == 1
+    assert totals['bytes_in'] > size
+    assert totals['bytes_out'] < size / 5
+
+
+def test_server_css_bundle(tmpdir):
+    import gzip
+    import re
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.config import config
+    from panel.pane import Markdown
+
+    css_file = tmpdir.join('custom.css')
+    css_file.write('.custom { color: red; }')
+    md = Markdown('A')
+    client = AsyncHTTPClient()
+    with config.set(css_files=[str(css_file)], raw_css=['.raw { color: blue; }']):
+        server = md._get_server(port=5022)
+    try:
+        with config.set(css_files=[str(css_file)], raw_css=['.raw { color: blue; }', '.late {}']):
+            r = server.io_loop.run_sync(lambda: client.fetch("http://localhost:5022/"))
+        html = r.body.decode('utf-8')
+        assert '.custom { color: red; }' not in html
+        # CSS added after the server was started is inlined
+        assert '.late {}' in html
+        url, = re.findall(r'href="(panel_resources/panel-\w+\.css)"', html)
+
+        r = server.io_loop.run_sync(lambda: client.fetch(
+            "http://localhost:5022/"+url, headers={'Accept-Encoding': 'gzip'},
+            decompress_response=False
+        ))
+        assert r.headers['Content-Encoding'] == 'gzip'
+        assert 'immutable' in r.headers['Cache-Control']
+        css = gzip.decompress(r.body).decode('utf-8')
+        assert css == '.custom { color: red; }\n.raw { color: blue; }'
+
+        r = server.io_loop.run_sync(lambda: client.fetch(
+            "http://localhost:5022/"+url, headers={'If-None-Match': r.headers['Etag']},
+            raise_error=False
+        ))
+        assert r.code == 304
+    finally:
+        server.stop()
+
+
+def test_server_lazy_resources():
+    import json
+    from bokeh.util.token import generate_jwt_token
+    from tornado.httpclient import AsyncHTTPClient
+    from tornado.websocket import websocket_connect
+    from panel.config import config
+    from panel.layout import Row
+    from panel.pane import Markdown
+    from panel.widgets import Ace
+
+    md = Markdown('A')
+    row = Row(md)
+    server = row._get_server(port=5023)
+
+    async def read_message(ws):
+        header, metadata, content = [await ws.read_message() for _ in range(3)]
+        return json.loads(header)['msgtype'], json.loads(content)
+
+    async def run():
+        r = await AsyncHTTPClient().fetch("http://localhost:5023/?bokeh-session-id=Lazy")
+        assert 'ace.js' not in r.body.decode('utf-8')
+
+        ws = await websocket_connect(
+            "ws://localhost:5023/ws", subprotocols=['bokeh', generate_jwt_token('Lazy')]
+        )
+        assert (await read_message(ws))[0] == 'ACK'
+        row.append(Ace(value='A'))
+
+        # Patches adding the editor are held until the browser loaded its JS
+        msgtype, added = await read_message(ws)
+        assert msgtype == 'PATCH-DOC'
+        assert added['events'][0]['kind'] == 'RootAdded'
+        loader_id = added['events'][0]['model']['id']
+        msgtype, request = await read_message(ws)
+        assert request['events'][0]['attr'] == 'text'
+        assert 'ace.js' in request['events'][0]['new']
+        assert 'AcePlot' not in json.dumps([added, request])
+
+        # Patches unrelated to the editor are sent immediately
+        md.object = 'B'
+        msgtype, update = await read_message(ws)
+        assert msgtype == 'PATCH-DOC'
+        assert update['events'][0]['new'] == '&lt;p&gt;B&lt;/p&gt;'
+        assert 'AcePlot' not in json.dumps(update)
+
+        # Simulate the browser reporting that the resources were loaded
+        event = {'kind': 'ModelChanged', 'model': {'id': loader_id}, 'attr': 'name', 'new': '1'}
+        for frame in ({'msgid': '1', 'msgtype': 'PATCH-DOC'}, {}, {'events': [event], 'references': []}):
+            await ws.write_message(json.dumps(frame))
+        msgtype, patch = await read_message(ws)
+        while msgtype != 'PATCH-DOC':
+            msgtype, patch = await read_message(ws)
+        ws.close()
+        return patch
+
+    try:
+        with config.set(lazy_resources=True):
+            patch = server.io_loop.run_sync(run, timeout=5)
+    finally:
+        server.stop()
+    assert 'AcePlot' in json.dumps(patch)
+
+
+def test_server_lazy_loader_released_with_session():
+    import gc
+    import weakref
+    from functools import partial
+    from tornado.httpclient import AsyncHTTPClient
+    from panel.config import config
+    from panel.io.lazy import _loaders
+    from panel.pane import Markdown
+
+    server = Markdown('A')._get_server(port=5024)
+    try:
+        with config.set(lazy_resources=True):
+            server.io_loop.run_sync(lambda: AsyncHTTPClient().fetch(
+                "http://localhost:5024/?bokeh-session-id=Released"
+            ))
+        context = server._tornado._applications['/']
+        session = context._sessions['Released']
+        doc = weakref.ref(session.document)
+        assert doc() in _loaders
+
+        discard = partial(context._discard_session, session, lambda session: True)
+        del session
+        server.io_loop.run_sync(discard)
+        del discard
+        gc.collect()
+        assert doc() is None
+    finally:
+        server.stop()
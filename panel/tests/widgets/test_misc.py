@@ -1,5 +1,8 @@
 from __future__ import absolute_import, division, unicode_literals
 
+import threading
+import time
+
 from io import BytesIO, StringIO
 from base64 import b64encode
 
@@ -11,7 +14,7 @@ try:
 except Exception:
     wavfile = None
 
-from panel.widgets import __file__ as wfile, Audio, FileDownload, Progress
+from panel.widgets import __file__ as wfile, Audio, FileDownload, Progress, VideoStream
 
 scipy_available = pytest.mark.skipif(wavfile is None, reason="requires scipy")
 
@@ -137,6 +140,14 @@ def test_file_download_callback():
     assert file_download.label == "Download cba.py"
 
 
+def test_file_download_callback_iterator():
+    file_download = FileDownload(
+        callback=lambda: iter([b"a,b\n", "1,2\n"]), filename="data.csv"
+    )
+    file_download._clicks += 1
+    assert file_download.data == "data:text/plain;charset=UTF-8;base64,YSxiCjEsMgo="
+
+
 def test_file_download_transfers():
     file_download = FileDownload(__file__, embed=True)
     assert file_download._transfers == 1
@@ -163,4 +174,27 @@ def test_file_download_data():
 
     file_download.data = None
     file_download._clicks += 1
-    assert file_download.data is not None
\ No newline at end of file
+    assert file_download.data is not None
+
+
+def test_video_stream_callback_drops_stale_frames():
+    started, release = threading.Event(), threading.Event()
+    received = []
+
+    def callback(frame):
+        started.set()
+        release.wait(5)
+        received.append(frame.data)
+
+    video = VideoStream(format='raw', callback=callback)
+    headers = {'X-Frame-Width': '1', 'X-Frame-Height': '1'}
+    video._receive_frame(b'a', headers)
+    started.wait(5)
+    for data in (b'b', b'c', b'd'):
+        video._receive_frame(data, headers)
+    release.set()
+    for _ in range(50):
+        if video._frame_future is None:
+            break
+        time.sleep(0.1)
+    assert received == [b'a', b'd']
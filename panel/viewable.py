@@ -29,6 +29,7 @@ from .io.notebook import (
 )
 from .io.save import save
 from .io.state import state
+from .io.stats import instrumented
 from .io.server import StoppableThread, get_server
 from .util import escape, param_reprs
 
@@ -360,6 +361,16 @@ class Renderable(param.Parameterized):
 
     __abstract = True
 
+    # Methods which are recorded by state.stats when overridden
+    _instrumented_methods = ['_get_model', 'get_root']
+
+    def __init_subclass__(cls, **kwargs):
+        super(Renderable, cls).__init_subclass__(**kwargs)
+        for name in cls._instrumented_methods:
+            method = cls.__dict__.get(name)
+            if callable(method) and not hasattr(method, '__wrapped__'):
+                type.__setattr__(cls, name, instrumented(method))
+
     def __init__(self, **params):
         super(Renderable, self).__init__(**params)
         self._documents = {}
@@ -368,6 +379,7 @@ class Renderable(param.Parameterized):
         self._kernels = {}
         self._found_links = set()
 
+    @instrumented
     def _get_model(self, doc, root=None, parent=None, comm=None):
         """
         Converts the objects being wrapped by the viewable into a
@@ -433,6 +445,7 @@ class Renderable(param.Parameterized):
         return {k: v for k, v in self.param.get_param_values()
                 if v is not None}
 
+    @instrumented
     def get_root(self, doc=None, comm=None):
         """
         Returns the root model and applies pre-processing hooks
@@ -544,8 +557,16 @@ class Viewable(Renderable, Layoutable, ServableMixin):
         Server lifecycle hook triggered when session is destroyed.
         """
         doc = session_context._document
-        self._cleanup(self._documents[doc])
+        root = self._documents[doc]
+        self._cleanup(root)
         del self._documents[doc]
+        state._views.pop(root.ref['id'], None)
+        location = state._locations.pop(doc, None)
+        if location is not None:
+            location._cleanup(root)
+        for _, _, docs in state._servers.values():
+            if doc in docs:
+                docs.remove(doc)
 
     #----------------------------------------------------------------
     # Public API
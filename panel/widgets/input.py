@@ -6,6 +6,7 @@ from __future__ import absolute_import, division, unicode_literals
 
 import ast
 import json
+import shutil
 
 from base64 import b64decode
 from datetime import datetime
@@ -17,8 +18,11 @@ from bokeh.models.widgets import (
     CheckboxGroup as _BkCheckboxGroup, ColorPicker as _BkColorPicker,
     DatePicker as _BkDatePicker, Div as _BkDiv, TextInput as _BkTextInput,
     PasswordInput as _BkPasswordInput, Spinner as _BkSpinner,
-    FileInput as _BkFileInput, TextAreaInput as _BkTextAreaInput)
+    TextAreaInput as _BkTextAreaInput)
 
+from ..io.server import session_routes, upload_url
+from ..io.state import state
+from ..models import FileInput as _BkFileInput
 from ..util import as_unicode
 from .base import Widget
 
@@ -58,15 +62,48 @@ class FileInput(Widget):
 
     filename = param.String(default=None)
 
+    max_size = param.Integer(default=None, bounds=(0, None), doc="""
+        The maximum size in bytes of files uploaded to a server in
+        chunks, larger files are rejected. Defaults to 1 GB.""")
+
     mime_type = param.String(default=None)
 
-    value = param.Parameter(default=None)
+    progress = param.Integer(default=None, bounds=(0, 100), doc="""
+        The percentage of the current upload received by the server.""")
+
+    value = param.Parameter(default=None, doc="""
+        The uploaded file. When uploaded to a server in chunks this
+        is a file-like object the upload was spooled to, otherwise
+        the file contents as bytes.""")
 
     _widget_type = _BkFileInput
 
     _source_transforms = {'value': "'data:' + source.mime_type + ';base64,' + value"}
 
-    _rename = {'name': None, 'filename': None}
+    _rename = {'name': None, 'filename': None, 'max_size': None, 'progress': None}
+
+    def _get_model(self, doc, root=None, parent=None, comm=None):
+        model = super(FileInput, self)._get_model(doc, root, parent, comm)
+        if comm is None and session_routes(doc):
+            model.upload_url = upload_url(self._receive_upload, doc, self.max_size)
+        return model
+
+    @param.depends('max_size', watch=True)
+    def _update_max_size(self):
+        for model, _ in self._models.values():
+            if model.upload_url:
+                upload = state._uploads.get(model.upload_url.split('/')[-1])
+                if upload is not None:
+                    upload['max_size'] = self.max_size
+
+    def _receive_upload(self, filename, mime_type, file, received, total):
+        if received < total:
+            self.progress = int(100 * received / total)
+            return
+        file.seek(0)
+        self.param.set_param(
+            filename=filename, mime_type=mime_type, value=file, progress=100
+        )
 
     def _process_param_change(self, msg):
         msg = super(FileInput, self)._process_param_change(msg)
@@ -94,7 +131,15 @@ class FileInput(Widget):
         ---------
         filename (str): File path or file-like object
         """
-        if isinstance(filename, string_types):
+        if hasattr(self.value, 'read'):
+            self.value.seek(0)
+            if isinstance(filename, string_types):
+                with open(filename, 'wb') as f:
+                    shutil.copyfileobj(self.value, f)
+            else:
+                shutil.copyfileobj(self.value, filename)
+            self.value.seek(0)
+        elif isinstance(filename, string_types):
             with open(filename, 'wb') as f:
                 f.write(self.value)
         else:
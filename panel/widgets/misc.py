@@ -4,7 +4,10 @@ Miscellaneous widgets which do not fit into the other main categories.
 from __future__ import absolute_import, division, unicode_literals
 
 import os
+import threading
 
+from collections.abc import Iterator
+from functools import partial
 from io import BytesIO
 from base64 import b64encode
 from six import string_types
@@ -14,6 +17,9 @@ import numpy as np
 
 from ..depends import depends
 from ..io.notebook import push
+from ..io.server import (
+    discard_download, download_url, session_routes, stream_url, unlocked
+)
 from ..io.state import state
 from ..models import (
     Audio as _BkAudio, VideoStream as _BkVideoStream, Progress as _BkProgress,
@@ -101,11 +107,49 @@ class Audio(_MediaBase):
     _widget_type = _BkAudio
 
 
+class VideoFrame(object):
+    """
+    A single frame captured by a VideoStream, holding the encoded
+    image data (or raw RGBA pixels if the format is 'raw') along
+    with its dimensions.
+    """
+
+    def __init__(self, data, format, width, height):
+        self.data = data
+        self.format = format
+        self.width = width
+        self.height = height
+
+    @property
+    def array(self):
+        """
+        The frame as a (height, width, channels) uint8 NumPy array.
+        Raw frames are a view on the received buffer, while PNG and
+        JPEG frames are decoded using PIL.
+        """
+        if self.format == 'raw':
+            return np.frombuffer(self.data, dtype='uint8').reshape(
+                self.height, self.width, 4)
+        from PIL import Image
+        return np.asarray(Image.open(BytesIO(self.data)))
+
+
 class VideoStream(Widget):
 
-    format = param.ObjectSelector(default='png', objects=['png', 'jpeg'],
+    callback = param.Callable(default=None, doc="""
+        A callback invoked with each VideoFrame in a worker thread.
+        When set in a server session frames are POSTed to the server
+        as binary data instead of updating the value. Frames which
+        arrive while the callback is running are dropped except for
+        the most recent one, and the browser does not capture a new
+        frame until the previous one has been received. Servers with
+        multiple worker processes do not support the callback.""")
+
+    format = param.ObjectSelector(default='png', objects=['png', 'jpeg', 'raw'],
                                   doc="""
-        The file format as which the video is returned.""")
+        The file format as which the video is returned. The 'raw'
+        format sends uncompressed RGBA pixels and only applies to
+        frames delivered to the callback.""")
 
     paused = param.Boolean(default=False, doc="""
         Whether the video is currently paused""")
@@ -118,7 +162,66 @@ class VideoStream(Widget):
 
     _widget_type = _BkVideoStream
 
-    _rename = {'name': None}
+    _rename = {'callback': None, 'name': None}
+
+    def __init__(self, **params):
+        super(VideoStream, self).__init__(**params)
+        self._frame_urls = {}
+        self._frame_lock = threading.Lock()
+        self._frame_future = None
+        self._next_frame = None
+
+    def _get_model(self, doc, root=None, parent=None, comm=None):
+        model = super(VideoStream, self)._get_model(doc, root, parent, comm)
+        if comm is None and session_routes(doc):
+            ref = (root or model).ref['id']
+            self._frame_urls[ref] = stream_url(self._receive_frame, doc)
+            if self.callback is not None:
+                model.frame_url = self._frame_urls[ref]
+        return model
+
+    def _cleanup(self, root):
+        super(VideoStream, self)._cleanup(root)
+        url = self._frame_urls.pop(root.ref['id'], None)
+        if url is not None:
+            state._streams.pop(url.split('/')[-1], None)
+
+    @param.depends('callback', watch=True)
+    def _update_frame_url(self):
+        for ref, (model, _) in self._models.items():
+            if ref not in state._views or ref in state._fake_roots:
+                continue
+            viewable, root, doc, comm = state._views[ref]
+            url = self._frame_urls.get(ref)
+            msg = {'frame_url': None if self.callback is None else url}
+            if comm or not doc.session_context or state._unblocked(doc):
+                with unlocked():
+                    self._update_model({}, msg, root, model, doc, comm)
+            else:
+                cb = partial(self._update_model, {}, msg, root, model, doc, comm)
+                doc.add_next_tick_callback(cb)
+
+    def _receive_frame(self, data, headers):
+        frame = VideoFrame(
+            data, headers.get('X-Frame-Format', self.format),
+            int(headers['X-Frame-Width']), int(headers['X-Frame-Height'])
+        )
+        with self._frame_lock:
+            if self._frame_future is not None:
+                self._next_frame = frame
+            elif self.callback is not None:
+                self._frame_future = state._submit(self._process_frames, frame)
+
+    def _process_frames(self, frame):
+        while frame is not None:
+            try:
+                self.callback(frame)
+            except Exception as e:
+                self.param.warning('VideoStream callback raised: %s' % e)
+            with self._frame_lock:
+                frame, self._next_frame = self._next_frame, None
+                if frame is None:
+                    self._frame_future = None
 
     def snapshot(self):
         """
@@ -168,10 +271,12 @@ class FileDownload(Widget):
         'default', 'primary', 'success', 'warning', 'danger'])
 
     callback = param.Callable(default=None, doc="""
-        A callable that returns the file path or file-like object.""")
+        A callable that returns the file path, file-like object or
+        an iterator over the chunks of the file.""")
 
     data = param.String(default=None, doc="""
-        The data being transferred.""")
+        The data being transferred, either as a base64 encoded data
+        URL or, in a server session, the URL it is streamed from.""")
 
     embed = param.Boolean(default=False, doc="""
         Whether to embed the file on initialization.""")
@@ -275,15 +380,9 @@ class FileDownload(Widget):
         if isinstance(fileobj, str):
             if not os.path.isfile(fileobj):
                 raise FileNotFoundError('File "%s" not found.' % fileobj)
-            with open(fileobj, 'rb') as f:
-                b64 = b64encode(f.read()).decode("utf-8")
             if filename is None:
                 filename = os.path.basename(fileobj)
-        elif hasattr(fileobj, 'read'):
-            bdata = fileobj.read()
-            if not isinstance(bdata, bytes):
-                bdata = bdata.encode("utf-8")
-            b64 = b64encode(bdata).decode("utf-8")
+        elif hasattr(fileobj, 'read') or isinstance(fileobj, Iterator):
             if filename is None:
                 raise ValueError('Must provide filename if file-like '
                                  'object is provided.')
@@ -302,7 +401,29 @@ class FileDownload(Widget):
         else:
             mime = '{type}/{subtype}'.format(type=mtype, subtype=stype)
 
-        data = "data:{mime};base64,{b64}".format(mime=mime, b64=b64)
+        doc = state.curdoc
+        if session_routes(doc):
+            # Stream the file from a server endpoint instead of
+            # embedding it in the document
+            discard_download(self.data)
+            data = download_url(fileobj, filename, mime, doc)
+        else:
+            if isinstance(fileobj, str):
+                with open(fileobj, 'rb') as f:
+                    bdata = f.read()
+            elif hasattr(fileobj, 'read'):
+                bdata = fileobj.read()
+            else:
+                bdata = fileobj
+            if not isinstance(bdata, (str, bytes)):
+                bdata = b''.join(
+                    c if isinstance(c, bytes) else c.encode("utf-8")
+                    for c in bdata
+                )
+            if not isinstance(bdata, bytes):
+                bdata = bdata.encode("utf-8")
+            b64 = b64encode(bdata).decode("utf-8")
+            data = "data:{mime};base64,{b64}".format(mime=mime, b64=b64)
         self._synced = True
 
         self.param.set_param(data=data, filename=filename)